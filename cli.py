@@ -0,0 +1,371 @@
+"""
+Command Line Tools for TimeTrace Application
+Headless maintenance commands for tracker.db
+"""
+
+import argparse
+import sys
+from datetime import date
+from database_backup import BACKUP_GENERATIONS, verify_backup
+from database_manager import (ARCHIVE_COMPRESS_IDLE_DAYS, CHANGE_BATCH_ROWS, CHANGE_LOG_MAX_ROWS,
+                              HOUR_TIER_DAYS, MINUTE_TIER_DAYS, TIERS, DatabaseManager)
+from database_migrations import MigrationRunner, check_query_plans
+from export_service import (EXPORT_FORMATS, EXPORT_GRANULARITIES, MATRIX_FORMATS, export_file_name,
+                            export_usage, export_usage_matrix)
+from import_tool import IMPORT_BATCH_ROWS, IMPORT_FORMATS, import_usage
+from merge_tool import MergeTool, find_sources
+from process_sampler import available_samplers, check_sampler_conformance
+
+
+def cmd_check_cumulative(db: DatabaseManager, args) -> int:
+    """Report running-total rows that disagree with usage_logs."""
+    mismatches = db.check_cumulative_consistency()
+    for app_name, day, stored, expected in mismatches[:args.limit]:
+        print(f"  {app_name} {day}: stored={stored} expected={expected}")
+    
+    if mismatches:
+        print(f"[TimeTraceCLI] {len(mismatches)} inconsistent running totals "
+              f"(run 'rebuild-cumulative' to fix)")
+        return 1
+    
+    print("[TimeTraceCLI] Running totals are consistent")
+    return 0
+
+
+def cmd_rebuild_cumulative(db: DatabaseManager, args) -> int:
+    """Recompute running totals from usage_logs."""
+    return 0 if db.rebuild_cumulative() else 1
+
+
+def cmd_archive(db: DatabaseManager, args) -> int:
+    """Move whole months before a date (or before the last N months) into archive files."""
+    if args.before:
+        cutoff_date = args.before
+    else:
+        today = date.today()
+        months = today.year * 12 + today.month - 1 - args.keep_months
+        cutoff_date = f"{months // 12:04d}-{months % 12 + 1:02d}-01"
+    
+    archived = db.archive_before(cutoff_date)
+    for month in archived:
+        print(f"  {month}")
+    return 0
+
+
+def cmd_compress_archives(db: DatabaseManager, args) -> int:
+    """Gzip archive files that haven't been read for a while."""
+    db.compress_archives(args.idle_days)
+    return 0
+
+
+def cmd_list_archives(db: DatabaseManager, args) -> int:
+    """Print the archived months and their files."""
+    archives = db.get_archives()
+    for archive in archives:
+        print(f"  {archive.month}  {archive.file_name}")
+    print(f"[TimeTraceCLI] {len(archives)} archived months")
+    return 0
+
+
+def cmd_compact_tiers(db: DatabaseManager, args) -> int:
+    """Roll old minute buckets into hours and drop expired hourly buckets."""
+    result = db.compact_tiers(minute_days=args.minute_days, hour_days=args.hour_days)
+    print(f"[TimeTraceCLI] Rolled {result['rolled_minutes']} minute buckets, "
+          f"dropped {result['dropped_hours']} hourly buckets")
+    return 0
+
+
+def cmd_sessions(db: DatabaseManager, args) -> int:
+    """Print the stored sessions overlapping a time window."""
+    sessions = db.get_sessions(args.start, args.end or args.start, apps=args.app)
+    for app_name, start, end in sessions:
+        print(f"{start}\t{end}\t{app_name}")
+    print(f"[TimeTraceCLI] {len(sessions)} sessions")
+    return 0
+
+
+def cmd_running_at(db: DatabaseManager, args) -> int:
+    """Print the apps that had a session running at a given time."""
+    apps = db.get_apps_running_at(args.moment)
+    for app_name in apps:
+        print(f"  {app_name}")
+    print(f"[TimeTraceCLI] {len(apps)} apps running at {args.moment}")
+    return 0
+
+
+def cmd_timeline(db: DatabaseManager, args) -> int:
+    """Print total usage per minute, hour or day over a time range (empty buckets skipped)."""
+    timeline = db.get_timeline(args.start, args.end or args.start, apps=args.app, resolution=args.resolution)
+    series = timeline["series"]
+    for label, seconds in series.items():
+        if seconds:
+            print(f"{label}\t{seconds}")
+    print(f"[TimeTraceCLI] {sum(series.values())}s over {len(series)} {timeline['resolution']} buckets")
+    return 0
+
+
+def cmd_export(db: DatabaseManager, args) -> int:
+    """Stream usage rows for a date range to a CSV or JSON Lines file."""
+    end_date = args.end or date.today().strftime("%Y-%m-%d")
+    path = args.output or export_file_name(args.granularity, args.format, args.gzip)
+    
+    def on_progress(rows: int, days_done: int, total_days: int):
+        print(f"  {rows} rows, {days_done}/{total_days} days")
+    
+    result = export_usage(db, path, args.start, end_date, args.granularity, args.format, args.gzip,
+                          apps=args.app, progress_callback=on_progress)
+    if not result["completed"]:
+        return 1
+    print(f"[TimeTraceCLI] Exported {result['rows']} rows to {result['path']}")
+    return 0
+
+
+def cmd_export_matrix(db: DatabaseManager, args) -> int:
+    """Write the date x app usage matrix of a date range to an .npz or Parquet file."""
+    end_date = args.end or date.today().strftime("%Y-%m-%d")
+    path = args.output or export_file_name("matrix", args.format)
+    result = export_usage_matrix(db, path, args.start, end_date, args.format, apps=args.app)
+    if not result["completed"]:
+        return 1
+    print(f"[TimeTraceCLI] Exported a {result['days']} x {result['apps']} matrix to {result['path']}")
+    return 0
+
+
+def cmd_changes(db: DatabaseManager, args) -> int:
+    """Print changes to the daily totals after a watermark (or a consumer's stored one)."""
+    since = args.since if args.since is not None else db.get_consumer_sequence(args.consumer or "")
+    result = db.get_changes_since(since, limit=args.limit)
+    if result["error"]:
+        return 1
+    if result["resync"]:
+        print(f"[TimeTraceCLI] Changes after {since} were compacted; re-export everything "
+              f"and continue from {db.get_change_sequence()}")
+        return 2
+    
+    for sequence, app_name, day, delta in result["changes"]:
+        print(f"{sequence}\t{day}\t{app_name}\t{delta:+d}")
+    if args.consumer and args.ack and result["changes"]:
+        db.acknowledge_changes(args.consumer, result["last_sequence"])
+    print(f"[TimeTraceCLI] {len(result['changes'])} changes, next watermark {result['last_sequence']}"
+          + (" (more pending)" if result["has_more"] else ""))
+    return 0
+
+
+def cmd_compact_changes(db: DatabaseManager, args) -> int:
+    """Drop processed changes and coalesce unread ones."""
+    result = db.compact_change_log(max_rows=args.max_rows)
+    print(f"[TimeTraceCLI] Dropped {result['dropped']} changes, coalesced {result['coalesced']}")
+    return 0
+
+
+def cmd_merge(db: DatabaseManager, args) -> int:
+    """Merge other machines' databases into this one (the aggregate)."""
+    sources = find_sources(args.sources)
+    if not sources:
+        print("[TimeTraceCLI] No source databases found")
+        return 1
+    result = MergeTool(db).merge(sources, full=args.full)
+    return 1 if result["failed"] else 0
+
+
+def cmd_import(db: DatabaseManager, args) -> int:
+    """Load usage history from CSV / JSON Lines files (added to what is stored)."""
+    def on_progress(rows: int, imported: int):
+        print(f"  {rows} rows read, {imported} {'valid' if args.dry_run else 'imported'}")
+    
+    failed = False
+    for path in args.sources:
+        result = import_usage(db, path, args.format, dry_run=args.dry_run, batch_rows=args.batch_rows,
+                              progress_callback=on_progress)
+        verb = "Would import" if args.dry_run else "Imported"
+        print(f"[TimeTraceCLI] {verb} {result['imported']} of {result['rows']} rows from {path} "
+              f"({result['apps']} apps, {result['first_date']}..{result['last_date']}, "
+              f"{result['skipped']} skipped)")
+        failed = failed or not result["completed"]
+    return 1 if failed else 0
+
+
+def cmd_backup(db: DatabaseManager, args) -> int:
+    """Take an online backup into the backups folder and check its integrity."""
+    db.backups.generations = max(1, args.keep)
+    result = db.backups.create_backup()
+    if not result["completed"]:
+        return 1
+    ok, message = verify_backup(result["path"])
+    print(f"[TimeTraceCLI] {result['path']}: {result['pages']} pages in {result['seconds']}s, "
+          f"integrity check: {message}")
+    return 0 if ok else 1
+
+
+def cmd_migrate(db: DatabaseManager, args) -> int:
+    """Apply pending schema migrations, or check them with --dry-run."""
+    runner = MigrationRunner(db)
+    print(f"[TimeTraceCLI] Schema version: v{runner.current_version()}")
+    applied = runner.run(dry_run=args.dry_run)
+    if not applied:
+        print("[TimeTraceCLI] No pending migrations")
+    return 0
+
+
+def cmd_check_plans(db: DatabaseManager, args) -> int:
+    """Fail if any runtime query falls back to a full table scan."""
+    problems = check_query_plans()
+    for problem in problems:
+        print(f"  FULL SCAN: {problem}")
+    print(f"[TimeTraceCLI] {len(problems)} query plan regressions" if problems
+          else "[TimeTraceCLI] All query plans use indexes")
+    return 1 if problems else 0
+
+
+def cmd_check_samplers(db: DatabaseManager, args) -> int:
+    """Fail if the process sampler backends disagree on the live process table."""
+    names = available_samplers()
+    print(f"[TimeTraceCLI] Available samplers: {', '.join(names) or 'none'}")
+    if len(names) < 2:
+        print("[TimeTraceCLI] Nothing to compare")
+        return 0
+    differences = check_sampler_conformance(names)
+    for difference in differences:
+        print(f"  {difference}")
+    print(f"[TimeTraceCLI] {len(differences)} differences" if differences else "[TimeTraceCLI] Samplers agree")
+    return 1 if differences else 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """
+    Build the argument parser with one subcommand per maintenance task.
+    
+    Returns:
+        Configured ArgumentParser
+    """
+    parser = argparse.ArgumentParser(description="TimeTrace maintenance tools")
+    parser.add_argument("--db", default="tracker.db", help="Path to tracker database")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    
+    check = subparsers.add_parser("check-cumulative", help="Verify running totals against raw logs")
+    check.add_argument("--limit", type=int, default=20, help="Mismatches to print")
+    check.set_defaults(handler=cmd_check_cumulative)
+    
+    rebuild = subparsers.add_parser("rebuild-cumulative", help="Recompute running totals from raw logs")
+    rebuild.set_defaults(handler=cmd_rebuild_cumulative)
+    
+    archive = subparsers.add_parser("archive", help="Move old months into per-month archive files")
+    cutoff = archive.add_mutually_exclusive_group()
+    cutoff.add_argument("--before", help="Archive whole months ending before this date (YYYY-MM-DD)")
+    cutoff.add_argument("--keep-months", type=int, default=3,
+                        help="Keep the current and this many previous months hot (default: 3)")
+    archive.set_defaults(handler=cmd_archive)
+    
+    compress = subparsers.add_parser("compress-archives", help="Gzip archive files that are rarely read")
+    compress.add_argument("--idle-days", type=int, default=ARCHIVE_COMPRESS_IDLE_DAYS,
+                          help=f"Days since last read (default: {ARCHIVE_COMPRESS_IDLE_DAYS})")
+    compress.set_defaults(handler=cmd_compress_archives)
+    
+    archives = subparsers.add_parser("list-archives", help="List archived months")
+    archives.set_defaults(handler=cmd_list_archives)
+    
+    compact = subparsers.add_parser("compact-tiers", help="Roll minute buckets into hours, expire old hours")
+    compact.add_argument("--minute-days", type=int, default=MINUTE_TIER_DAYS,
+                         help=f"Days of minute buckets to keep (default: {MINUTE_TIER_DAYS})")
+    compact.add_argument("--hour-days", type=int, default=HOUR_TIER_DAYS,
+                         help=f"Days of hourly buckets to keep (default: {HOUR_TIER_DAYS})")
+    compact.set_defaults(handler=cmd_compact_tiers)
+    
+    sessions = subparsers.add_parser("sessions", help="List the sessions overlapping a time window")
+    sessions.add_argument("start", help="Window start (YYYY-MM-DD or YYYY-MM-DD HH:MM[:SS])")
+    sessions.add_argument("end", nargs="?", help="Window end (default: the end of the start day)")
+    sessions.add_argument("--app", action="append", help="Only list this app (repeatable)")
+    sessions.set_defaults(handler=cmd_sessions)
+    
+    running_at = subparsers.add_parser("running-at", help="List the apps that were running at a given time")
+    running_at.add_argument("moment", help="Time (YYYY-MM-DD HH:MM[:SS])")
+    running_at.set_defaults(handler=cmd_running_at)
+    
+    timeline = subparsers.add_parser("timeline", help="Print usage per minute, hour or day over a time range")
+    timeline.add_argument("start", help="Start (YYYY-MM-DD or YYYY-MM-DD HH:MM)")
+    timeline.add_argument("end", nargs="?", help="End, inclusive (default: the end of the start day)")
+    timeline.add_argument("--app", action="append", help="Only count this app (repeatable)")
+    timeline.add_argument("--resolution", choices=TIERS,
+                          help="Bucket size (default: the finest tier that covers the start)")
+    timeline.set_defaults(handler=cmd_timeline)
+    
+    export = subparsers.add_parser("export", help="Export usage rows to CSV or JSON Lines")
+    export.add_argument("--start", required=True, help="First date (YYYY-MM-DD)")
+    export.add_argument("--end", help="Last date (YYYY-MM-DD, default: today)")
+    export.add_argument("--granularity", choices=EXPORT_GRANULARITIES, default="day",
+                        help="One row per app and day, or per session (default: day)")
+    export.add_argument("--format", choices=EXPORT_FORMATS, default="csv", help="Output format (default: csv)")
+    export.add_argument("--gzip", action="store_true", help="Compress the output")
+    export.add_argument("--app", action="append", help="Only export this app (repeatable)")
+    export.add_argument("--output", help="Output file (default: time-stamped name in the current folder)")
+    export.set_defaults(handler=cmd_export)
+    
+    export_matrix = subparsers.add_parser("export-matrix", help="Export the date x app usage matrix (.npz or Parquet)")
+    export_matrix.add_argument("--start", required=True, help="First date (YYYY-MM-DD)")
+    export_matrix.add_argument("--end", help="Last date (YYYY-MM-DD, default: today)")
+    export_matrix.add_argument("--format", choices=MATRIX_FORMATS, default="npz", help="Output format (default: npz)")
+    export_matrix.add_argument("--app", action="append", help="Only include this app (repeatable)")
+    export_matrix.add_argument("--output", help="Output file (default: time-stamped name in the current folder)")
+    export_matrix.set_defaults(handler=cmd_export_matrix)
+    
+    changes = subparsers.add_parser("changes", help="Print changes to the daily totals since a watermark")
+    start = changes.add_mutually_exclusive_group()
+    start.add_argument("--since", type=int, help="Change sequence to start after (default: the consumer's watermark)")
+    start.add_argument("--consumer", help="Named consumer whose stored watermark is used")
+    changes.add_argument("--ack", action="store_true", help="Store the new watermark for --consumer")
+    changes.add_argument("--limit", type=int, default=CHANGE_BATCH_ROWS,
+                         help=f"Changes to print (default: {CHANGE_BATCH_ROWS})")
+    changes.set_defaults(handler=cmd_changes)
+    
+    compact_changes = subparsers.add_parser("compact-changes", help="Bound the change log")
+    compact_changes.add_argument("--max-rows", type=int, default=CHANGE_LOG_MAX_ROWS,
+                                 help=f"Changes kept at most (default: {CHANGE_LOG_MAX_ROWS})")
+    compact_changes.set_defaults(handler=cmd_compact_changes)
+    
+    merge = subparsers.add_parser("merge", help="Merge other machines' databases into --db (fleet view)")
+    merge.add_argument("sources", nargs="+",
+                       help="Database files, NAME=PATH to name the device, or folders of *.db files")
+    merge.add_argument("--full", action="store_true", help="Ignore watermarks and re-merge every day")
+    merge.set_defaults(handler=cmd_merge)
+    
+    imports = subparsers.add_parser("import", help="Add usage history from CSV / JSON Lines files")
+    imports.add_argument("sources", nargs="+", help="Files with date, app and seconds columns (.csv, .jsonl, .gz)")
+    imports.add_argument("--format", choices=IMPORT_FORMATS, help="Input format (default: from the file extension)")
+    imports.add_argument("--dry-run", action="store_true", help="Validate only, write nothing")
+    imports.add_argument("--batch-rows", type=int, default=IMPORT_BATCH_ROWS,
+                         help=f"Rows per transaction (default: {IMPORT_BATCH_ROWS})")
+    imports.set_defaults(handler=cmd_import)
+    
+    backup = subparsers.add_parser("backup", help="Back up --db while it is in use, then verify the copy")
+    backup.add_argument("--keep", type=int, default=BACKUP_GENERATIONS,
+                        help=f"Backups to keep; older ones are deleted (default: {BACKUP_GENERATIONS})")
+    backup.set_defaults(handler=cmd_backup)
+    
+    migrate = subparsers.add_parser("migrate", help="Apply pending schema migrations")
+    migrate.add_argument("--dry-run", action="store_true", help="Run migrations and roll them back")
+    migrate.set_defaults(handler=cmd_migrate, auto_migrate=False)
+    
+    plans = subparsers.add_parser("check-plans", help="Fail if a runtime query does a full table scan")
+    plans.set_defaults(handler=cmd_check_plans, open_db=False)
+    
+    samplers = subparsers.add_parser("check-samplers", help="Fail if the process sampler backends disagree")
+    samplers.set_defaults(handler=cmd_check_samplers, open_db=False)
+    
+    return parser
+
+
+def main(argv=None) -> int:
+    """Main entry point."""
+    args = build_parser().parse_args(argv)
+    if not getattr(args, "open_db", True):
+        return args.handler(None, args)
+    
+    db = DatabaseManager(args.db, auto_migrate=getattr(args, "auto_migrate", True))
+    try:
+        return args.handler(db, args)
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,70 @@
+"""
+Compaction Service for TimeTrace
+Rolls minute buckets into hourly ones, expires old hourly buckets and
+compacts the change log in the background
+"""
+
+import threading
+from database_manager import DatabaseManager
+
+
+# Scheduling
+COMPACTION_STARTUP_DELAY_SECONDS = 60       # Let the app settle before the first compaction
+COMPACTION_INTERVAL_SECONDS = 60 * 60       # Minute buckets only expire at day boundaries
+
+
+class CompactionService:
+    """
+    Runs DatabaseManager.compact_tiers and compact_change_log on a background
+    thread, so the minute and hourly tiers and the change log stay bounded
+    without blocking the monitor or UI.
+    """
+    
+    def __init__(self, db_manager: DatabaseManager):
+        """
+        Initialize compaction service.
+        
+        Args:
+            db_manager: DatabaseManager instance
+        """
+        self.db_manager = db_manager
+        self.running = False
+        self.thread = None
+        self._wake = threading.Event()
+        
+        # Result of the last compaction
+        self.last_result = None
+        
+        print("[CompactionService] Initialized")
+    
+    def start(self):
+        """Start the compaction thread."""
+        if self.running:
+            return
+        
+        self.running = True
+        self.thread = threading.Thread(target=self._compaction_loop, name="CompactionService", daemon=True)
+        self.thread.start()
+        print("[CompactionService] Started")
+    
+    def stop(self):
+        """Stop the compaction thread, waiting briefly for a compaction in progress."""
+        self.running = False
+        self._wake.set()
+        if self.thread:
+            self.thread.join(timeout=5)
+        print("[CompactionService] Stopped")
+    
+    def _compaction_loop(self):
+        """Main compaction loop. Runs in the compaction thread."""
+        self._wake.wait(timeout=COMPACTION_STARTUP_DELAY_SECONDS)
+        
+        while self.running:
+            try:
+                result = self.db_manager.compact_tiers()
+                result.update(self.db_manager.compact_change_log())
+                self.last_result = result
+            except Exception as e:
+                print(f"[CompactionService] Error compacting storage tiers: {e}")
+            
+            self._wake.wait(timeout=COMPACTION_INTERVAL_SECONDS)
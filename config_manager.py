@@ -7,6 +7,20 @@ import json
 import os
 from typing import List
 import threading
+from watchlist_matcher import normalize_watchlist_entry
+
+
+def normalize_app_name(exe_name: str) -> str:
+    """
+    Normalize an executable name the way tracked usage records it.
+    
+    Args:
+        exe_name: Executable name (e.g., " Notepad.EXE ")
+    
+    Returns:
+        Lowercase name without surrounding whitespace (e.g., "notepad.exe")
+    """
+    return exe_name.lower().strip()
 
 
 class ConfigManager:
@@ -34,7 +48,16 @@ class ConfigManager:
                 "check_interval_seconds": 5,
                 "save_interval_seconds": 60,
                 "theme": "dark",
-                "minimize_to_tray": True
+                "minimize_to_tray": True,
+                "retention_days": 90,
+                "auto_retention": False,
+                "auto_backup": False,
+                "backup_interval_hours": 24,
+                "backup_generations": 7,
+                "process_sampler": "auto",
+                "adaptive_polling": False,
+                "min_check_interval_seconds": 1,
+                "max_check_interval_seconds": 30
             }
             self._save_config(default_config)
             print(f"[ConfigManager] Created default configuration: {self.config_path}")
@@ -59,7 +82,16 @@ class ConfigManager:
                 "check_interval_seconds": 5,
                 "save_interval_seconds": 60,
                 "theme": "dark",
-                "minimize_to_tray": True
+                "minimize_to_tray": True,
+                "retention_days": 90,
+                "auto_retention": False,
+                "auto_backup": False,
+                "backup_interval_hours": 24,
+                "backup_generations": 7,
+                "process_sampler": "auto",
+                "adaptive_polling": False,
+                "min_check_interval_seconds": 1,
+                "max_check_interval_seconds": 30
             }
     
     def _save_config(self, config: dict):
@@ -80,7 +112,7 @@ class ConfigManager:
         Get list of applications to monitor.
         
         Returns:
-            List of executable names (e.g., ["chrome.exe", "valorant.exe"])
+            List of executable names and patterns (e.g., ["chrome.exe", "valorant.exe", "steam*.exe"])
         """
         with self.lock:
             config = self._load_config()
@@ -91,7 +123,7 @@ class ConfigManager:
         Add an application to the watchlist.
         
         Args:
-            exe_name: Executable name (e.g., "notepad.exe")
+            exe_name: Executable name (e.g., "notepad.exe") or pattern (see watchlist_matcher)
             
         Returns:
             True if added successfully, False if already exists
@@ -100,11 +132,11 @@ class ConfigManager:
             config = self._load_config()
             watchlist = config.get("watchlist", [])
             
-            # Normalize the exe_name (lowercase for comparison)
-            exe_name_lower = exe_name.lower().strip()
+            # Normalize the exe_name (lowercase for comparison; patterns keep their case)
+            exe_name_lower = normalize_watchlist_entry(exe_name)
             
             # Check if already in watchlist (case-insensitive)
-            if exe_name_lower in [app.lower() for app in watchlist]:
+            if exe_name_lower in [normalize_watchlist_entry(app) for app in watchlist]:
                 print(f"[ConfigManager] {exe_name} already in watchlist")
                 return False
             
@@ -130,11 +162,11 @@ class ConfigManager:
             watchlist = config.get("watchlist", [])
             
             # Normalize the exe_name
-            exe_name_lower = exe_name.lower().strip()
+            exe_name_lower = normalize_watchlist_entry(exe_name)
             
             # Remove from watchlist (case-insensitive)
             original_length = len(watchlist)
-            watchlist = [app for app in watchlist if app.lower() != exe_name_lower]
+            watchlist = [app for app in watchlist if normalize_watchlist_entry(app) != exe_name_lower]
             
             if len(watchlist) == original_length:
                 print(f"[ConfigManager] {exe_name} not found in watchlist")
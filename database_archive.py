@@ -0,0 +1,299 @@
+"""
+Database Archive for TimeTrace Application
+Cold-storage month files that DatabaseManager attaches on demand
+"""
+
+import gzip
+import os
+import shutil
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, List, NamedTuple, Tuple
+from urllib.request import pathname2url
+
+
+# Attached archives kept per reader connection (SQLite allows 10 attachments by default)
+MAX_ATTACHED_ARCHIVES = 8
+
+ARCHIVE_DIRECTORY = "archive"
+
+
+class ArchiveInfo(NamedTuple):
+    """One archived month, as recorded in the hot database's archives table."""
+    first_day: int
+    last_day: int
+    month: str       # "YYYY-MM"
+    file_name: str   # Relative to the archive directory, without ".gz"
+
+
+class ArchiveStore:
+    """
+    Manages the per-month archive files next to the hot database.
+    Each file holds the month's usage_logs rows (same layout and app ids as
+    the hot database) plus a copy of the app names it uses, so an archive is
+    readable on its own. Files can be gzip-compressed while idle and are
+    decompressed transparently the next time a query needs them.
+    """
+    
+    def __init__(self, db_path: str):
+        """
+        Initialize the archive store. The directory is created on first write.
+        
+        Args:
+            db_path: Path of the hot database; archives live in an "archive" folder beside it
+        """
+        self.directory = os.path.join(os.path.dirname(os.path.abspath(db_path)), ARCHIVE_DIRECTORY)
+        self._local = threading.local()  # Per-thread OrderedDict: month -> (schema, version)
+        self._versions: Dict[str, int] = {}  # Bumped when a month's file is replaced or deleted
+        self._attached_count: Dict[str, int] = {}  # Month -> connections (any thread) it is attached to
+        self._lock = threading.Lock()
+    
+    def path(self, archive: ArchiveInfo) -> str:
+        """
+        Get the uncompressed file path of an archive.
+        
+        Args:
+            archive: Archive to locate
+        
+        Returns:
+            Absolute path of the .db file
+        """
+        return os.path.join(self.directory, archive.file_name)
+    
+    def find(self, conn: sqlite3.Connection, first_day: int, last_day: int) -> List[ArchiveInfo]:
+        """
+        List the archived months overlapping a day range.
+        
+        Args:
+            conn: Connection to the hot database
+            first_day: First day number of the range
+            last_day: Last day number of the range
+        
+        Returns:
+            Overlapping archives, oldest first
+        """
+        cursor = conn.execute('''
+            SELECT first_day, last_day, month, file_name FROM archives
+            WHERE first_day <= ? AND last_day >= ?
+            ORDER BY first_day
+        ''', (last_day, first_day))
+        return [ArchiveInfo(*row) for row in cursor.fetchall()]
+    
+    def attach(self, conn: sqlite3.Connection, archive: ArchiveInfo) -> str:
+        """
+        Attach an archive read-only to the calling thread's reader connection.
+        Keeps at most MAX_ATTACHED_ARCHIVES attached, detaching the least recently used.
+        
+        Args:
+            conn: The calling thread's reader connection
+            archive: Archive to attach
+        
+        Returns:
+            Schema name to qualify the archive's tables with
+        """
+        attached = getattr(self._local, "attached", None)
+        if attached is None:
+            attached = self._local.attached = OrderedDict()
+        
+        schema = "archive_" + archive.month.replace("-", "_")
+        version = self._versions.get(archive.month, 0)
+        if attached.get(archive.month) == (schema, version):
+            attached.move_to_end(archive.month)
+            return schema
+        if archive.month in attached:
+            self._detach(conn, archive.month)
+        
+        while len(attached) >= MAX_ATTACHED_ARCHIVES:
+            self._detach(conn, next(iter(attached)))
+        
+        # Counted before the file is located, so compress_idle can't gzip it in between
+        with self._lock:
+            self._attached_count[archive.month] = self._attached_count.get(archive.month, 0) + 1
+        try:
+            path = self._ensure_decompressed(archive)
+            # Read-only: a missing file is an error instead of a new empty database
+            conn.execute("ATTACH DATABASE ? AS " + schema, (f"file:{pathname2url(path)}?mode=ro",))
+        except (OSError, sqlite3.Error):
+            self._release(archive.month)
+            raise
+        attached[archive.month] = (schema, version)
+        
+        # Record the access for compress_idle (reads don't touch the file)
+        os.utime(path)
+        return schema
+    
+    def detach_all(self, conn: sqlite3.Connection):
+        """
+        Detach every archive attached to the calling thread's reader connection.
+        
+        Args:
+            conn: The calling thread's reader connection
+        """
+        for month in list(getattr(self._local, "attached", {})):
+            self._detach(conn, month)
+    
+    def _detach(self, conn: sqlite3.Connection, month: str):
+        """Detach one month from the calling thread's reader connection."""
+        schema, _ = self._local.attached.pop(month)
+        try:
+            conn.execute("DETACH DATABASE " + schema)
+        except sqlite3.Error as e:
+            print(f"[ArchiveStore] Error detaching {month}: {e}")
+        self._release(month)
+    
+    def _release(self, month: str):
+        """Drop one attachment of a month from the cross-thread count."""
+        with self._lock:
+            count = self._attached_count.get(month, 0) - 1
+            if count > 0:
+                self._attached_count[month] = count
+            else:
+                self._attached_count.pop(month, None)
+    
+    def write(self, month: str, rows: List[Tuple[int, int, int]], app_names: Dict[int, str],
+              suffix: str = "") -> str:
+        """
+        Write a month's rows to a new archive file, replacing any file left
+        over from an interrupted run. The file is complete before it is
+        renamed into place.
+        
+        Args:
+            month: Month key ("YYYY-MM")
+            rows: (day, app_id, duration_seconds) rows of the month
+            app_names: apps.id -> name for every app_id in rows
+            suffix: Added to the file name, so a rewrite can sit beside the file it replaces
+        
+        Returns:
+            File name of the archive, relative to the archive directory
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        file_name = f"tracker-{month}{suffix}.db"
+        path = os.path.join(self.directory, file_name)
+        temp_path = path + ".tmp"
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        
+        conn = sqlite3.connect(temp_path)
+        try:
+            conn.execute('''
+                CREATE TABLE apps (
+                    id INTEGER PRIMARY KEY,
+                    name TEXT NOT NULL UNIQUE
+                )
+            ''')
+            conn.execute('''
+                CREATE TABLE usage_logs (
+                    day INTEGER NOT NULL,
+                    app_id INTEGER NOT NULL,
+                    duration_seconds INTEGER NOT NULL,
+                    PRIMARY KEY (day, app_id)
+                ) WITHOUT ROWID
+            ''')
+            conn.executemany("INSERT INTO apps (id, name) VALUES (?, ?)", app_names.items())
+            conn.executemany("INSERT INTO usage_logs (day, app_id, duration_seconds) VALUES (?, ?, ?)", rows)
+            conn.commit()
+        finally:
+            conn.close()
+        
+        with self._lock:
+            self._versions[month] = self._versions.get(month, 0) + 1
+            if os.path.exists(path + ".gz"):
+                os.remove(path + ".gz")
+            os.replace(temp_path, path)
+        return file_name
+    
+    def read_rows(self, archive: ArchiveInfo) -> List[Tuple[int, int, int]]:
+        """
+        Read every row of an archive with a private connection (no ATTACH),
+        so it can be used inside a write transaction.
+        
+        Args:
+            archive: Archive to read
+        
+        Returns:
+            List of (day, app_id, duration_seconds) rows
+        """
+        conn = sqlite3.connect(self._ensure_decompressed(archive))
+        try:
+            return conn.execute("SELECT day, app_id, duration_seconds FROM usage_logs").fetchall()
+        finally:
+            conn.close()
+    
+    def delete(self, archive: ArchiveInfo):
+        """
+        Remove an archive's files. Failures (e.g. a file still open elsewhere
+        on Windows) are logged; the file is no longer referenced either way.
+        
+        Args:
+            archive: Archive to delete
+        """
+        with self._lock:
+            self._versions[archive.month] = self._versions.get(archive.month, 0) + 1
+            path = self.path(archive)
+            for candidate in (path, path + ".gz"):
+                try:
+                    if os.path.exists(candidate):
+                        os.remove(candidate)
+                except OSError as e:
+                    print(f"[ArchiveStore] Could not remove {candidate}: {e}")
+    
+    def compress_idle(self, archives: Iterable[ArchiveInfo], idle_days: int) -> int:
+        """
+        Gzip archives whose file hasn't been read or written for idle_days.
+        Archives still attached to any thread's connection are skipped.
+        
+        Args:
+            archives: Candidate archives
+            idle_days: Minimum days since the last access
+        
+        Returns:
+            Number of archives compressed
+        """
+        threshold = time.time() - idle_days * 86400
+        compressed = 0
+        
+        for archive in archives:
+            path = self.path(archive)
+            with self._lock:
+                if (archive.month in self._attached_count or not os.path.exists(path)
+                        or os.path.getmtime(path) > threshold):
+                    continue
+                
+                try:
+                    with open(path, "rb") as source, gzip.open(path + ".gz.tmp", "wb") as target:
+                        shutil.copyfileobj(source, target)
+                    os.replace(path + ".gz.tmp", path + ".gz")
+                    os.remove(path)
+                    self._versions[archive.month] = self._versions.get(archive.month, 0) + 1
+                    compressed += 1
+                except OSError as e:
+                    print(f"[ArchiveStore] Could not compress {archive.file_name}: {e}")
+                    if os.path.exists(path + ".gz.tmp"):
+                        os.remove(path + ".gz.tmp")
+        
+        return compressed
+    
+    def _ensure_decompressed(self, archive: ArchiveInfo) -> str:
+        """
+        Get the path of an archive's .db file, gunzipping it first if needed.
+        
+        Args:
+            archive: Archive to open
+        
+        Returns:
+            Path of the uncompressed file
+        """
+        path = self.path(archive)
+        with self._lock:
+            if not os.path.exists(path) and os.path.exists(path + ".gz"):
+                with gzip.open(path + ".gz", "rb") as source, open(path + ".tmp", "wb") as target:
+                    shutil.copyfileobj(source, target)
+                os.replace(path + ".tmp", path)
+                os.remove(path + ".gz")
+                print(f"[ArchiveStore] Decompressed {archive.file_name}")
+        
+        if not os.path.exists(path):
+            raise sqlite3.OperationalError(f"Archive file missing: {path}")
+        return path
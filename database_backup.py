@@ -0,0 +1,256 @@
+"""
+Database Backup for TimeTrace Application
+Scheduled online backups of tracker.db through the SQLite backup API
+"""
+
+import os
+import queue
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from urllib.request import pathname2url
+from typing import List, Optional, Tuple
+
+
+BACKUP_DIRECTORY = "backups"
+
+# Scheduling and rotation
+BACKUP_INTERVAL_SECONDS = 24 * 60 * 60
+BACKUP_GENERATIONS = 7
+BACKUP_STARTUP_DELAY_SECONDS = 300      # Let the app settle before a due backup runs
+
+# Copy pacing: pages per backup step, and the pause after each step
+BACKUP_PAGES_PER_STEP = 256             # 1 MiB at the default 4 KiB page size
+BACKUP_STEP_SLEEP_SECONDS = 0.01
+
+
+class BackupScheduler:
+    """
+    Takes online backups of the database on a background thread, keeps the
+    newest generations and deletes older ones. DatabaseManager.backup copies
+    a consistent snapshot page-step by page-step while the writer carries on.
+    Each finished backup is checked with PRAGMA integrity_check on a second
+    thread; a backup that fails the check is renamed to *.corrupt so it never
+    counts as a good generation.
+    """
+    
+    def __init__(self, db_manager):
+        """
+        Initialize the scheduler. Call start() to take backups automatically.
+        
+        Args:
+            db_manager: DatabaseManager whose database is backed up
+        """
+        self.db_manager = db_manager
+        self.directory = os.path.join(os.path.dirname(os.path.abspath(db_manager.db_path)), BACKUP_DIRECTORY)
+        self.prefix = os.path.splitext(os.path.basename(db_manager.db_path))[0] + "-"
+        self.interval_seconds = BACKUP_INTERVAL_SECONDS
+        self.generations = BACKUP_GENERATIONS
+        self.running = False
+        self.thread = None
+        self.verifier = None
+        
+        self._wake = threading.Event()
+        self._lock = threading.Lock()
+        self._verify_queue = queue.Queue()
+        self._requested = False
+        self._busy = False
+        self._next_run = 0.0
+        
+        # Status of the last backup and of its verification
+        self.progress = (0, 0)  # (pages_copied, total_pages)
+        self.last_result: Optional[dict] = None
+        self.last_run: Optional[datetime] = None
+        self.last_verification: Optional[dict] = None
+    
+    def start(self, interval_seconds: int = BACKUP_INTERVAL_SECONDS, generations: int = BACKUP_GENERATIONS):
+        """
+        Start taking backups automatically. The first one runs once the newest
+        existing backup is interval_seconds old (at the earliest a few minutes
+        after start).
+        
+        Args:
+            interval_seconds: Time between backups
+            generations: Backups to keep
+        """
+        if self.running:
+            return
+        
+        self.interval_seconds = max(60, int(interval_seconds))
+        self.generations = max(1, int(generations))
+        backups = self.list_backups()
+        age = time.time() - os.path.getmtime(backups[0]) if backups else self.interval_seconds
+        self._next_run = time.monotonic() + max(BACKUP_STARTUP_DELAY_SECONDS, self.interval_seconds - age)
+        
+        self.running = True
+        self.verifier = threading.Thread(target=self._verify_loop, name="BackupVerifier", daemon=True)
+        self.verifier.start()
+        self.thread = threading.Thread(target=self._backup_loop, name="BackupScheduler", daemon=True)
+        self.thread.start()
+        print(f"[DatabaseBackup] Started: every {self.interval_seconds}s, keeping {self.generations} in {self.directory}")
+    
+    def stop(self):
+        """Stop the backup and verification threads, abandoning a backup in progress."""
+        if not self.running:
+            return
+        
+        self.running = False
+        self._wake.set()
+        self._verify_queue.put(None)
+        for thread in (self.thread, self.verifier):
+            if thread:
+                thread.join(timeout=10)
+        print("[DatabaseBackup] Stopped")
+    
+    def run_now(self) -> bool:
+        """
+        Request a backup on the background thread and return immediately.
+        
+        Returns:
+            True if the backup was scheduled, False if one is already pending or running
+        """
+        with self._lock:
+            if not self.running or self._busy or self._requested:
+                return False
+            self._requested = True
+        
+        self._wake.set()
+        return True
+    
+    def is_busy(self) -> bool:
+        """
+        Check whether a backup is scheduled or running.
+        
+        Returns:
+            True while a backup is pending or in progress
+        """
+        with self._lock:
+            return self._busy or self._requested
+    
+    def get_status(self) -> dict:
+        """
+        Get the state of the last backup.
+        
+        Returns:
+            Dictionary with busy, pages_copied, total_pages, last_run, last_result,
+            last_verification (path, ok, message, verified_at) and backups (newest first)
+        """
+        pages_copied, total_pages = self.progress
+        return {
+            "busy": self.is_busy(),
+            "pages_copied": pages_copied,
+            "total_pages": total_pages,
+            "last_run": self.last_run,
+            "last_result": self.last_result,
+            "last_verification": self.last_verification,
+            "backups": self.list_backups()
+        }
+    
+    def list_backups(self) -> List[str]:
+        """
+        List the backup generations on disk.
+        
+        Returns:
+            Backup file paths, newest first
+        """
+        try:
+            names = [name for name in os.listdir(self.directory)
+                     if name.startswith(self.prefix) and name.endswith(".db")]
+        except OSError:
+            return []
+        return [os.path.join(self.directory, name) for name in sorted(names, reverse=True)]
+    
+    def create_backup(self) -> dict:
+        """
+        Take one backup now on the calling thread, then delete the
+        generations beyond the newest self.generations.
+        
+        Returns:
+            Result of DatabaseManager.backup (path, pages, seconds, completed, error)
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, f"{self.prefix}{datetime.now().strftime('%Y%m%d-%H%M%S')}.db")
+        self.progress = (0, 0)
+        
+        def on_progress(pages_copied: int, total_pages: int):
+            self.progress = (pages_copied, total_pages)
+        
+        result = self.db_manager.backup(path, progress_callback=on_progress,
+                                        should_stop=lambda: self.thread is threading.current_thread() and not self.running)
+        self.last_result = result
+        self.last_run = datetime.now()
+        if result["completed"]:
+            for old_path in self.list_backups()[self.generations:]:
+                try:
+                    os.remove(old_path)
+                    print(f"[DatabaseBackup] Rotated out {os.path.basename(old_path)}")
+                except OSError as e:
+                    print(f"[DatabaseBackup] Could not delete {old_path}: {e}")
+        return result
+    
+    def _backup_loop(self):
+        """Main scheduling loop. Runs in the backup thread."""
+        while self.running:
+            self._wake.wait(timeout=max(0.0, self._next_run - time.monotonic()))
+            self._wake.clear()
+            if not self.running:
+                break
+            
+            with self._lock:
+                due = self._requested or time.monotonic() >= self._next_run
+                self._requested = False
+                self._busy = due
+            if not due:
+                continue
+            
+            try:
+                result = self.create_backup()
+                if result["completed"]:
+                    self._verify_queue.put(result["path"])
+            except Exception as e:
+                print(f"[DatabaseBackup] Error taking backup: {e}")
+            finally:
+                self._next_run = time.monotonic() + self.interval_seconds
+                with self._lock:
+                    self._busy = False
+    
+    def _verify_loop(self):
+        """Check finished backups one by one. Runs in the verifier thread."""
+        while True:
+            path = self._verify_queue.get()
+            if path is None:
+                break
+            
+            ok, message = verify_backup(path)
+            self.last_verification = {"path": path, "ok": ok, "message": message, "verified_at": datetime.now()}
+            if ok:
+                print(f"[DatabaseBackup] Verified {os.path.basename(path)}")
+                continue
+            
+            print(f"[DatabaseBackup] Backup {os.path.basename(path)} failed its integrity check: {message}")
+            try:
+                os.replace(path, path + ".corrupt")
+            except OSError as e:
+                print(f"[DatabaseBackup] Could not set aside {path}: {e}")
+
+
+def verify_backup(path: str) -> Tuple[bool, str]:
+    """
+    Run PRAGMA integrity_check on a backup file, read-only.
+    
+    Args:
+        path: Backup file path
+    
+    Returns:
+        Tuple of (ok, "ok" or the first problems reported)
+    """
+    try:
+        conn = sqlite3.connect(f"file:{pathname2url(os.path.abspath(path))}?mode=ro", uri=True)
+        try:
+            messages = [row[0] for row in conn.execute("PRAGMA integrity_check(10)")]
+        finally:
+            conn.close()
+    except sqlite3.Error as e:
+        return False, str(e)
+    return messages == ["ok"], "; ".join(messages)
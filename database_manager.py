@@ -4,312 +4,2345 @@ Handles all SQLite database operations for tracking app usage
 """
 
 import sqlite3
-from datetime import datetime
-from typing import Dict
+import threading
+import time
+from contextlib import contextmanager
+from datetime import date as date_type, datetime, timedelta
+from functools import lru_cache
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
 import os
+from database_archive import ArchiveInfo, ArchiveStore
+from database_backup import BACKUP_PAGES_PER_STEP, BACKUP_STEP_SLEEP_SECONDS, BackupScheduler
+from database_migrations import MigrationRunner
+from database_writer import DatabaseWriter
+from query_cache import FIRST_DAY, LAST_DAY, MAX_ENTRIES as QUERY_CACHE_ENTRIES, QueryCache
+
+
+# Connection tuning
+BUSY_TIMEOUT_SECONDS = 10.0        # How long a connection waits on a locked database
+STATEMENT_CACHE_SIZE = 256         # Prepared statements kept per connection
+CACHE_SIZE_KIB = 16 * 1024         # Page cache per connection (negative PRAGMA value = KiB)
+MMAP_SIZE_BYTES = 256 * 1024 * 1024
+
+UNIX_EPOCH_DATE = date_type(1970, 1, 1)
+
+# Per-day increments behind the running totals: usage_logs plus one row per
+# app for each archived month, dated on the month's last day
+_DAILY_INCREMENTS_SQL = '''
+    SELECT app_id, day, SUM(duration_seconds) AS duration_seconds
+    FROM (
+        SELECT app_id, day, duration_seconds FROM usage_logs
+        UNION ALL
+        SELECT t.app_id, a.last_day, t.duration_seconds
+        FROM archive_totals t
+        JOIN archives a ON a.first_day = t.first_day
+    )
+    GROUP BY app_id, day
+'''
+
+# Retention purge pacing
+RETENTION_CHUNK_ROWS = 500             # usage_logs rows deleted per transaction
+RETENTION_CHUNK_PAUSE_SECONDS = 0.05   # Gap between chunks so queued writes get the lock
+VACUUM_STEP_PAGES = 256                # Pages returned to the OS per incremental_vacuum step
+
+ARCHIVE_COMPRESS_IDLE_DAYS = 30        # Archives untouched this long are gzipped by compress_archives
+
+# Multi-resolution storage: minute buckets roll into hourly ones, which are
+# dropped once only the (permanent) daily rows are needed
+TIERS = ("minute", "hour", "day")      # Finest first
+MINUTE_TIER_DAYS = 3                   # Days of minute buckets kept before rolling into hours
+HOUR_TIER_DAYS = 90                    # Days of hourly buckets kept
+COMPACTION_CHUNK_ROWS = 5000           # usage_minutes rows rolled up per transaction
+
+# Change log: rows kept for consumers that fall behind (older ones need a
+# resync), and the default page size of get_changes_since
+CHANGE_LOG_MAX_ROWS = 500000
+CHANGE_BATCH_ROWS = 10000
+
+# Device name under which a merge target keeps its own (monitored) usage
+LOCAL_DEVICE = "(local)"
+
+# Rows fetched per step by the streaming iter_* readers
+STREAM_BATCH_ROWS = 1000
+
+# Sessions are split at midnight, so none is longer than a day; overlap
+# queries use that bound to stay on the (start_ts, app_id) index
+MAX_SESSION_SECONDS = 86400
+
+
+class ConnectionManager:
+    """
+    Owns the SQLite connections used by DatabaseManager.
+    Keeps one long-lived writer connection (serialized by a lock) and one
+    reader connection per thread, so callers never pay connect/close per query.
+    """
+    
+    def __init__(self, db_path: str):
+        """
+        Initialize the connection manager. Connections are opened lazily.
+        
+        Args:
+            db_path: Path to SQLite database file
+        """
+        self.db_path = db_path
+        self._write_lock = threading.RLock()
+        self._writer = None
+        self._local = threading.local()
+        self._readers = []  # Every reader connection handed out, closed in close()
+        self._readers_lock = threading.Lock()
+        self._closed = False
+    
+    def _open_connection(self) -> sqlite3.Connection:
+        """
+        Open a tuned connection in autocommit mode (transactions are explicit).
+        
+        Returns:
+            New sqlite3 connection
+        """
+        if self._closed:
+            raise sqlite3.ProgrammingError("Connection manager is closed")
+        
+        conn = sqlite3.connect(
+            self.db_path,
+            timeout=BUSY_TIMEOUT_SECONDS,
+            isolation_level=None,
+            check_same_thread=False,  # close() may run on another thread
+            cached_statements=STATEMENT_CACHE_SIZE,
+            uri=True  # Archives are attached with read-only "file:" URIs
+        )
+        conn.execute("PRAGMA auto_vacuum=INCREMENTAL")  # Applies to new files, and to old ones on VACUUM
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")  # Safe in WAL mode, no fsync per commit
+        conn.execute(f"PRAGMA cache_size=-{CACHE_SIZE_KIB}")
+        conn.execute(f"PRAGMA mmap_size={MMAP_SIZE_BYTES}")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        return conn
+    
+    @contextmanager
+    def write(self):
+        """
+        Run a block inside a transaction on the writer connection.
+        Commits on success, rolls back on any exception.
+        
+        Yields:
+            Cursor on the writer connection
+        """
+        with self._write_lock:
+            if self._writer is None:
+                self._writer = self._open_connection()
+            
+            cursor = self._writer.cursor()
+            cursor.execute("BEGIN IMMEDIATE")
+            try:
+                yield cursor
+                self._writer.commit()
+            except BaseException:
+                self._writer.rollback()
+                raise
+            finally:
+                cursor.close()
+    
+    @contextmanager
+    def attached(self, path: str, schema: str):
+        """
+        Attach another database file to the writer connection for the block.
+        The write lock is held throughout, so transactions opened with write()
+        inside the block see the attachment and nothing else runs in between.
+        
+        Args:
+            path: Database file to attach
+            schema: Schema name to qualify its tables with
+        """
+        with self._write_lock:
+            if self._writer is None:
+                self._writer = self._open_connection()
+            self._writer.execute(f"ATTACH DATABASE ? AS {schema}", (path,))
+            try:
+                yield
+            finally:
+                self._writer.execute(f"DETACH DATABASE {schema}")
+    
+    def vacuum(self):
+        """Rebuild the database file to reclaim free pages (runs outside any transaction)."""
+        with self._write_lock:
+            if self._writer is None:
+                self._writer = self._open_connection()
+            self._writer.execute("VACUUM")
+    
+    def incremental_vacuum(self, pages: int) -> int:
+        """
+        Release up to `pages` free pages and truncate the file (auto_vacuum=INCREMENTAL).
+        
+        Args:
+            pages: Maximum number of pages to free in this step
+        
+        Returns:
+            Number of pages actually freed
+        """
+        with self._write_lock:
+            if self._writer is None:
+                self._writer = self._open_connection()
+            before = self._writer.execute("PRAGMA freelist_count").fetchone()[0]
+            # executescript steps the pragma to completion; execute() frees one page
+            self._writer.executescript(f"PRAGMA incremental_vacuum({int(pages)})")
+            return before - self._writer.execute("PRAGMA freelist_count").fetchone()[0]
+    
+    def backup(self, target_path: str, pages: int, sleep: float,
+               progress: Optional[Callable[[int, int], None]] = None,
+               should_stop: Optional[Callable[[], bool]] = None):
+        """
+        Copy the database into a new file with the SQLite backup API, a few
+        pages per step. A dedicated connection holds one read transaction for
+        the whole copy: the copy is the snapshot taken at its start, and
+        commits made meanwhile neither restart it nor wait for it (WAL).
+        
+        Args:
+            target_path: File to write (overwritten)
+            pages: Pages copied per step
+            sleep: Seconds to pause after each step
+            progress: Called after each step as (pages_copied, total_pages)
+            should_stop: Checked after each step; the copy is abandoned once it returns True
+        
+        Raises:
+            sqlite3.OperationalError: If the copy fails or is abandoned
+        """
+        source = self._open_connection()
+        target = sqlite3.connect(target_path)
+        try:
+            source.execute("BEGIN")
+            source.execute("SELECT COUNT(*) FROM sqlite_master").fetchone()  # Starts the read snapshot
+            
+            def on_step(status: int, remaining: int, total: int):
+                if progress:
+                    progress(total - remaining, total)
+                if remaining and should_stop and should_stop():
+                    raise sqlite3.OperationalError("backup cancelled")
+                if remaining:
+                    time.sleep(sleep)  # backup(sleep=...) only applies to busy retries
+            
+            source.backup(target, pages=pages, progress=on_step)
+            target.execute("PRAGMA journal_mode=DELETE")  # A standalone file, no -wal beside it
+        finally:
+            target.close()
+            source.close()
+    
+    def set_trace_callback(self, callback: Optional[Callable[[str], None]]):
+        """
+        Install an SQL trace callback on the writer and the calling thread's reader.
+        
+        Args:
+            callback: Function receiving each executed statement, or None to remove it
+        """
+        with self._write_lock:
+            if self._writer is None:
+                self._writer = self._open_connection()
+            self._writer.set_trace_callback(callback)
+        self.read().set_trace_callback(callback)
+    
+    def read(self) -> sqlite3.Connection:
+        """
+        Get the calling thread's reader connection, opening it on first use.
+        
+        Returns:
+            sqlite3 connection owned by the current thread
+        """
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._open_connection()
+            self._local.conn = conn
+            with self._readers_lock:
+                self._readers.append(conn)
+        return conn
+    
+    def close(self):
+        """Close the writer and every reader connection."""
+        with self._write_lock:
+            self._closed = True
+            if self._writer is not None:
+                try:
+                    # Fold the WAL back into the main file on clean shutdown
+                    self._writer.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+                except sqlite3.Error:
+                    pass
+                self._writer.close()
+                self._writer = None
+        
+        with self._readers_lock:
+            for conn in self._readers:
+                try:
+                    conn.close()
+                except sqlite3.Error:
+                    pass
+            self._readers.clear()
 
 
 class DatabaseManager:
     """
     Manages SQLite database for storing application usage logs.
-    Thread-safe with proper connection handling.
+    Thread-safe: writes go through a single locked writer connection,
+    reads use a per-thread connection.
     """
     
-    def __init__(self, db_path: str = "tracker.db"):
+    def __init__(self, db_path: str = "tracker.db", auto_migrate: bool = True,
+                 cache_entries: int = QUERY_CACHE_ENTRIES):
+        """
+        Initialize database manager and create tables if needed.
+        
+        Args:
+            db_path: Path to SQLite database file
+            auto_migrate: Apply pending schema migrations on open
+            cache_entries: Query results kept in the read cache (0 disables it)
+        """
+        self.db_path = db_path
+        self.connections = ConnectionManager(db_path)
+        
+        # Archived months live in separate files, attached when a query needs them
+        self.archives = ArchiveStore(db_path)
+        
+        # Read results, invalidated by the day ranges each commit touched
+        self.cache = QueryCache(cache_entries)
+        self._written_ranges: List[Tuple[Optional[int], Optional[int]]] = []
+        
+        if auto_migrate:
+            self._init_database()
+        
+        # Background writer for queued (non-blocking) writes
+        self.writer = DatabaseWriter(self)
+        self.writer.start()
+        
+        # Online backups, taken on a schedule once start_backups() is called
+        self.backups = BackupScheduler(self)
+    
+    def _init_database(self):
+        """Create database tables if they don't exist and apply pending migrations."""
+        try:
+            MigrationRunner(self).run()
+            print(f"[DatabaseManager] Database initialized: {self.db_path}")
+        
+        except sqlite3.Error as e:
+            print(f"[DatabaseManager] Error initializing database: {e}")
+            raise
+    
+    def close(self):
+        """Flush queued writes and close all database connections. Safe to call more than once."""
+        self.backups.stop()
+        self.writer.stop()
+        self.connections.close()
+        print("[DatabaseManager] Database connections closed")
+    
+    def update_duration(self, app_name: str, date: str, seconds_to_add: int):
+        """
+        Add duration to an existing record or create a new one.
+        
+        Args:
+            app_name: Name of the application (e.g., "chrome.exe")
+            date: Date in YYYY-MM-DD format
+            seconds_to_add: Number of seconds to add to the duration
+        """
+        self.update_durations([(app_name, date, seconds_to_add)])
+    
+    def update_durations(self, batch: Iterable[Tuple[str, str, int]]) -> bool:
+        """
+        Add many durations in a single transaction.
+        Each row is upserted atomically, so there is no read-modify-write race.
+        
+        Args:
+            batch: Iterable of (app_name, date, seconds_to_add) tuples
+        
+        Returns:
+            True if the batch was committed, False on error
+        """
+        rows = [(app_name, date, seconds) for app_name, date, seconds in batch if seconds > 0]
+        if not rows:
+            return True
+        
+        try:
+            with self._write_transaction() as cursor:
+                self._apply_increments(cursor, rows)
+            return True
+        
+        except sqlite3.Error as e:
+            print(f"[DatabaseManager] Error updating durations for {len(rows)} apps: {e}")
+            return False
+    
+    def enqueue_durations(self, batch: Iterable[Tuple[str, str, int]],
+                          timeout: Optional[float] = None) -> bool:
+        """
+        Queue duration increments for the background writer and return immediately.
+        Blocks only when the write queue is full (back-pressure).
+        
+        Args:
+            batch: Iterable of (app_name, date, seconds_to_add) tuples
+            timeout: Maximum seconds to wait for queue space
+        
+        Returns:
+            True if queued, False if the writer could not accept the batch
+        """
+        return self.writer.submit_increments(batch, timeout=timeout)
+    
+    def update_samples(self, batch: Iterable[Tuple[str, str, int]]) -> bool:
+        """
+        Add per-minute usage samples in a single transaction.
+        Samples feed the minute tier and the daily totals alike.
+        
+        Args:
+            batch: Iterable of (app_name, minute, seconds_to_add) tuples,
+                   minute in "YYYY-MM-DD HH:MM" format (local time)
+        
+        Returns:
+            True if the batch was committed, False on error
+        """
+        rows = [(app_name, minute, seconds) for app_name, minute, seconds in batch if seconds > 0]
+        if not rows:
+            return True
+        
+        try:
+            with self._write_transaction() as cursor:
+                self._apply_samples(cursor, rows)
+            return True
+        
+        except sqlite3.Error as e:
+            print(f"[DatabaseManager] Error updating samples for {len(rows)} apps: {e}")
+            return False
+    
+    def enqueue_samples(self, batch: Iterable[Tuple[str, str, int]],
+                        timeout: Optional[float] = None,
+                        journal_sequence: Optional[int] = None) -> bool:
+        """
+        Queue per-minute usage samples for the background writer and return immediately.
+        
+        Args:
+            batch: Iterable of (app_name, minute, seconds_to_add) tuples,
+                   minute in "YYYY-MM-DD HH:MM" format (local time)
+            timeout: Maximum seconds to wait for queue space
+            journal_sequence: UsageJournal batch these samples come from; it is
+                              recorded in the same transaction (see get_journal_sequence)
+        
+        Returns:
+            True if queued, False if the writer could not accept the batch
+        """
+        return self.writer.submit_samples(batch, timeout=timeout, journal_sequence=journal_sequence)
+    
+    def get_journal_sequence(self) -> int:
+        """
+        Get the last usage journal batch committed to the database.
+        
+        Returns:
+            Batch sequence number (0 if none)
+        """
+        try:
+            row = self.connections.read().execute("SELECT sequence FROM journal_state WHERE id = 1").fetchone()
+            return row[0] if row else 0
+        except sqlite3.Error as e:
+            print(f"[DatabaseManager] Error reading journal sequence: {e}")
+            return 0
+    
+    def _mark_journal(self, cursor: sqlite3.Cursor, sequence: int):
+        """
+        Record a usage journal batch as committed, inside the transaction that writes it.
+        
+        Args:
+            cursor: Cursor on the writer connection with an open transaction
+            sequence: Batch sequence number
+        """
+        cursor.execute('''
+            INSERT INTO journal_state (id, sequence) VALUES (1, ?)
+            ON CONFLICT(id) DO UPDATE SET sequence = MAX(sequence, excluded.sequence)
+        ''', (sequence,))
+    
+    def update_sessions(self, batch: Iterable[Tuple[str, str, str]]) -> bool:
+        """
+        Store closed sessions in a single transaction.
+        
+        Args:
+            batch: Iterable of (app_name, start, end) tuples, times in
+                   "YYYY-MM-DD HH:MM:SS" format (local time), end after start
+        
+        Returns:
+            True if the batch was committed, False on error
+        """
+        rows = [(app_name, start, end) for app_name, start, end in batch if end > start]
+        if not rows:
+            return True
+        
+        try:
+            with self._write_transaction() as cursor:
+                self._apply_sessions(cursor, rows)
+            return True
+        
+        except sqlite3.Error as e:
+            print(f"[DatabaseManager] Error storing {len(rows)} sessions: {e}")
+            return False
+    
+    def enqueue_sessions(self, batch: Iterable[Tuple[str, str, str]],
+                         timeout: Optional[float] = None) -> bool:
+        """
+        Queue closed sessions for the background writer and return immediately.
+        
+        Args:
+            batch: Iterable of (app_name, start, end) tuples, times in
+                   "YYYY-MM-DD HH:MM:SS" format (local time), end after start
+            timeout: Maximum seconds to wait for queue space
+        
+        Returns:
+            True if queued, False if the writer could not accept the batch
+        """
+        return self.writer.submit_sessions(batch, timeout=timeout)
+    
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wait until every queued write has been committed.
+        
+        Args:
+            timeout: Maximum seconds to wait
+        
+        Returns:
+            True if all queued writes were committed in time, False on timeout or a failed commit
+        """
+        return self.writer.flush(timeout=timeout)
+    
+    @contextmanager
+    def _write_transaction(self):
+        """
+        Run a block inside a write transaction, then evict the cached results
+        for the days it wrote. Eviction happens only after the commit, so a
+        reader can never cache the pre-commit state after the eviction.
+        
+        Yields:
+            Cursor on the writer connection
+        """
+        written: List[Tuple[Optional[int], Optional[int]]] = []
+        with self.connections.write() as cursor:
+            self._written_ranges = written
+            yield cursor
+        self.cache.invalidate(written)
+    
+    def _apply_increments(self, cursor: sqlite3.Cursor, rows: List[Tuple[str, str, int]]):
+        """
+        Apply (app_name, date, seconds) increments inside the caller's transaction.
+        Increments to the same app and day are summed first, and every table
+        is written with one executemany, so large batches (imports) stay fast.
+        
+        Args:
+            cursor: Cursor on the writer connection with an open transaction
+            rows: List of (app_name, date, seconds_to_add) tuples
+        """
+        app_ids = self._get_app_ids(cursor, {app_name for app_name, _, _ in rows})
+        totals: Dict[Tuple[int, int], int] = {}
+        for app_name, date, seconds in rows:
+            key = (app_ids[app_name], day_number(date))
+            totals[key] = totals.get(key, 0) + seconds
+        encoded = sorted((app_id, day, seconds) for (app_id, day), seconds in totals.items())
+        self._written_ranges.extend((day, day) for day in {day for _, day in totals})
+        
+        cursor.executemany('''
+            INSERT INTO usage_logs (app_id, day, duration_seconds)
+            VALUES (?, ?, ?)
+            ON CONFLICT(day, app_id) DO UPDATE
+            SET duration_seconds = duration_seconds + excluded.duration_seconds
+        ''', encoded)
+        self._record_changes(cursor, [(day, app_id, seconds) for app_id, day, seconds in encoded])
+        
+        # Keep the running totals in step. First the stored ones: each gets the
+        # app's increments up to its day, added once per stretch between two
+        # increments. Then the days that had none, in day order, each from the
+        # (already updated or just inserted) total before it plus its increment
+        steps = []
+        for index, (app_id, day, seconds) in enumerate(encoded):
+            running = seconds if not steps or steps[-1][0] != app_id else steps[-1][3] + seconds
+            following = encoded[index + 1] if index + 1 < len(encoded) else None
+            next_day = following[1] if following and following[0] == app_id else LAST_DAY
+            steps.append((app_id, day, next_day, running))
+        cursor.executemany('''
+            UPDATE usage_cumulative SET cumulative_seconds = cumulative_seconds + ?4
+            WHERE app_id = ?1 AND day >= ?2 AND day < ?3
+        ''', steps)
+        cursor.executemany('''
+            INSERT INTO usage_cumulative (app_id, day, cumulative_seconds)
+            VALUES (?1, ?2, ?3 + COALESCE((SELECT cumulative_seconds FROM usage_cumulative
+                                           WHERE app_id = ?1 AND day < ?2
+                                           ORDER BY day DESC LIMIT 1), 0))
+            ON CONFLICT(app_id, day) DO NOTHING
+        ''', encoded)
+    
+    def _record_changes(self, cursor: sqlite3.Cursor, rows: Iterable[Tuple[int, int, int]]):
+        """
+        Append daily total changes to the change log inside the caller's transaction.
+        
+        Args:
+            cursor: Cursor on the writer connection with an open transaction
+            rows: (day, app_id, delta_seconds) tuples; negative deltas for removals
+        """
+        cursor.executemany("INSERT INTO usage_changes (day, app_id, delta) VALUES (?, ?, ?)",
+                           [(day, app_id, delta) for day, app_id, delta in rows if delta])
+    
+    def _apply_samples(self, cursor: sqlite3.Cursor, rows: List[Tuple[str, str, int]]):
+        """
+        Apply (app_name, minute, seconds) samples inside the caller's transaction:
+        into the minute tier, and summed per day into the daily tables.
+        
+        Args:
+            cursor: Cursor on the writer connection with an open transaction
+            rows: List of (app_name, minute, seconds_to_add) tuples
+        """
+        app_ids = self._get_app_ids(cursor, {app_name for app_name, _, _ in rows})
+        cursor.executemany('''
+            INSERT INTO usage_minutes (minute, app_id, duration_seconds)
+            VALUES (?, ?, ?)
+            ON CONFLICT(minute, app_id) DO UPDATE
+            SET duration_seconds = duration_seconds + excluded.duration_seconds
+        ''', [(_minute_number(minute), app_ids[app_name], seconds) for app_name, minute, seconds in rows])
+        
+        daily: Dict[Tuple[str, str], int] = {}
+        for app_name, minute, seconds in rows:
+            daily[(app_name, minute[:10])] = daily.get((app_name, minute[:10]), 0) + seconds
+        self._apply_increments(cursor, [(app_name, date, seconds) for (app_name, date), seconds in daily.items()])
+    
+    def _apply_sessions(self, cursor: sqlite3.Cursor, rows: List[Tuple[str, str, str]]):
+        """
+        Insert (app_name, start, end) sessions inside the caller's transaction,
+        split at midnight. A session that starts where a stored one of the
+        same app starts extends it.
+        
+        Args:
+            cursor: Cursor on the writer connection with an open transaction
+            rows: List of (app_name, start, end) tuples
+        """
+        app_ids = self._get_app_ids(cursor, {app_name for app_name, _, _ in rows})
+        encoded = []
+        for app_name, start, end in rows:
+            start_ts, end_ts = _second_number(start), _second_number(end)
+            while start_ts < end_ts:
+                part_end = min(end_ts, (start_ts // MAX_SESSION_SECONDS + 1) * MAX_SESSION_SECONDS)
+                encoded.append((start_ts, app_ids[app_name], part_end))
+                start_ts = part_end
+        self._written_ranges.extend((start_ts // 86400, end_ts // 86400) for start_ts, _, end_ts in encoded)
+        
+        cursor.executemany('''
+            INSERT INTO sessions (start_ts, app_id, end_ts)
+            VALUES (?, ?, ?)
+            ON CONFLICT(start_ts, app_id) DO UPDATE
+            SET end_ts = MAX(end_ts, excluded.end_ts)
+        ''', encoded)
+    
+    def _get_app_ids(self, cursor: sqlite3.Cursor, app_names: Iterable[str]) -> Dict[str, int]:
+        """
+        Look up dictionary IDs for app names, registering unknown names.
+        
+        Args:
+            cursor: Cursor on the writer connection with an open transaction
+            app_names: App names to resolve
+        
+        Returns:
+            Dictionary mapping app_name to its apps.id
+        """
+        app_names = list(app_names)
+        cursor.executemany("INSERT OR IGNORE INTO apps (name) VALUES (?)", [(name,) for name in app_names])
+        cursor.execute(f"SELECT name, id FROM apps WHERE name IN ({', '.join('?' * len(app_names))})",
+                       app_names)
+        return dict(cursor.fetchall())
+    
+    def _cached(self, key: tuple, start_date: Optional[str], end_date: Optional[str],
+                query: Callable[[], object]):
+        """
+        Serve a read from the query cache, running and caching it on a miss.
+        
+        Args:
+            key: Query name and parameters
+            start_date: First date the result depends on (None for every day)
+            end_date: Last date the result depends on (None for every day)
+            query: Function computing the result; sqlite3.Error propagates uncached
+        
+        Returns:
+            A copy of the result, safe for the caller to modify
+        """
+        found, value = self.cache.get(key)
+        if not found:
+            generation = self.cache.generation
+            value = query()
+            self.cache.put(key,
+                           FIRST_DAY if start_date is None else day_number(start_date),
+                           LAST_DAY if end_date is None else day_number(end_date),
+                           value, generation)
+        return _copy_result(value)
+    
+    def get_cache_stats(self) -> dict:
+        """
+        Get query cache statistics.
+        
+        Returns:
+            Dictionary with size, hits, misses, hit_rate, evictions and invalidations
+        """
+        return self.cache.stats()
+    
+    def get_today_stats(self) -> Dict[str, int]:
+        """
+        Get usage statistics for today.
+        
+        Returns:
+            Dictionary mapping app_name to duration_seconds for today
+            Example: {"chrome.exe": 3600, "valorant.exe": 7200}
+        """
+        today = datetime.now().strftime("%Y-%m-%d")
+        return self.get_stats_for_date(today)
+    
+    def get_week_stats(self) -> Dict[str, int]:
+        """
+        Get usage statistics for the past 7 days.
+        
+        Returns:
+            Dictionary mapping app_name to total duration_seconds
+        """
+        end_date = datetime.now().strftime("%Y-%m-%d")
+        start_date = (datetime.now() - timedelta(days=6)).strftime("%Y-%m-%d")
+        return self.get_stats_for_date_range(start_date, end_date)
+    
+    def get_month_stats(self) -> Dict[str, int]:
+        """
+        Get usage statistics for the past 30 days.
+        
+        Returns:
+            Dictionary mapping app_name to total duration_seconds
+        """
+        end_date = datetime.now().strftime("%Y-%m-%d")
+        start_date = (datetime.now() - timedelta(days=29)).strftime("%Y-%m-%d")
+        return self.get_stats_for_date_range(start_date, end_date)
+    
+    def get_stats_for_date_range(self, start_date: str, end_date: str) -> Dict[str, int]:
+        """
+        Get usage statistics for a date range, including archived months.
+        Uses the running totals, so cost is two index lookups per app
+        regardless of how long the range is. Edges that fall inside an
+        archived month are summed from that month's archive instead.
+        
+        Args:
+            start_date: Start date in YYYY-MM-DD format
+            end_date: End date in YYYY-MM-DD format
+        
+        Returns:
+            Dictionary mapping app_name to total duration_seconds
+        """
+        def query():
+            conn = self.connections.read()
+            first_day, last_day = day_number(start_date), day_number(end_date)
+            totals: Dict[str, int] = {}
+            
+            # Archived months only keep a running-total checkpoint at their last
+            # day, so split off range edges that cut into one and sum their rows
+            edges = []
+            for archive in self.archives.find(conn, first_day, last_day):
+                if archive.first_day < first_day <= archive.last_day:
+                    edges.append((first_day, min(last_day, archive.last_day)))
+                    first_day = min(last_day, archive.last_day) + 1
+                if first_day <= last_day and archive.first_day <= last_day < archive.last_day:
+                    edges.append((max(first_day, archive.first_day), last_day))
+                    last_day = max(first_day, archive.first_day) - 1
+            
+            if first_day <= last_day:
+                # Filtering and sorting happen in Python: a WHERE/ORDER BY on the
+                # computed total would make SQLite evaluate the lookups twice
+                cursor = conn.execute('''
+                    SELECT a.name,
+                        COALESCE((SELECT cumulative_seconds FROM usage_cumulative c
+                                  WHERE c.app_id = a.id AND c.day <= ?
+                                  ORDER BY c.day DESC LIMIT 1), 0)
+                        - COALESCE((SELECT cumulative_seconds FROM usage_cumulative c
+                                    WHERE c.app_id = a.id AND c.day < ?
+                                    ORDER BY c.day DESC LIMIT 1), 0)
+                    FROM apps a
+                ''', (last_day, first_day))
+                _add_totals(totals, cursor.fetchall())
+            
+            for edge_first, edge_last in edges:
+                _add_totals(totals, self._query_logs(lambda logs: f'''
+                    SELECT a.name, SUM(l.duration_seconds)
+                    FROM {logs} l
+                    JOIN apps a ON a.id = l.app_id
+                    WHERE l.day >= ? AND l.day <= ?
+                    GROUP BY l.app_id
+                ''', edge_first, edge_last))
+            
+            return dict(sorted(((name, total) for name, total in totals.items() if total > 0),
+                               key=lambda row: row[1], reverse=True))
+        
+        try:
+            return self._cached(("stats_for_date_range", start_date, end_date),
+                                start_date, end_date, query)
+        except sqlite3.Error as e:
+            print(f"[DatabaseManager] Error getting date range stats: {e}")
+            return {}
+    
+    def get_daily_totals(self, start_date: str, end_date: str,
+                         apps: Optional[Iterable[str]] = None) -> Dict[str, int]:
+        """
+        Get total usage per day for a date range with a single query
+        (plus one per archived month in the range).
+        Days without usage are included with 0.
+        
+        Args:
+            start_date: Start date in YYYY-MM-DD format
+            end_date: End date in YYYY-MM-DD format
+            apps: Optional app names to restrict the totals to
+        
+        Returns:
+            Dictionary mapping every date in the range (in order) to duration_seconds
+        """
+        apps = None if apps is None else tuple(apps)
+        app_filter, params = _app_filter_clause(apps)
+        
+        def query():
+            series = {date: 0 for date in _date_range(start_date, end_date)}
+            rows = self._query_logs(lambda logs: f'''
+                SELECT day, SUM(duration_seconds)
+                FROM {logs}
+                WHERE day >= ? AND day <= ?{app_filter}
+                GROUP BY day
+            ''', day_number(start_date), day_number(end_date), params)
+            
+            for day, total in rows:
+                series[day_string(day)] += total
+            return series
+        
+        try:
+            return self._cached(("daily_totals", start_date, end_date, apps),
+                                start_date, end_date, query)
+        except sqlite3.Error as e:
+            print(f"[DatabaseManager] Error getting daily totals: {e}")
+            return {date: 0 for date in _date_range(start_date, end_date)}
+    
+    def get_daily_app_totals(self, start_date: str, end_date: str,
+                             apps: Optional[Iterable[str]] = None) -> Dict[str, Dict[str, int]]:
+        """
+        Get usage per app per day for a date range with a single query
+        (plus one per archived month in the range).
+        Every app series covers the whole range, zero-filled.
+        
+        Args:
+            start_date: Start date in YYYY-MM-DD format
+            end_date: End date in YYYY-MM-DD format
+            apps: Optional app names to restrict the result to
+        
+        Returns:
+            Dictionary mapping app_name to {date: duration_seconds} for every date in the range
+        """
+        apps = None if apps is None else tuple(apps)
+        app_filter, params = _app_filter_clause(apps)
+        
+        def query():
+            dates = _date_range(start_date, end_date)
+            series: Dict[str, Dict[str, int]] = {}
+            rows = self._query_logs(lambda logs: f'''
+                SELECT l.day, a.name, l.duration_seconds
+                FROM {logs} l
+                JOIN apps a ON a.id = l.app_id
+                WHERE l.day >= ? AND l.day <= ?{app_filter}
+            ''', day_number(start_date), day_number(end_date), params)
+            
+            for day, app_name, seconds in rows:
+                if app_name not in series:
+                    series[app_name] = dict.fromkeys(dates, 0)
+                series[app_name][day_string(day)] += seconds
+            return series
+        
+        try:
+            return self._cached(("daily_app_totals", start_date, end_date, apps),
+                                start_date, end_date, query)
+        except sqlite3.Error as e:
+            print(f"[DatabaseManager] Error getting daily app totals: {e}")
+            return {}
+    
+    def get_stats_for_date(self, date: str) -> Dict[str, int]:
+        """
+        Get usage statistics for a specific date.
+        
+        Args:
+            date: Date in YYYY-MM-DD format
+        
+        Returns:
+            Dictionary mapping app_name to duration_seconds
+        """
+        def query():
+            day = day_number(date)
+            totals: Dict[str, int] = {}
+            _add_totals(totals, self._query_logs(lambda logs: f'''
+                SELECT a.name, l.duration_seconds
+                FROM {logs} l
+                JOIN apps a ON a.id = l.app_id
+                WHERE l.day >= ? AND l.day <= ?
+            ''', day, day))
+            
+            return dict(sorted(totals.items(), key=lambda row: row[1], reverse=True))
+        
+        try:
+            return self._cached(("stats_for_date", date), date, date, query)
+        except sqlite3.Error as e:
+            print(f"[DatabaseManager] Error getting stats for {date}: {e}")
+            return {}
+    
+    def _query_logs(self, build_sql: Callable[[str], str], first_day: int, last_day: int,
+                    params: Iterable = ()) -> list:
+        """
+        Run a usage_logs query over a day range on the hot database and on
+        every archived month the range overlaps. Archived months are queried
+        on their own, so callers merge the rows (days never span two files,
+        but late writes for an archived month stay in the hot table).
+        
+        Args:
+            build_sql: Function returning the query for a given usage_logs
+                       table reference; its first two parameters must be the
+                       first and last day of the range
+            first_day: First day number of the range
+            last_day: Last day number of the range
+            params: Extra parameters after the day range
+        
+        Returns:
+            Rows from all partitions, hot database first
+        """
+        conn = self.connections.read()
+        params = tuple(params)
+        rows = conn.execute(build_sql("usage_logs"), (first_day, last_day, *params)).fetchall()
+        
+        for archive in self.archives.find(conn, first_day, last_day):
+            schema = self.archives.attach(conn, archive)
+            rows.extend(conn.execute(build_sql(f"{schema}.usage_logs"),
+                                     (max(first_day, archive.first_day),
+                                      min(last_day, archive.last_day), *params)).fetchall())
+        return rows
+    
+    def get_timeline(self, start: str, end: str, apps: Optional[Iterable[str]] = None,
+                     resolution: Optional[str] = None) -> Dict:
+        """
+        Get total usage over time, bucketed at the finest tier that still
+        covers the start of the range: minutes for the last few days, hours
+        for the last few months, days before that. Empty buckets are included with 0.
+        
+        Args:
+            start: Start as "YYYY-MM-DD" or "YYYY-MM-DD HH:MM"
+            end: End (inclusive) as "YYYY-MM-DD" (whole day) or "YYYY-MM-DD HH:MM"
+            apps: Optional app names to restrict the totals to
+            resolution: Force "minute", "hour" or "day" instead of picking one
+        
+        Returns:
+            Dictionary with "resolution" and "series", which maps every bucket
+            label ("YYYY-MM-DD HH:MM", "YYYY-MM-DD HH:00" or "YYYY-MM-DD") in order to duration_seconds
+        """
+        if resolution is not None and resolution not in TIERS:
+            raise ValueError(f"Unknown resolution: {resolution}")
+        apps = None if apps is None else tuple(apps)
+        app_filter, params = _app_filter_clause(apps)
+        first_minute = _minute_number(start if len(start) > 10 else start + " 00:00")
+        last_minute = _minute_number(end if len(end) > 10 else end + " 23:59")
+        
+        def query():
+            conn = self.connections.read()
+            tier = resolution or self._finest_tier(conn, first_minute)
+            
+            if tier == "minute":
+                series = {_minute_string(minute): 0 for minute in range(first_minute, last_minute + 1)}
+                cursor = conn.execute(f'''
+                    SELECT minute, SUM(duration_seconds)
+                    FROM usage_minutes
+                    WHERE minute >= ? AND minute <= ?{app_filter}
+                    GROUP BY minute
+                ''', (first_minute, last_minute, *params))
+                for minute, total in cursor.fetchall():
+                    series[_minute_string(minute)] += total
+            
+            elif tier == "hour":
+                # Recent hours are still minute buckets until the compactor rolls them up
+                first_hour, last_hour = first_minute // 60, last_minute // 60
+                series = {_minute_string(hour * 60)[:14] + "00": 0 for hour in range(first_hour, last_hour + 1)}
+                cursor = conn.execute(f'''
+                    SELECT hour, SUM(duration_seconds)
+                    FROM usage_hours
+                    WHERE hour >= ? AND hour <= ?{app_filter}
+                    GROUP BY hour
+                    UNION ALL
+                    SELECT minute / 60, SUM(duration_seconds)
+                    FROM usage_minutes
+                    WHERE minute >= ? AND minute <= ?{app_filter}
+                    GROUP BY minute / 60
+                ''', (first_hour, last_hour, *params, first_hour * 60, last_hour * 60 + 59, *params))
+                for hour, total in cursor.fetchall():
+                    series[_minute_string(hour * 60)[:14] + "00"] += total
+            
+            else:
+                first_day, last_day = first_minute // 1440, last_minute // 1440
+                series = {day_string(day): 0 for day in range(first_day, last_day + 1)}
+                for day, total in self._query_logs(lambda logs: f'''
+                    SELECT day, SUM(duration_seconds)
+                    FROM {logs}
+                    WHERE day >= ? AND day <= ?{app_filter}
+                    GROUP BY day
+                ''', first_day, last_day, params):
+                    series[day_string(day)] += total
+            
+            return {"resolution": tier, "series": series}
+        
+        try:
+            return self._cached(("timeline", start, end, apps, resolution),
+                                start[:10], end[:10], query)
+        except sqlite3.Error as e:
+            print(f"[DatabaseManager] Error getting timeline: {e}")
+            return {"resolution": resolution or "day", "series": {}}
+    
+    def _finest_tier(self, conn: sqlite3.Connection, first_minute: int) -> str:
+        """
+        Pick the finest tier whose data still reaches back to first_minute.
+        
+        Args:
+            conn: Reader connection
+            first_minute: First minute number of the requested range
+        
+        Returns:
+            "minute", "hour" or "day"
+        """
+        coverage = dict(conn.execute("SELECT tier, first_bucket FROM storage_tiers").fetchall())
+        if first_minute >= coverage.get("minute", LAST_DAY):
+            return "minute"
+        if first_minute // 60 >= coverage.get("hour", LAST_DAY):
+            return "hour"
+        return "day"
+    
+    def get_tier_coverage(self) -> Dict[str, Optional[str]]:
+        """
+        Get how far back each tier reaches.
+        
+        Returns:
+            Dictionary mapping "minute", "hour" and "day" to the first covered
+            bucket ("YYYY-MM-DD HH:MM"), or None for the daily tier (kept forever)
+        """
+        try:
+            coverage = dict(self.connections.read().execute(
+                "SELECT tier, first_bucket FROM storage_tiers").fetchall())
+        except sqlite3.Error as e:
+            print(f"[DatabaseManager] Error reading tier coverage: {e}")
+            coverage = {}
+        return {
+            "minute": _minute_string(coverage["minute"]) if "minute" in coverage else None,
+            "hour": _minute_string(coverage["hour"] * 60) if "hour" in coverage else None,
+            "day": None
+        }
+    
+    def get_sessions(self, start: str, end: str,
+                     apps: Optional[Iterable[str]] = None) -> List[Tuple[str, str, str]]:
+        """
+        Get the stored sessions that overlap a time window.
+        Sessions still open in the monitor are not included (see AppMonitor.get_open_sessions).
+        
+        Args:
+            start: Window start as "YYYY-MM-DD" or "YYYY-MM-DD HH:MM[:SS]"
+            end: Window end as "YYYY-MM-DD" (whole day) or "YYYY-MM-DD HH:MM[:SS]"
+            apps: Optional app names to restrict the result to
+        
+        Returns:
+            List of (app_name, start, end) tuples ordered by start, times in
+            "YYYY-MM-DD HH:MM:SS" format; sessions crossing midnight appear once per day
+        """
+        apps = None if apps is None else tuple(apps)
+        app_filter, params = _app_filter_clause(apps)
+        first_ts = _second_number(_pad_time(start, "00:00:00"))
+        last_ts = _second_number(_pad_time(end, "23:59:59")) + 1
+        
+        def query():
+            cursor = self.connections.read().execute(f'''
+                SELECT a.name, s.start_ts, s.end_ts
+                FROM sessions s
+                JOIN apps a ON a.id = s.app_id
+                WHERE s.start_ts > ? AND s.start_ts < ? AND s.end_ts > ?{app_filter}
+                ORDER BY s.start_ts
+            ''', (first_ts - MAX_SESSION_SECONDS, last_ts, first_ts, *params))
+            return [(app_name, _second_string(start_ts), _second_string(end_ts))
+                    for app_name, start_ts, end_ts in cursor.fetchall()]
+        
+        try:
+            return self._cached(("sessions", start, end, apps), start[:10], end[:10], query)
+        except sqlite3.Error as e:
+            print(f"[DatabaseManager] Error getting sessions: {e}")
+            return []
+    
+    def get_apps_running_at(self, moment: str) -> List[str]:
+        """
+        Get the apps that had a stored session running at a given time
+        (the concurrency at that moment is the length of the list).
+        
+        Args:
+            moment: Time in "YYYY-MM-DD HH:MM:SS" (or "YYYY-MM-DD HH:MM") format
+        
+        Returns:
+            Sorted list of app names
+        """
+        timestamp = _second_number(_pad_time(moment, "00:00:00"))
+        
+        def query():
+            cursor = self.connections.read().execute('''
+                SELECT DISTINCT a.name
+                FROM sessions s
+                JOIN apps a ON a.id = s.app_id
+                WHERE s.start_ts > ? AND s.start_ts <= ? AND s.end_ts > ?
+                ORDER BY a.name
+            ''', (timestamp - MAX_SESSION_SECONDS, timestamp, timestamp))
+            return [app_name for app_name, in cursor.fetchall()]
+        
+        try:
+            return self._cached(("running_at", moment), moment[:10], moment[:10], query)
+        except sqlite3.Error as e:
+            print(f"[DatabaseManager] Error getting apps running at {moment}: {e}")
+            return []
+    
+    def iter_daily_rows(self, start_date: str, end_date: str, apps: Optional[Iterable[str]] = None,
+                        batch_rows: int = STREAM_BATCH_ROWS) -> Iterator[Tuple[str, str, int]]:
+        """
+        Stream the per-app daily rows of a date range straight from the
+        database, oldest day first, without building the result in memory.
+        Archived months are read from their files (one month at a time).
+        
+        Args:
+            start_date: Start date in YYYY-MM-DD format
+            end_date: End date in YYYY-MM-DD format
+            apps: Optional app names to restrict the rows to
+            batch_rows: Rows fetched from the cursor per step
+        
+        Yields:
+            (date, app_name, duration_seconds) tuples, ordered by date
+        """
+        app_names = self.get_app_names()
+        batches = self.iter_daily_batches(start_date, end_date, apps, batch_rows)
+        try:
+            for batch in batches:
+                for day, app_id, seconds in batch:
+                    if app_id not in app_names:
+                        app_names = self.get_app_names()
+                    yield day_string(day), app_names[app_id], seconds
+        finally:
+            batches.close()
+    
+    def iter_daily_batches(self, start_date: str, end_date: str, apps: Optional[Iterable[str]] = None,
+                           batch_rows: int = STREAM_BATCH_ROWS) -> Iterator[List[Tuple[int, int, int]]]:
+        """
+        Stream the raw per-app daily rows of a date range in cursor-sized
+        batches, oldest day first. This is the scan behind iter_daily_rows,
+        for consumers that index rows by day number and app id themselves.
+        
+        Args:
+            start_date: Start date in YYYY-MM-DD format
+            end_date: End date in YYYY-MM-DD format
+            apps: Optional app names to restrict the rows to
+            batch_rows: Rows fetched from the cursor per step
+        
+        Yields:
+            Lists of (day_number, app_id, duration_seconds) tuples, ordered by day;
+            a day's rows may span two batches
+        """
+        app_filter, params = _app_filter_clause(None if apps is None else tuple(apps))
+        app_filter = app_filter.replace("app_id", "l.app_id")
+        first_day, last_day = day_number(start_date), day_number(end_date)
+        conn = self.connections.read()
+        
+        # Hot stretches between archived months stream in key order; an archived
+        # month is summed with the late writes for it that stayed in usage_logs
+        segments = []
+        for archive in self.archives.find(conn, first_day, last_day):
+            if first_day < archive.first_day:
+                segments.append((first_day, archive.first_day - 1, None))
+            segments.append((max(first_day, archive.first_day), min(last_day, archive.last_day), archive))
+            first_day = archive.last_day + 1
+        if first_day <= last_day:
+            segments.append((first_day, last_day, None))
+        
+        for segment_first, segment_last, archive in segments:
+            if archive is None:
+                cursor = conn.execute(f'''
+                    SELECT l.day, l.app_id, l.duration_seconds
+                    FROM usage_logs l
+                    WHERE l.day >= ? AND l.day <= ?{app_filter}
+                    ORDER BY l.day
+                ''', (segment_first, segment_last, *params))
+            else:
+                schema = self.archives.attach(conn, archive)
+                cursor = conn.execute(f'''
+                    SELECT l.day, l.app_id, SUM(l.duration_seconds)
+                    FROM (
+                        SELECT day, app_id, duration_seconds FROM {schema}.usage_logs
+                        WHERE day >= ?1 AND day <= ?2
+                        UNION ALL
+                        SELECT day, app_id, duration_seconds FROM usage_logs
+                        WHERE day >= ?1 AND day <= ?2
+                    ) l
+                    WHERE 1{app_filter}
+                    GROUP BY l.day, l.app_id
+                    ORDER BY l.day
+                ''', (segment_first, segment_last, *params))
+            
+            try:
+                while True:
+                    rows = cursor.fetchmany(batch_rows)
+                    if not rows:
+                        break
+                    yield rows
+            finally:
+                cursor.close()
+    
+    def iter_sessions(self, start: str, end: str, apps: Optional[Iterable[str]] = None,
+                      batch_rows: int = STREAM_BATCH_ROWS) -> Iterator[Tuple[str, str, str]]:
+        """
+        Stream the stored sessions overlapping a time window, like get_sessions
+        but without building the result in memory.
+        
+        Args:
+            start: Window start as "YYYY-MM-DD" or "YYYY-MM-DD HH:MM[:SS]"
+            end: Window end as "YYYY-MM-DD" (whole day) or "YYYY-MM-DD HH:MM[:SS]"
+            apps: Optional app names to restrict the sessions to
+            batch_rows: Rows fetched from the cursor per step
+        
+        Yields:
+            (app_name, start, end) tuples ordered by start, times in "YYYY-MM-DD HH:MM:SS" format
+        """
+        app_filter, params = _app_filter_clause(None if apps is None else tuple(apps))
+        first_ts = _second_number(_pad_time(start, "00:00:00"))
+        last_ts = _second_number(_pad_time(end, "23:59:59")) + 1
+        
+        cursor = self.connections.read().execute(f'''
+            SELECT a.name, s.start_ts, s.end_ts
+            FROM sessions s
+            JOIN apps a ON a.id = s.app_id
+            WHERE s.start_ts > ? AND s.start_ts < ? AND s.end_ts > ?{app_filter}
+            ORDER BY s.start_ts
+        ''', (first_ts - MAX_SESSION_SECONDS, last_ts, first_ts, *params))
+        try:
+            while True:
+                rows = cursor.fetchmany(batch_rows)
+                if not rows:
+                    break
+                for app_name, start_ts, end_ts in rows:
+                    yield app_name, _second_string(start_ts), _second_string(end_ts)
+        finally:
+            cursor.close()
+    
+    def get_app_names(self) -> Dict[int, str]:
+        """
+        Get the name of every known app by its id.
+        
+        Returns:
+            Dictionary mapping app_id to app name
+        """
+        try:
+            return dict(self.connections.read().execute("SELECT id, name FROM apps").fetchall())
+        except sqlite3.Error as e:
+            print(f"[DatabaseManager] Error getting app names: {e}")
+            return {}
+    
+    def get_all_tracked_apps(self) -> list:
+        """
+        Get list of all apps that have been tracked.
+        
+        Returns:
+            List of unique application names
+        """
+        def query():
+            cursor = self.connections.read().execute('''
+                SELECT name FROM apps a
+                WHERE EXISTS (SELECT 1 FROM usage_cumulative c WHERE c.app_id = a.id)
+                ORDER BY name
+            ''')
+            
+            return [row[0] for row in cursor.fetchall()]
+        
+        try:
+            return self._cached(("all_tracked_apps",), None, None, query)
+        except sqlite3.Error as e:
+            print(f"[DatabaseManager] Error getting tracked apps: {e}")
+            return []
+    
+    def clear_old_data(self, days_to_keep: int = 90) -> bool:
+        """
+        Remove records older than specified days.
+        Runs the chunked purge on the calling thread; RetentionService runs
+        the same job in the background.
+        
+        Args:
+            days_to_keep: Number of days of data to retain
+        
+        Returns:
+            True if every old record was removed
+        """
+        cutoff_date = (datetime.now() - timedelta(days=days_to_keep)).strftime("%Y-%m-%d")
+        return self.purge_before(cutoff_date)["completed"]
+    
+    def purge_before(self, cutoff_date: str,
+                     progress_callback: Optional[Callable[[int, int], None]] = None,
+                     should_stop: Optional[Callable[[], bool]] = None,
+                     chunk_rows: int = RETENTION_CHUNK_ROWS) -> dict:
+        """
+        Delete records dated before cutoff_date in short transactions, then
+        give the freed pages back to the OS. Every chunk leaves the running
+        totals consistent, and the writer lock is released between
+        chunks so queued monitor writes are never held up for long.
+        
+        Args:
+            cutoff_date: Date in YYYY-MM-DD format; older rows are removed
+            progress_callback: Called as (deleted_rows, total_rows) after each chunk
+            should_stop: Polled between chunks; returning True cancels the purge
+            chunk_rows: Maximum usage_logs rows deleted per transaction
+        
+        Returns:
+            Dictionary with deleted_rows, total_rows, freed_pages,
+            completed (False if cancelled or failed) and error (message or None)
+        """
+        cutoff_day = day_number(cutoff_date)
+        result = {"deleted_rows": 0, "total_rows": 0, "freed_pages": 0, "completed": False, "error": None}
+        
+        # Increments queued for old days must not land after their day was purged
+        self.flush()
+        
+        try:
+            conn = self.connections.read()
+            result["total_rows"] = conn.execute(
+                "SELECT COUNT(*) FROM usage_logs WHERE day < ?", (cutoff_day,)).fetchone()[0]
+            
+            # Archived months are dropped whole once the cutoff is past their
+            # last day; the month the cutoff falls in is rewritten without its old days
+            for archive in self.archives.find(conn, FIRST_DAY, cutoff_day - 1):
+                if should_stop and should_stop():
+                    break
+                rows = self.archives.read_rows(archive)
+                if archive.last_day >= cutoff_day and all(day >= cutoff_day for day, _, _ in rows):
+                    continue
+                if archive.last_day < cutoff_day:
+                    with self._write_transaction() as cursor:
+                        self._drop_archive(cursor, archive, rows)
+                    deleted = len(rows)
+                else:
+                    with self._write_transaction() as cursor:
+                        deleted = self._trim_archive(cursor, archive, rows, cutoff_day)
+                self.archives.delete(archive)
+                result["total_rows"] += deleted
+                result["deleted_rows"] += deleted
+            
+            while not (should_stop and should_stop()):
+                with self._write_transaction() as cursor:
+                    deleted = self._purge_chunk(cursor, cutoff_day, chunk_rows)
+                result["deleted_rows"] += deleted
+                if progress_callback:
+                    progress_callback(result["deleted_rows"], max(result["total_rows"], result["deleted_rows"]))
+                if deleted < chunk_rows:
+                    result["completed"] = True
+                    break
+                time.sleep(RETENTION_CHUNK_PAUSE_SECONDS)
+            
+            if result["completed"]:
+                with self._write_transaction() as cursor:
+                    self._purge_detail(cursor, cutoff_day)
+            
+            if result["deleted_rows"]:
+                result["freed_pages"] = self.reclaim_space(should_stop)
+        
+        except (sqlite3.Error, OSError) as e:
+            result["error"] = str(e)
+            print(f"[DatabaseManager] Error purging records before {cutoff_date}: {e}")
+        
+        print(f"[DatabaseManager] Purged {result['deleted_rows']}/{result['total_rows']} records "
+              f"before {cutoff_date}, freed {result['freed_pages']} pages")
+        return result
+    
+    def _purge_chunk(self, cursor: sqlite3.Cursor, cutoff_day: int, limit: int) -> int:
+        """
+        Delete the oldest usage_logs rows before cutoff_day inside the caller's
+        transaction, adjusting the running totals to match.
+        
+        Args:
+            cursor: Cursor on the writer connection with an open transaction
+            cutoff_day: Day number; only older rows are deleted
+            limit: Maximum number of rows to delete
+        
+        Returns:
+            Number of deleted rows
+        """
+        cursor.execute('''
+            SELECT day, app_id, duration_seconds FROM usage_logs
+            WHERE day < ?
+            ORDER BY day, app_id
+            LIMIT ?
+        ''', (cutoff_day, limit))
+        rows = cursor.fetchall()
+        if not rows:
+            return 0
+        
+        self._written_ranges.append((None, rows[-1][0]))
+        cursor.executemany("DELETE FROM usage_logs WHERE day = ? AND app_id = ?",
+                           [(day, app_id) for day, app_id, _ in rows])
+        self._record_changes(cursor, [(day, app_id, -seconds) for day, app_id, seconds in rows])
+        
+        # Oldest rows go first, so each app lost a prefix of its history
+        last_days: Dict[int, int] = {}
+        for day, app_id, _ in rows:
+            last_days[app_id] = day
+        self._rebase_cumulative(cursor, last_days)
+        
+        return len(rows)
+    
+    def _purge_detail(self, cursor: sqlite3.Cursor, cutoff_day: int):
+        """
+        Delete minute and hour buckets and sessions before cutoff_day inside the
+        caller's transaction. Nothing is derived from them, so plain range deletes do.
+        
+        Args:
+            cursor: Cursor on the writer connection with an open transaction
+            cutoff_day: Day number; older rows are removed
+        """
+        cursor.execute("DELETE FROM usage_minutes WHERE minute < ?", (cutoff_day * 1440,))
+        cursor.execute("DELETE FROM usage_hours WHERE hour < ?", (cutoff_day * 24,))
+        cursor.execute("DELETE FROM sessions WHERE start_ts < ?", (cutoff_day * 86400,))
+    
+    def _rebase_cumulative(self, cursor: sqlite3.Cursor, last_days: Dict[int, int]):
+        """
+        Drop each app's running totals up to a day and rebase its later ones on it.
+        
+        Args:
+            cursor: Cursor on the writer connection with an open transaction
+            last_days: app_id -> last day number whose history was deleted
+        """
+        for app_id, last_day in last_days.items():
+            cursor.execute('''
+                UPDATE usage_cumulative
+                SET cumulative_seconds = cumulative_seconds - COALESCE(
+                    (SELECT cumulative_seconds FROM usage_cumulative
+                     WHERE app_id = ?1 AND day <= ?2
+                     ORDER BY day DESC LIMIT 1), 0)
+                WHERE app_id = ?1 AND day > ?2
+            ''', (app_id, last_day))
+            cursor.execute('''
+                DELETE FROM usage_cumulative WHERE app_id = ? AND day <= ?
+            ''', (app_id, last_day))
+    
+    def reclaim_space(self, should_stop: Optional[Callable[[], bool]] = None) -> int:
+        """
+        Return free pages to the OS with incremental_vacuum, a few pages at a time.
+        Does nothing on files that are not in auto_vacuum=INCREMENTAL mode.
+        
+        Args:
+            should_stop: Polled between steps; returning True stops early
+        
+        Returns:
+            Number of pages freed
+        """
+        freed_pages = 0
+        while not (should_stop and should_stop()):
+            freed = self.connections.incremental_vacuum(VACUUM_STEP_PAGES)
+            freed_pages += freed
+            if freed < VACUUM_STEP_PAGES:
+                break
+            time.sleep(RETENTION_CHUNK_PAUSE_SECONDS)
+        return freed_pages
+    
+    def backup(self, path: str, pages: int = BACKUP_PAGES_PER_STEP, sleep: float = BACKUP_STEP_SLEEP_SECONDS,
+               progress_callback: Optional[Callable[[int, int], None]] = None,
+               should_stop: Optional[Callable[[], bool]] = None) -> dict:
+        """
+        Write a consistent copy of the database while it stays in use.
+        Queued writes are flushed first; the copy is made in short page steps
+        with pauses in between, and appears under its final name only once complete.
+        Archived months stay in their own files and are not copied.
+        
+        Args:
+            path: Backup file path
+            pages: Pages copied per step
+            sleep: Seconds to pause after each step
+            progress_callback: Called as (pages_copied, total_pages)
+            should_stop: Checked between steps; returning True abandons the copy
+        
+        Returns:
+            Dictionary with path, pages, seconds, completed and error (message or None)
+        """
+        result = {"path": os.path.abspath(path), "pages": 0, "seconds": 0.0, "completed": False, "error": None}
+        temp_path = path + ".tmp"
+        started = time.monotonic()
+        self.flush()
+        
+        def on_progress(pages_copied: int, total_pages: int):
+            result["pages"] = total_pages
+            if progress_callback:
+                progress_callback(pages_copied, total_pages)
+        
+        try:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            self.connections.backup(temp_path, pages, sleep, on_progress, should_stop)
+            os.replace(temp_path, path)
+            result["completed"] = True
+        except (sqlite3.Error, OSError) as e:
+            result["error"] = str(e)
+            print(f"[DatabaseManager] Error backing up to {path}: {e}")
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+        
+        result["seconds"] = round(time.monotonic() - started, 3)
+        if result["completed"]:
+            print(f"[DatabaseManager] Backed up {result['pages']} pages to {path} in {result['seconds']}s")
+        return result
+    
+    def start_backups(self, interval_seconds: int, generations: int):
+        """
+        Take backups automatically into the "backups" folder beside the database.
+        
+        Args:
+            interval_seconds: Time between backups
+            generations: Backups to keep; older ones are deleted
+        """
+        self.backups.start(interval_seconds, generations)
+    
+    def get_backup_status(self) -> dict:
+        """
+        Get the state of the last backup and of its integrity check.
+        
+        Returns:
+            Dictionary as described in BackupScheduler.get_status
+        """
+        return self.backups.get_status()
+    
+    def compact_tiers(self, now: Optional[datetime] = None, minute_days: int = MINUTE_TIER_DAYS,
+                      hour_days: int = HOUR_TIER_DAYS, chunk_rows: int = COMPACTION_CHUNK_ROWS) -> dict:
+        """
+        Roll minute buckets older than minute_days into hourly buckets and
+        drop hourly buckets older than hour_days (the daily rows already hold
+        them). Coverage moves forward before any rows do, so queries switch
+        to the coarser tier first and never see a partially moved range.
+        
+        Args:
+            now: Current local time (default: datetime.now())
+            minute_days: Whole days of minute buckets to keep, besides today
+            hour_days: Whole days of hourly buckets to keep, besides today
+            chunk_rows: Maximum minute buckets rolled up per transaction
+        
+        Returns:
+            Dictionary with rolled_minutes and dropped_hours
+        """
+        today = day_number((now or datetime.now()).strftime("%Y-%m-%d"))
+        minute_cutoff = (today - minute_days) * 1440
+        hour_cutoff = (today - hour_days) * 24
+        result = {"rolled_minutes": 0, "dropped_hours": 0}
+        
+        # Queued samples for old minutes must not land after they were rolled up
+        self.flush()
+        
+        try:
+            with self._write_transaction() as cursor:
+                cursor.execute("SELECT tier, first_bucket FROM storage_tiers")
+                coverage = dict(cursor.fetchall())
+                moved = [(cutoff, tier) for tier, cutoff in (("minute", minute_cutoff), ("hour", hour_cutoff))
+                         if coverage.get(tier, cutoff) < cutoff]
+                if moved:
+                    cursor.executemany("UPDATE storage_tiers SET first_bucket = ? WHERE tier = ?", moved)
+                    # Cached timelines may have been answered from a tier that just moved
+                    self._written_ranges.append((None, today - min(minute_days, hour_days)))
+            
+            while True:
+                with self._write_transaction() as cursor:
+                    rolled = self._roll_minutes(cursor, minute_cutoff, chunk_rows)
+                result["rolled_minutes"] += rolled
+                if rolled < chunk_rows:
+                    break
+            
+            with self._write_transaction() as cursor:
+                cursor.execute("DELETE FROM usage_hours WHERE hour < ?", (hour_cutoff,))
+                result["dropped_hours"] = cursor.rowcount
+        
+        except sqlite3.Error as e:
+            print(f"[DatabaseManager] Error compacting storage tiers: {e}")
+        
+        if result["rolled_minutes"] or result["dropped_hours"]:
+            print(f"[DatabaseManager] Rolled {result['rolled_minutes']} minute buckets into hours, "
+                  f"dropped {result['dropped_hours']} hourly buckets")
+        return result
+    
+    def _roll_minutes(self, cursor: sqlite3.Cursor, cutoff_minute: int, limit: int) -> int:
+        """
+        Move the oldest minute buckets before cutoff_minute into usage_hours
+        inside the caller's transaction.
+        
+        Args:
+            cursor: Cursor on the writer connection with an open transaction
+            cutoff_minute: Minute number; only older buckets are rolled up
+            limit: Maximum number of minute buckets to move
+        
+        Returns:
+            Number of minute buckets moved
+        """
+        cursor.execute('''
+            SELECT minute, app_id, duration_seconds FROM usage_minutes
+            WHERE minute < ?
+            ORDER BY minute, app_id
+            LIMIT ?
+        ''', (cutoff_minute, limit))
+        rows = cursor.fetchall()
+        if not rows:
+            return 0
+        
+        hours: Dict[Tuple[int, int], int] = {}
+        for minute, app_id, seconds in rows:
+            hours[(minute // 60, app_id)] = hours.get((minute // 60, app_id), 0) + seconds
+        cursor.executemany('''
+            INSERT INTO usage_hours (hour, app_id, duration_seconds)
+            VALUES (?, ?, ?)
+            ON CONFLICT(hour, app_id) DO UPDATE
+            SET duration_seconds = duration_seconds + excluded.duration_seconds
+        ''', [(hour, app_id, seconds) for (hour, app_id), seconds in hours.items()])
+        cursor.executemany("DELETE FROM usage_minutes WHERE minute = ? AND app_id = ?",
+                           [(minute, app_id) for minute, app_id, _ in rows])
+        return len(rows)
+    
+    def archive_before(self, cutoff_date: str) -> List[str]:
+        """
+        Move every whole month that ends before cutoff_date out of the hot
+        database into its own archive file. Queries keep returning the same
+        results; archived days are read through ATTACH when a range needs them.
+        Months that are already archived are skipped (later writes for them
+        stay in the hot database and are read alongside the archive).
+        
+        Args:
+            cutoff_date: Date in YYYY-MM-DD format; months ending before it are archived
+        
+        Returns:
+            List of archived month keys ("YYYY-MM")
+        """
+        cutoff_day = day_number(cutoff_date)
+        archived = []
+        
+        # Queued increments must land before their month's rows are copied out
+        self.flush()
+        
+        try:
+            conn = self.connections.read()
+            first_day = conn.execute("SELECT MIN(day) FROM usage_logs").fetchone()[0]
+            while first_day is not None:
+                month = day_string(first_day)[:7]
+                month_first, month_last = (day_number(date) for date in _month_bounds(month))
+                if month_last >= cutoff_day:
+                    break
+                
+                if not self.archives.find(conn, month_first, month_last):
+                    self._archive_month(month, month_first, month_last)
+                    archived.append(month)
+                
+                first_day = conn.execute("SELECT MIN(day) FROM usage_logs WHERE day > ?",
+                                         (month_last,)).fetchone()[0]
+        
+        except (sqlite3.Error, OSError) as e:
+            print(f"[DatabaseManager] Error archiving months before {cutoff_date}: {e}")
+        
+        print(f"[DatabaseManager] Archived {len(archived)} months before {cutoff_date}")
+        return archived
+    
+    def _archive_month(self, month: str, first_day: int, last_day: int):
         """
-        Initialize database manager and create tables if needed.
+        Copy one month's rows to its archive file, then remove them from the hot database.
         
         Args:
-            db_path: Path to SQLite database file
+            month: Month key ("YYYY-MM")
+            first_day: First day number of the month
+            last_day: Last day number of the month
         """
-        self.db_path = db_path
-        self._init_database()
-    
-    def _init_database(self):
-        """Create database tables if they don't exist."""
-        try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            # Create usage_logs table
+        # Copy and delete under one write transaction so no increment lands in between.
+        # The file is only referenced once the transaction commits; a failure
+        # in between leaves an unreferenced file that the next run overwrites
+        with self._write_transaction() as cursor:
             cursor.execute('''
-                CREATE TABLE IF NOT EXISTS usage_logs (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    app_name TEXT NOT NULL,
-                    date TEXT NOT NULL,
-                    duration_seconds INTEGER NOT NULL DEFAULT 0,
-                    UNIQUE(app_name, date)
-                )
-            ''')
+                SELECT day, app_id, duration_seconds FROM usage_logs
+                WHERE day >= ? AND day <= ?
+            ''', (first_day, last_day))
+            rows = cursor.fetchall()
+            app_ids = sorted({app_id for _, app_id, _ in rows})
+            cursor.execute(f"SELECT id, name FROM apps WHERE id IN ({', '.join('?' * len(app_ids))})", app_ids)
             
-            # Create index for faster queries
+            file_name = self.archives.write(month, rows, dict(cursor.fetchall()))
+            self._apply_archive(cursor, ArchiveInfo(first_day, last_day, month, file_name), rows)
+    
+    def _apply_archive(self, cursor: sqlite3.Cursor, archive: ArchiveInfo, rows: List[Tuple[int, int, int]]):
+        """
+        Remove an archived month's rows from the hot tables inside the caller's transaction.
+        
+        Args:
+            cursor: Cursor on the writer connection with an open transaction
+            archive: The month being archived
+            rows: (day, app_id, duration_seconds) rows copied to the archive
+        """
+        cursor.execute('''
+            DELETE FROM usage_logs WHERE day >= ? AND day <= ?
+        ''', (archive.first_day, archive.last_day))
+        
+        totals: Dict[int, int] = {}
+        for _, app_id, seconds in rows:
+            totals[app_id] = totals.get(app_id, 0) + seconds
+        cursor.executemany('''
+            INSERT INTO archive_totals (first_day, app_id, duration_seconds) VALUES (?, ?, ?)
+        ''', [(archive.first_day, app_id, seconds) for app_id, seconds in totals.items()])
+        
+        # Collapse the month's running totals into one checkpoint per app on
+        # its last day; range queries only look them up at month boundaries
+        for app_id in totals:
             cursor.execute('''
-                CREATE INDEX IF NOT EXISTS idx_app_date 
-                ON usage_logs(app_name, date)
-            ''')
-            
-            conn.commit()
-            conn.close()
-            print(f"[DatabaseManager] Database initialized: {self.db_path}")
-            
+                INSERT OR REPLACE INTO usage_cumulative (app_id, day, cumulative_seconds)
+                SELECT app_id, ?2, cumulative_seconds FROM usage_cumulative
+                WHERE app_id = ?1 AND day <= ?2
+                ORDER BY day DESC LIMIT 1
+            ''', (app_id, archive.last_day))
+            cursor.execute('''
+                DELETE FROM usage_cumulative WHERE app_id = ? AND day >= ? AND day < ?
+            ''', (app_id, archive.first_day, archive.last_day))
+        
+        cursor.execute('''
+            INSERT INTO archives (first_day, last_day, month, file_name, row_count, archived_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', (*archive, len(rows), datetime.now().strftime("%Y-%m-%d %H:%M:%S")))
+    
+    def get_archives(self) -> List[ArchiveInfo]:
+        """
+        List every archived month.
+        
+        Returns:
+            Archives, oldest first
+        """
+        try:
+            return self.archives.find(self.connections.read(), FIRST_DAY, LAST_DAY)
         except sqlite3.Error as e:
-            print(f"[DatabaseManager] Error initializing database: {e}")
-            raise
+            print(f"[DatabaseManager] Error listing archives: {e}")
+            return []
     
-    def update_duration(self, app_name: str, date: str, seconds_to_add: int):
+    def compress_archives(self, idle_days: int = ARCHIVE_COMPRESS_IDLE_DAYS) -> int:
         """
-        Add duration to an existing record or create a new one.
-        Uses INSERT OR REPLACE to handle both cases atomically.
+        Gzip archive files that no query has touched for idle_days.
+        They are decompressed automatically the next time a range needs them.
         
         Args:
-            app_name: Name of the application (e.g., "chrome.exe")
-            date: Date in YYYY-MM-DD format
-            seconds_to_add: Number of seconds to add to the duration
+            idle_days: Minimum days since the archive was last attached
+        
+        Returns:
+            Number of archives compressed
+        """
+        self.archives.detach_all(self.connections.read())
+        compressed = self.archives.compress_idle(self.get_archives(), idle_days)
+        print(f"[DatabaseManager] Compressed {compressed} idle archives")
+        return compressed
+    
+    def _drop_archive(self, cursor: sqlite3.Cursor, archive: ArchiveInfo, rows: List[Tuple[int, int, int]]):
+        """
+        Forget an archived month inside the caller's transaction (retention).
+        The file itself is removed by the caller after the commit.
+        
+        Args:
+            cursor: Cursor on the writer connection with an open transaction
+            archive: Archived month to drop
+            rows: (day, app_id, duration_seconds) rows read from its file
+        """
+        self._written_ranges.append((None, archive.last_day))
+        self._record_changes(cursor, [(day, app_id, -seconds) for day, app_id, seconds in rows])
+        self._rebase_cumulative(cursor, {app_id: archive.last_day for _, app_id, _ in rows})
+        cursor.execute("DELETE FROM archive_totals WHERE first_day = ?", (archive.first_day,))
+        cursor.execute("DELETE FROM archives WHERE first_day = ?", (archive.first_day,))
+    
+    def _trim_archive(self, cursor: sqlite3.Cursor, archive: ArchiveInfo,
+                      rows: List[Tuple[int, int, int]], cutoff_day: int) -> int:
+        """
+        Rewrite an archived month without its days before cutoff_day inside
+        the caller's transaction (retention). The new file gets its own name,
+        so the old one stays valid until the caller deletes it after the commit.
+        
+        Args:
+            cursor: Cursor on the writer connection with an open transaction
+            archive: Archived month the cutoff falls in
+            rows: (day, app_id, duration_seconds) rows read from its file
+            cutoff_day: Day number; older rows are removed
+        
+        Returns:
+            Number of removed rows
+        """
+        removed = [row for row in rows if row[0] < cutoff_day]
+        kept = [row for row in rows if row[0] >= cutoff_day]
+        app_ids = sorted({app_id for _, app_id, _ in kept})
+        cursor.execute(f"SELECT id, name FROM apps WHERE id IN ({', '.join('?' * len(app_ids))})", app_ids)
+        file_name = self.archives.write(archive.month, kept, dict(cursor.fetchall()),
+                                        suffix=f"-from-{day_string(cutoff_day)[8:]}")
+        
+        self._written_ranges.append((None, archive.last_day))
+        self._record_changes(cursor, [(day, app_id, -seconds) for day, app_id, seconds in removed])
+        
+        # The month's running totals only exist as its last-day checkpoint,
+        # so the removed seconds come off that and everything after it
+        totals: Dict[int, int] = {}
+        for _, app_id, seconds in removed:
+            totals[app_id] = totals.get(app_id, 0) + seconds
+        cursor.executemany('''
+            UPDATE usage_cumulative SET cumulative_seconds = cumulative_seconds - ?
+            WHERE app_id = ? AND day >= ?
+        ''', [(seconds, app_id, archive.last_day) for app_id, seconds in totals.items()])
+        cursor.executemany('''
+            UPDATE archive_totals SET duration_seconds = duration_seconds - ?
+            WHERE first_day = ? AND app_id = ?
+        ''', [(seconds, archive.first_day, app_id) for app_id, seconds in totals.items()])
+        cursor.execute('''
+            UPDATE archives SET file_name = ?, row_count = ? WHERE first_day = ?
+        ''', (file_name, len(kept), archive.first_day))
+        return len(removed)
+    
+    def check_cumulative_consistency(self) -> List[Tuple[str, str, Optional[int], Optional[int]]]:
+        """
+        Compare the stored running totals against a recomputation from usage_logs
+        (archived months count as one increment on their last day).
+        
+        Returns:
+            List of (app_name, date, stored, expected) for every mismatching day;
+            stored or expected is None when the row is missing on that side
         """
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            # First, try to get existing duration
-            cursor.execute('''
-                SELECT duration_seconds FROM usage_logs 
-                WHERE app_name = ? AND date = ?
-            ''', (app_name, date))
-            
-            result = cursor.fetchone()
-            
-            if result:
-                # Update existing record
-                new_duration = result[0] + seconds_to_add
-                cursor.execute('''
-                    UPDATE usage_logs 
-                    SET duration_seconds = ? 
-                    WHERE app_name = ? AND date = ?
-                ''', (new_duration, app_name, date))
-            else:
-                # Insert new record
-                cursor.execute('''
-                    INSERT INTO usage_logs (app_name, date, duration_seconds)
-                    VALUES (?, ?, ?)
-                ''', (app_name, date, seconds_to_add))
-            
-            conn.commit()
-            conn.close()
-            
+            cursor = self.connections.read().execute(f'''
+                WITH increments AS ({_DAILY_INCREMENTS_SQL}
+                ), expected AS (
+                    SELECT app_id, day,
+                        SUM(duration_seconds) OVER (
+                            PARTITION BY app_id ORDER BY day
+                        ) AS cumulative_seconds
+                    FROM increments
+                ), mismatches AS (
+                    SELECT e.app_id, e.day, c.cumulative_seconds AS stored,
+                        e.cumulative_seconds AS expected
+                    FROM expected e
+                    LEFT JOIN usage_cumulative c
+                        ON c.app_id = e.app_id AND c.day = e.day
+                    WHERE c.cumulative_seconds IS NOT e.cumulative_seconds
+                    UNION ALL
+                    SELECT c.app_id, c.day, c.cumulative_seconds, NULL
+                    FROM usage_cumulative c
+                    WHERE NOT EXISTS (SELECT 1 FROM increments i
+                                      WHERE i.app_id = c.app_id AND i.day = c.day)
+                )
+                SELECT a.name, m.day, m.stored, m.expected
+                FROM mismatches m
+                JOIN apps a ON a.id = m.app_id
+                ORDER BY a.name, m.day
+            ''')
+            return [(app_name, day_string(day), stored, expected)
+                    for app_name, day, stored, expected in cursor.fetchall()]
+        
         except sqlite3.Error as e:
-            print(f"[DatabaseManager] Error updating duration for {app_name}: {e}")
-            if conn:
-                conn.close()
+            print(f"[DatabaseManager] Error checking running totals: {e}")
+            return []
     
-    def get_today_stats(self) -> Dict[str, int]:
+    def rebuild_cumulative(self) -> bool:
         """
-        Get usage statistics for today.
+        Recompute all running totals from usage_logs.
+        Pending queued writes are flushed first so none are lost.
         
         Returns:
-            Dictionary mapping app_name to duration_seconds for today
-            Example: {"chrome.exe": 3600, "valorant.exe": 7200}
+            True if the rebuild was committed
         """
-        today = datetime.now().strftime("%Y-%m-%d")
-        return self.get_stats_for_date(today)
+        self.flush()
+        try:
+            with self.connections.write() as cursor:
+                self._rebuild_cumulative(cursor)
+            self.cache.clear()
+            print("[DatabaseManager] Running totals rebuilt")
+            return True
+        
+        except sqlite3.Error as e:
+            print(f"[DatabaseManager] Error rebuilding running totals: {e}")
+            return False
     
-    def get_week_stats(self) -> Dict[str, int]:
+    def _rebuild_cumulative(self, cursor: sqlite3.Cursor):
+        """Recompute usage_cumulative inside the caller's transaction."""
+        cursor.execute("DELETE FROM usage_cumulative")
+        cursor.execute(f'''
+            INSERT INTO usage_cumulative (app_id, day, cumulative_seconds)
+            SELECT app_id, day,
+                SUM(duration_seconds) OVER (PARTITION BY app_id ORDER BY day)
+            FROM ({_DAILY_INCREMENTS_SQL})
+        ''')
+    
+    def capture_local_usage(self) -> bool:
         """
-        Get usage statistics for the past 7 days.
+        Record this database's own usage as the LOCAL_DEVICE device before a
+        merge, so refresh_fleet_totals, which rebuilds usage_logs from
+        device_usage only, keeps it. The local share of each unarchived day
+        is what usage_logs holds beyond the other devices' rows, which also
+        picks up whatever the monitor wrote since the previous merge.
         
         Returns:
-            Dictionary mapping app_name to total duration_seconds
+            True if the capture was committed
         """
-        from datetime import timedelta
+        self.flush()
         
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            # Get dates for last 7 days
-            end_date = datetime.now().strftime("%Y-%m-%d")
-            start_date = (datetime.now() - timedelta(days=6)).strftime("%Y-%m-%d")
-            
-            cursor.execute('''
-                SELECT app_name, SUM(duration_seconds) as total
-                FROM usage_logs 
-                WHERE date >= ? AND date <= ?
-                GROUP BY app_name
-                ORDER BY total DESC
-            ''', (start_date, end_date))
-            
-            results = cursor.fetchall()
-            conn.close()
-            
-            stats = {row[0]: row[1] for row in results}
-            return stats
-            
-        except sqlite3.Error as e:
-            print(f"[DatabaseManager] Error getting week stats: {e}")
-            if conn:
-                conn.close()
-            return {}
+            with self._write_transaction() as cursor:
+                last_archived = cursor.execute("SELECT COALESCE(MAX(last_day), -1) FROM archives").fetchone()[0]
+                self._written_ranges.append((last_archived + 1, None))
+                cursor.execute("INSERT INTO devices (name) VALUES (?) ON CONFLICT(name) DO NOTHING", (LOCAL_DEVICE,))
+                device_id = cursor.execute("SELECT id FROM devices WHERE name = ?", (LOCAL_DEVICE,)).fetchone()[0]
+                
+                cursor.execute("DELETE FROM device_usage WHERE device_id = ? AND day > ?", (device_id, last_archived))
+                cursor.execute('''
+                    INSERT INTO device_usage (day, app_id, device_id, duration_seconds)
+                    SELECT day, app_id, ?1, SUM(duration_seconds) FROM (
+                        SELECT day, app_id, duration_seconds FROM usage_logs WHERE day > ?2
+                        UNION ALL
+                        SELECT day, app_id, -duration_seconds FROM device_usage
+                        WHERE day > ?2 AND device_id != ?1
+                    )
+                    GROUP BY day, app_id
+                    HAVING SUM(duration_seconds) > 0
+                ''', (device_id, last_archived))
+                
+                # A pure aggregate database has no usage of its own
+                cursor.execute('''
+                    DELETE FROM devices
+                    WHERE id = ?1 AND NOT EXISTS (SELECT 1 FROM device_usage WHERE device_id = ?1)
+                ''', (device_id,))
+            return True
+        
+        except (sqlite3.Error, OSError) as e:
+            print(f"[DatabaseManager] Error recording local usage before a merge: {e}")
+            return False
     
-    def get_month_stats(self) -> Dict[str, int]:
+    def refresh_fleet_totals(self, since_date: str) -> bool:
         """
-        Get usage statistics for the past 30 days.
+        Republish usage_logs and the running totals from device_usage for
+        every day since since_date, after a merge (see merge_tool.MergeTool).
+        In an aggregate database the daily tables hold the sum over all
+        devices; days inside archived months are left as archived.
+        
+        Args:
+            since_date: First day whose device rows changed, in YYYY-MM-DD format
         
         Returns:
-            Dictionary mapping app_name to total duration_seconds
+            True if the refresh was committed
         """
-        from datetime import timedelta
+        first_day = day_number(since_date)
+        self.flush()
         
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            # Get dates for last 30 days
-            end_date = datetime.now().strftime("%Y-%m-%d")
-            start_date = (datetime.now() - timedelta(days=29)).strftime("%Y-%m-%d")
-            
-            cursor.execute('''
-                SELECT app_name, SUM(duration_seconds) as total
-                FROM usage_logs 
-                WHERE date >= ? AND date <= ?
-                GROUP BY app_name
-                ORDER BY total DESC
-            ''', (start_date, end_date))
-            
-            results = cursor.fetchall()
-            conn.close()
-            
-            stats = {row[0]: row[1] for row in results}
-            return stats
+            with self._write_transaction() as cursor:
+                self._written_ranges.append((first_day, None))
+                last_archived = cursor.execute("SELECT MAX(last_day) FROM archives").fetchone()[0]
+                if last_archived is not None and first_day <= last_archived:
+                    print(f"[DatabaseManager] Merged days up to {day_string(last_archived)} "
+                          f"are archived; refreshing from the day after")
+                    first_day = last_archived + 1
+                
+                cursor.execute('''
+                    INSERT INTO usage_changes (day, app_id, delta)
+                    SELECT day, app_id, SUM(duration_seconds) FROM (
+                        SELECT day, app_id, duration_seconds FROM device_usage WHERE day >= ?1
+                        UNION ALL
+                        SELECT day, app_id, -duration_seconds FROM usage_logs WHERE day >= ?1
+                    )
+                    GROUP BY day, app_id
+                    HAVING SUM(duration_seconds) != 0
+                ''', (first_day,))
+                cursor.execute("DELETE FROM usage_logs WHERE day >= ?", (first_day,))
+                cursor.execute('''
+                    INSERT INTO usage_logs (day, app_id, duration_seconds)
+                    SELECT day, app_id, SUM(duration_seconds) FROM device_usage
+                    WHERE day >= ?
+                    GROUP BY day, app_id
+                ''', (first_day,))
+                
+                # Running totals from the day before: archived months all end earlier
+                cursor.execute('''
+                    DELETE FROM usage_cumulative
+                    WHERE app_id IN (SELECT id FROM apps) AND day >= ?
+                ''', (first_day,))
+                cursor.execute('''
+                    INSERT INTO usage_cumulative (app_id, day, cumulative_seconds)
+                    SELECT l.app_id, l.day,
+                        COALESCE((SELECT c.cumulative_seconds FROM usage_cumulative c
+                                  WHERE c.app_id = l.app_id AND c.day < ?1
+                                  ORDER BY c.day DESC LIMIT 1), 0)
+                        + SUM(l.duration_seconds) OVER (PARTITION BY l.app_id ORDER BY l.day)
+                    FROM usage_logs l
+                    WHERE l.day >= ?1
+                ''', (first_day,))
             
-        except sqlite3.Error as e:
-            print(f"[DatabaseManager] Error getting month stats: {e}")
-            if conn:
-                conn.close()
-            return {}
+            print(f"[DatabaseManager] Fleet totals refreshed from {day_string(first_day)}")
+            return True
+        
+        except (sqlite3.Error, OSError) as e:
+            print(f"[DatabaseManager] Error refreshing fleet totals: {e}")
+            return False
     
-    def get_stats_for_date_range(self, start_date: str, end_date: str) -> Dict[str, int]:
+    def get_device_stats(self, start_date: str, end_date: str) -> Dict[str, Dict[str, int]]:
         """
-        Get usage statistics for a custom date range.
+        Get merged usage per source device for a date range.
         
         Args:
             start_date: Start date in YYYY-MM-DD format
             end_date: End date in YYYY-MM-DD format
-            
+        
         Returns:
-            Dictionary mapping app_name to total duration_seconds
+            Dictionary mapping device name to {app_name: duration_seconds},
+            apps ordered by usage
         """
+        def query():
+            cursor = self.connections.read().execute('''
+                SELECT d.name, a.name, SUM(u.duration_seconds) AS total
+                FROM device_usage u
+                JOIN devices d ON d.id = u.device_id
+                JOIN apps a ON a.id = u.app_id
+                WHERE u.day >= ? AND u.day <= ?
+                GROUP BY u.device_id, u.app_id
+                ORDER BY d.name, total DESC
+            ''', (day_number(start_date), day_number(end_date)))
+            result: Dict[str, Dict[str, int]] = {}
+            for device, app_name, seconds in cursor.fetchall():
+                result.setdefault(device, {})[app_name] = seconds
+            return result
+        
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                SELECT app_name, SUM(duration_seconds) as total
-                FROM usage_logs 
-                WHERE date >= ? AND date <= ?
-                GROUP BY app_name
-                ORDER BY total DESC
-            ''', (start_date, end_date))
-            
-            results = cursor.fetchall()
-            conn.close()
-            
-            stats = {row[0]: row[1] for row in results}
-            return stats
-            
+            return self._cached(("device_stats", start_date, end_date), start_date, end_date, query)
         except sqlite3.Error as e:
-            print(f"[DatabaseManager] Error getting date range stats: {e}")
-            if conn:
-                conn.close()
+            print(f"[DatabaseManager] Error getting device stats: {e}")
             return {}
     
-    def get_stats_for_date(self, date: str) -> Dict[str, int]:
+    def get_change_sequence(self) -> int:
         """
-        Get usage statistics for a specific date.
+        Get the sequence number of the latest change. A consumer that starts
+        from a full read takes this first and then asks for changes after it.
+        
+        Returns:
+            Latest change sequence (0 if nothing was ever written)
+        """
+        try:
+            row = self.connections.read().execute(
+                "SELECT seq FROM sqlite_sequence WHERE name = 'usage_changes'").fetchone()
+            return row[0] if row else 0
+        except sqlite3.Error as e:
+            print(f"[DatabaseManager] Error reading change sequence: {e}")
+            return 0
+    
+    def get_changes_since(self, sequence: int, limit: int = CHANGE_BATCH_ROWS) -> dict:
+        """
+        Get the changes to the daily totals committed after a watermark, so
+        exporters and sync jobs only process what changed. Adding every delta
+        of an (app, date) to the consumer's copy keeps it equal to the total here.
         
         Args:
-            date: Date in YYYY-MM-DD format
-            
+            sequence: Last change sequence the consumer has processed
+            limit: Maximum changes returned per call
+        
         Returns:
-            Dictionary mapping app_name to duration_seconds
+            Dictionary with changes ([(sequence, app_name, date, delta_seconds)],
+            oldest first), last_sequence (the watermark for the next call),
+            has_more, resync (True if changes after the watermark were
+            compacted away: re-read everything, then continue from
+            get_change_sequence()) and error (message or None)
         """
+        result = {"changes": [], "last_sequence": sequence, "has_more": False, "resync": False, "error": None}
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                SELECT app_name, duration_seconds 
-                FROM usage_logs 
-                WHERE date = ?
-                ORDER BY duration_seconds DESC
-            ''', (date,))
-            
-            results = cursor.fetchall()
-            conn.close()
+            conn = self.connections.read()
+            rows = conn.execute('''
+                SELECT c.seq, a.name, c.day, c.delta
+                FROM usage_changes c
+                JOIN apps a ON a.id = c.app_id
+                WHERE c.seq > ?
+                ORDER BY c.seq
+                LIMIT ?
+            ''', (sequence, limit + 1)).fetchall()
             
-            # Convert to dictionary
-            stats = {row[0]: row[1] for row in results}
-            return stats
+            # Checked after the read: compaction only moves this forward
+            compacted = conn.execute("SELECT compacted_through FROM change_log WHERE id = 1").fetchone()
+            if compacted and compacted[0] > sequence:
+                result["resync"] = True
+                return result
             
+            result["has_more"] = len(rows) > limit
+            result["changes"] = [(seq, app_name, day_string(day), delta) for seq, app_name, day, delta in rows[:limit]]
+            if result["changes"]:
+                result["last_sequence"] = result["changes"][-1][0]
+        
         except sqlite3.Error as e:
-            print(f"[DatabaseManager] Error getting stats for {date}: {e}")
-            if conn:
-                conn.close()
-            return {}
+            result["error"] = str(e)
+            print(f"[DatabaseManager] Error reading changes since {sequence}: {e}")
+        return result
     
-    def get_all_tracked_apps(self) -> list:
+    def acknowledge_changes(self, consumer: str, sequence: int) -> bool:
         """
-        Get list of all apps that have been tracked.
+        Record how far a named consumer has processed the change log.
+        Compaction keeps every change a registered consumer still needs
+        (up to CHANGE_LOG_MAX_ROWS).
+        
+        Args:
+            consumer: Consumer name, e.g. "backup" or "sync:laptop"
+            sequence: Last change sequence it processed
         
         Returns:
-            List of unique application names
+            True if the watermark was stored
         """
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                SELECT DISTINCT app_name FROM usage_logs
-                ORDER BY app_name
-            ''')
-            
-            results = cursor.fetchall()
-            conn.close()
-            
-            return [row[0] for row in results]
-            
+            with self._write_transaction() as cursor:
+                cursor.execute('''
+                    INSERT INTO change_consumers (name, sequence, updated_at) VALUES (?, ?, ?)
+                    ON CONFLICT(name) DO UPDATE
+                    SET sequence = MAX(sequence, excluded.sequence), updated_at = excluded.updated_at
+                ''', (consumer, sequence, datetime.now().strftime("%Y-%m-%d %H:%M:%S")))
+            return True
+        
         except sqlite3.Error as e:
-            print(f"[DatabaseManager] Error getting tracked apps: {e}")
-            if conn:
-                conn.close()
-            return []
+            print(f"[DatabaseManager] Error acknowledging changes for {consumer}: {e}")
+            return False
     
-    def clear_old_data(self, days_to_keep: int = 90):
+    def get_consumer_sequence(self, consumer: str) -> int:
         """
-        Remove records older than specified days.
+        Get a consumer's stored watermark.
         
         Args:
-            days_to_keep: Number of days of data to retain
+            consumer: Consumer name
+        
+        Returns:
+            Last acknowledged change sequence (0 if the consumer is unknown)
         """
         try:
-            from datetime import timedelta
-            cutoff_date = (datetime.now() - timedelta(days=days_to_keep)).strftime("%Y-%m-%d")
-            
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                DELETE FROM usage_logs WHERE date < ?
-            ''', (cutoff_date,))
-            
-            deleted_rows = cursor.rowcount
-            conn.commit()
-            conn.close()
-            
-            print(f"[DatabaseManager] Cleaned up {deleted_rows} old records")
-            
+            row = self.connections.read().execute(
+                "SELECT sequence FROM change_consumers WHERE name = ?", (consumer,)).fetchone()
+            return row[0] if row else 0
+        except sqlite3.Error as e:
+            print(f"[DatabaseManager] Error reading watermark of {consumer}: {e}")
+            return 0
+    
+    def compact_change_log(self, max_rows: int = CHANGE_LOG_MAX_ROWS) -> dict:
+        """
+        Keep the change log bounded. Changes every registered consumer has
+        processed are dropped, and so is anything beyond the newest max_rows
+        (a consumer that far behind gets resync from get_changes_since).
+        Changes that no consumer has seen yet are coalesced into one row per
+        (app, day), numbered with the group's latest sequence.
+        
+        Args:
+            max_rows: Changes kept at most
+        
+        Returns:
+            Dictionary with dropped and coalesced row counts
+        """
+        result = {"dropped": 0, "coalesced": 0}
+        try:
+            with self._write_transaction() as cursor:
+                head = cursor.execute(
+                    "SELECT seq FROM sqlite_sequence WHERE name = 'usage_changes'").fetchone()
+                head = head[0] if head else 0
+                slowest, fastest = cursor.execute(
+                    "SELECT MIN(sequence), MAX(sequence) FROM change_consumers").fetchone()
+                if slowest is None:
+                    slowest = fastest = head
+                floor = max(slowest, head - max_rows)
+                
+                cursor.execute("DELETE FROM usage_changes WHERE seq <= ?", (floor,))
+                result["dropped"] = cursor.rowcount
+                cursor.execute('''
+                    INSERT INTO change_log (id, compacted_through) VALUES (1, ?)
+                    ON CONFLICT(id) DO UPDATE
+                    SET compacted_through = MAX(compacted_through, excluded.compacted_through)
+                ''', (floor,))
+                
+                cursor.execute('''
+                    SELECT seq, day, app_id, delta FROM usage_changes WHERE seq > ? ORDER BY seq
+                ''', (max(fastest, floor),))
+                latest: Dict[Tuple[int, int], List[int]] = {}
+                superseded = []
+                for seq, day, app_id, delta in cursor.fetchall():
+                    group = latest.get((day, app_id))
+                    if group is None:
+                        latest[(day, app_id)] = [seq, delta, 1]
+                        continue
+                    superseded.append((group[0],))
+                    group[0], group[1], group[2] = seq, group[1] + delta, group[2] + 1
+                
+                groups = [group for group in latest.values() if group[2] > 1]
+                cursor.executemany("DELETE FROM usage_changes WHERE seq = ?", superseded)
+                cursor.executemany("UPDATE usage_changes SET delta = ? WHERE seq = ?",
+                                   [(delta, seq) for seq, delta, _ in groups if delta])
+                cursor.executemany("DELETE FROM usage_changes WHERE seq = ?",
+                                   [(seq,) for seq, delta, _ in groups if not delta])
+                result["coalesced"] = len(superseded)
+        
         except sqlite3.Error as e:
-            print(f"[DatabaseManager] Error clearing old data: {e}")
-            if conn:
-                conn.close()
+            print(f"[DatabaseManager] Error compacting change log: {e}")
+        
+        if result["dropped"] or result["coalesced"]:
+            print(f"[DatabaseManager] Change log compacted: {result['dropped']} dropped, "
+                  f"{result['coalesced']} coalesced")
+        return result
+
+
+def _date_range(start_date: str, end_date: str) -> List[str]:
+    """
+    List every date from start_date to end_date inclusive.
+    
+    Args:
+        start_date: Start date in YYYY-MM-DD format
+        end_date: End date in YYYY-MM-DD format
+    
+    Returns:
+        List of dates in YYYY-MM-DD format (empty if end_date < start_date)
+    """
+    start = datetime.strptime(start_date, "%Y-%m-%d").date()
+    end = datetime.strptime(end_date, "%Y-%m-%d").date()
+    return [(start + timedelta(days=i)).strftime("%Y-%m-%d")
+            for i in range((end - start).days + 1)]
+
+
+def _month_bounds(month: str) -> Tuple[str, str]:
+    """
+    Get the first and last date of a month.
+    
+    Args:
+        month: Month in YYYY-MM format
+    
+    Returns:
+        Tuple of (start_date, end_date) in YYYY-MM-DD format
+    """
+    year, month_number = map(int, month.split("-"))
+    first = date_type(year, month_number, 1)
+    last = date_type(year + month_number // 12, month_number % 12 + 1, 1) - timedelta(days=1)
+    return first.strftime("%Y-%m-%d"), last.strftime("%Y-%m-%d")
+
+
+def _app_filter_clause(apps: Optional[Iterable[str]]) -> Tuple[str, list]:
+    """
+    Build an optional clause restricting app_id to the given app names.
+    
+    Args:
+        apps: App names to filter on, or None for no filter
+    
+    Returns:
+        Tuple of (SQL fragment, parameters)
+    """
+    if apps is None:
+        return "", []
+    apps = list(apps)
+    return f" AND app_id IN (SELECT id FROM apps WHERE name IN ({', '.join('?' * len(apps))}))", apps
+
+
+def _add_totals(totals: Dict[str, int], rows: Iterable[Tuple[str, int]]):
+    """
+    Add (app_name, seconds) rows into a totals dictionary in place.
+    
+    Args:
+        totals: Dictionary mapping app_name to seconds
+        rows: Rows to add; an app may appear more than once
+    """
+    for app_name, seconds in rows:
+        totals[app_name] = totals.get(app_name, 0) + seconds
+
+
+def _copy_result(value):
+    """
+    Copy a cached result so callers can't modify the cached object.
+    
+    Args:
+        value: Dict (possibly of dicts) or list returned by a read method
+    
+    Returns:
+        Copy of value, nested dicts included
+    """
+    if isinstance(value, dict):
+        return {key: dict(item) if isinstance(item, dict) else item for key, item in value.items()}
+    return list(value)
+
+
+@lru_cache(maxsize=4096)
+def day_number(date_str: str) -> int:
+    """
+    Convert a YYYY-MM-DD date to its stored day number (days since 1970-01-01).
+    
+    Args:
+        date_str: Date in YYYY-MM-DD format
+    
+    Returns:
+        Day number
+    """
+    return (datetime.strptime(date_str, "%Y-%m-%d").date() - UNIX_EPOCH_DATE).days
+
+
+@lru_cache(maxsize=4096)
+def day_string(day: int) -> str:
+    """
+    Convert a stored day number back to a YYYY-MM-DD date.
+    
+    Args:
+        day: Days since 1970-01-01
+    
+    Returns:
+        Date in YYYY-MM-DD format
+    """
+    return (UNIX_EPOCH_DATE + timedelta(days=day)).strftime("%Y-%m-%d")
+
+
+@lru_cache(maxsize=4096)
+def _minute_number(minute_str: str) -> int:
+    """
+    Convert a "YYYY-MM-DD HH:MM" local time to its stored minute number
+    (minutes since 1970-01-01 00:00, so minute // 1440 is the day number).
+    
+    Args:
+        minute_str: Time in "YYYY-MM-DD HH:MM" format
+    
+    Returns:
+        Minute number
+    """
+    return day_number(minute_str[:10]) * 1440 + int(minute_str[11:13]) * 60 + int(minute_str[14:16])
+
+
+def _minute_string(minute: int) -> str:
+    """
+    Convert a stored minute number back to "YYYY-MM-DD HH:MM".
+    
+    Args:
+        minute: Minutes since 1970-01-01 00:00
+    
+    Returns:
+        Time in "YYYY-MM-DD HH:MM" format
+    """
+    return f"{day_string(minute // 1440)} {minute % 1440 // 60:02d}:{minute % 60:02d}"
+
+
+def _pad_time(value: str, default_time: str) -> str:
+    """
+    Complete a date or "YYYY-MM-DD HH:MM" value to "YYYY-MM-DD HH:MM:SS".
+    
+    Args:
+        value: Date, minute or second
+        default_time: "HH:MM:SS" used when value is a bare date
+    
+    Returns:
+        Time in "YYYY-MM-DD HH:MM:SS" format
+    """
+    if len(value) == 10:
+        return f"{value} {default_time}"
+    return value if len(value) > 16 else value + ":00"
+
+
+def _second_number(second_str: str) -> int:
+    """
+    Convert a "YYYY-MM-DD HH:MM:SS" local time to seconds since 1970-01-01 00:00
+    (so second // 60 is the minute number).
+    
+    Args:
+        second_str: Time in "YYYY-MM-DD HH:MM:SS" format
+    
+    Returns:
+        Second number
+    """
+    return _minute_number(second_str[:16]) * 60 + int(second_str[17:19])
+
+
+def _second_string(second: int) -> str:
+    """
+    Convert a stored second number back to "YYYY-MM-DD HH:MM:SS".
+    
+    Args:
+        second: Seconds since 1970-01-01 00:00
+    
+    Returns:
+        Time in "YYYY-MM-DD HH:MM:SS" format
+    """
+    return f"{_minute_string(second // 60)}:{second % 60:02d}"
 
 
 # Testing the database manager
@@ -327,7 +2360,14 @@ if __name__ == "__main__":
     stats = db.get_today_stats()
     print("Today's stats:", stats)
     
-    # Clean up test database
-    if os.path.exists("test_tracker.db"):
-        os.remove("test_tracker.db")
-        print("Test database cleaned up")
+    # Second read is served from the query cache
+    db.get_today_stats()
+    print("Cache stats:", db.get_cache_stats())
+    
+    db.close()
+    
+    # Clean up test database (and its WAL side files)
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists("test_tracker.db" + suffix):
+            os.remove("test_tracker.db" + suffix)
+    print("Test database cleaned up")
@@ -0,0 +1,285 @@
+"""
+Database Writer for TimeTrace Application
+Single background thread that owns all queued writes to tracker.db
+"""
+
+import queue
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+# Group commit budget
+MAX_BATCH_ROWS = 500            # Commit as soon as this many distinct rows are pending
+MAX_BATCH_DELAY_SECONDS = 2.0   # ...or when the oldest pending write is this old
+QUEUE_MAX_SIZE = 1000           # Producers block (back-pressure) once this many ops are queued
+
+# Retry policy for "database is locked" / "database is busy"
+MAX_COMMIT_ATTEMPTS = 5
+RETRY_BACKOFF_SECONDS = 0.2
+
+
+class DatabaseWriter:
+    """
+    Serializes writes to the database on one background thread.
+    Callers enqueue increments (per day), samples (per minute) or closed
+    sessions; the thread coalesces increments and samples per (app_name, date)
+    / (app_name, minute) and commits everything in groups. Retention deletes run
+    in short chunks of their own (see DatabaseManager.purge_before).
+    """
+    
+    def __init__(self, db_manager):
+        """
+        Initialize the writer. Call start() to launch the thread.
+        
+        Args:
+            db_manager: DatabaseManager whose write path and connections are used
+        """
+        self.db_manager = db_manager
+        self._queue = queue.Queue(maxsize=QUEUE_MAX_SIZE)
+        self._thread = None
+        self._running = False
+        
+        # Owned by the writer thread only
+        self._pending: Dict[Tuple[str, str], int] = {}
+        self._pending_samples: Dict[Tuple[str, str], int] = {}
+        self._pending_sessions: List[Tuple[str, str, str]] = []
+        self._pending_journal_sequence: Optional[int] = None
+        self._received_journal_sequence = 0  # Highest journal batch received (pending or committed)
+        self._pending_since = None
+        
+        # Statistics
+        self.commits = 0
+        self.rows_written = 0
+        self.failed_commits = 0
+    
+    def start(self):
+        """Start the writer thread."""
+        if self._running:
+            return
+        
+        self._running = True
+        self._thread = threading.Thread(target=self._writer_loop, name="DatabaseWriter", daemon=True)
+        self._thread.start()
+        print("[DatabaseWriter] Writer started")
+    
+    def stop(self, timeout: float = 10.0):
+        """
+        Flush everything still queued and stop the writer thread.
+        
+        Args:
+            timeout: Maximum seconds to wait for the final flush
+        """
+        if not self._running:
+            return
+        
+        self.flush(timeout=timeout)
+        self._running = False
+        self._queue.put(("stop", None))
+        if self._thread and self._thread.is_alive():
+            self._thread.join(timeout=timeout)
+        print("[DatabaseWriter] Writer stopped")
+    
+    def submit_increments(self, rows: Iterable[Tuple[str, str, int]],
+                          block: bool = True, timeout: Optional[float] = None) -> bool:
+        """
+        Queue (app_name, date, seconds) increments for the next group commit.
+        
+        Args:
+            rows: Iterable of (app_name, date, seconds_to_add) tuples
+            block: Wait for queue space when the writer is behind
+            timeout: Maximum seconds to wait for queue space
+        
+        Returns:
+            True if queued, False if the queue stayed full or the writer is stopped
+        """
+        rows = [row for row in rows if row[2] > 0]
+        if not rows:
+            return True
+        return self._put(("increment", rows), block, timeout)
+    
+    def submit_samples(self, rows: Iterable[Tuple[str, str, int]],
+                       block: bool = True, timeout: Optional[float] = None,
+                       journal_sequence: Optional[int] = None) -> bool:
+        """
+        Queue (app_name, minute, seconds) samples for the next group commit.
+        A journal batch the writer has already received is ignored, so a
+        caller unsure whether its batch arrived may submit it again.
+        
+        Args:
+            rows: Iterable of (app_name, "YYYY-MM-DD HH:MM", seconds_to_add) tuples
+            block: Wait for queue space when the writer is behind
+            timeout: Maximum seconds to wait for queue space
+            journal_sequence: Usage journal batch to mark committed along with the samples
+        
+        Returns:
+            True if queued, False if the queue stayed full or the writer is stopped
+        """
+        rows = [row for row in rows if row[2] > 0]
+        if not rows:
+            return True
+        return self._put(("sample", (rows, journal_sequence)), block, timeout)
+    
+    def submit_sessions(self, rows: Iterable[Tuple[str, str, str]],
+                        block: bool = True, timeout: Optional[float] = None) -> bool:
+        """
+        Queue closed (app_name, start, end) sessions for the next group commit.
+        
+        Args:
+            rows: Iterable of (app_name, start, end) tuples, times as "YYYY-MM-DD HH:MM:SS"
+            block: Wait for queue space when the writer is behind
+            timeout: Maximum seconds to wait for queue space
+        
+        Returns:
+            True if queued, False if the queue stayed full or the writer is stopped
+        """
+        rows = [row for row in rows if row[2] > row[1]]
+        if not rows:
+            return True
+        return self._put(("session", rows), block, timeout)
+    
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wait until everything queued before this call has been committed.
+        
+        Args:
+            timeout: Maximum seconds to wait
+        
+        Returns:
+            True if the flush completed in time and its commit succeeded
+            (False if rows are still pending after a failed commit)
+        """
+        done = threading.Event()
+        committed: List[bool] = []
+        if not self._put(("flush", (done, committed)), True, timeout):
+            return False
+        return done.wait(timeout) and committed[0]
+    
+    def pending_count(self) -> int:
+        """
+        Get an approximate number of queued operations.
+        
+        Returns:
+            Number of operations waiting in the queue
+        """
+        return self._queue.qsize()
+    
+    def _put(self, item: tuple, block: bool, timeout: Optional[float]) -> bool:
+        """Put an operation on the queue, honouring back-pressure."""
+        if not self._running:
+            return False
+        try:
+            self._queue.put(item, block=block, timeout=timeout)
+            return True
+        except queue.Full:
+            print("[DatabaseWriter] Write queue full - caller should retry")
+            return False
+    
+    def _writer_loop(self):
+        """Main writer loop. Runs in the writer thread."""
+        while True:
+            # Wake up in time to honour the batch delay budget
+            wait = None
+            if self._pending_since is not None:
+                wait = max(0.0, MAX_BATCH_DELAY_SECONDS - (time.monotonic() - self._pending_since))
+            
+            try:
+                kind, payload = self._queue.get(timeout=wait)
+            except queue.Empty:
+                self._commit_pending()
+                continue
+            
+            if kind in ("increment", "sample"):
+                pending = self._pending
+                if kind == "sample":
+                    # The journal mark commits in the same transaction as its samples
+                    payload, sequence = payload
+                    pending = self._pending_samples
+                    if sequence is not None:
+                        if sequence <= self._received_journal_sequence:
+                            continue  # Resubmitted batch that is already pending or committed
+                        self._received_journal_sequence = sequence
+                        self._pending_journal_sequence = max(sequence, self._pending_journal_sequence or 0)
+                if self._pending_since is None:
+                    self._pending_since = time.monotonic()
+                for app_name, date, seconds in payload:
+                    key = (app_name, date)
+                    pending[key] = pending.get(key, 0) + seconds
+                if self._pending_rows() >= MAX_BATCH_ROWS:
+                    self._commit_pending()
+            
+            elif kind == "session":
+                if self._pending_since is None:
+                    self._pending_since = time.monotonic()
+                self._pending_sessions.extend(payload)
+                if self._pending_rows() >= MAX_BATCH_ROWS:
+                    self._commit_pending()
+            
+            elif kind == "flush":
+                done, committed = payload
+                committed.append(self._commit_pending())
+                done.set()
+            
+            elif kind == "stop":
+                self._commit_pending()
+                break
+    
+    def _pending_rows(self) -> int:
+        """Count the rows waiting for the next group commit."""
+        return len(self._pending) + len(self._pending_samples) + len(self._pending_sessions)
+    
+    def _commit_pending(self) -> bool:
+        """
+        Commit all pending increments, samples and sessions in one transaction, with retries.
+        
+        Returns:
+            True if nothing is left pending, False if the commit failed (the rows are kept)
+        """
+        if not self._pending_rows():
+            self._pending_since = None
+            return True
+        
+        rows = [(app_name, date, seconds) for (app_name, date), seconds in self._pending.items()]
+        samples = [(app_name, minute, seconds) for (app_name, minute), seconds in self._pending_samples.items()]
+        sessions = list(self._pending_sessions)
+        journal_sequence = self._pending_journal_sequence
+        
+        for attempt in range(1, MAX_COMMIT_ATTEMPTS + 1):
+            try:
+                with self.db_manager._write_transaction() as cursor:
+                    if rows:
+                        self.db_manager._apply_increments(cursor, rows)
+                    if samples:
+                        self.db_manager._apply_samples(cursor, samples)
+                    if sessions:
+                        self.db_manager._apply_sessions(cursor, sessions)
+                    if journal_sequence is not None:
+                        self.db_manager._mark_journal(cursor, journal_sequence)
+                
+                self.commits += 1
+                self.rows_written += len(rows) + len(samples) + len(sessions)
+                self._pending.clear()
+                self._pending_samples.clear()
+                self._pending_sessions.clear()
+                self._pending_journal_sequence = None
+                self._pending_since = None
+                return True
+            
+            except sqlite3.OperationalError as e:
+                message = str(e).lower()
+                if ("locked" in message or "busy" in message) and attempt < MAX_COMMIT_ATTEMPTS:
+                    time.sleep(RETRY_BACKOFF_SECONDS * attempt)
+                    continue
+                self._record_failure(e)
+                return False
+            except sqlite3.Error as e:
+                self._record_failure(e)
+                return False
+    
+    def _record_failure(self, error: Exception):
+        """Log a failed group commit. Pending writes are kept for the next attempt."""
+        self.failed_commits += 1
+        # Restart the delay budget so a broken database is not hammered in a tight loop
+        self._pending_since = time.monotonic()
+        print(f"[DatabaseWriter] Error committing {self._pending_rows()} rows: {error}")
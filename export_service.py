@@ -0,0 +1,398 @@
+"""
+Export Service for TimeTrace
+Streams usage rows to CSV or JSON Lines files (optionally gzip-compressed) in the background,
+and writes the date x app usage matrix to NumPy (.npz) or Parquet files for analytics
+"""
+
+import csv
+import gzip
+import io
+import json
+import os
+import sqlite3
+import threading
+from datetime import date, datetime, timedelta
+from typing import Callable, Dict, Iterable, Optional, Tuple
+from database_manager import DatabaseManager
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    PARQUET_AVAILABLE = True
+except ImportError:
+    PARQUET_AVAILABLE = False
+
+
+# Formats and row granularities
+EXPORT_FORMATS = ("csv", "jsonl")
+EXPORT_GRANULARITIES = ("day", "session")
+MATRIX_FORMATS = ("npz", "parquet")
+
+# Progress is published every this many rows
+EXPORT_PROGRESS_ROWS = 5000
+
+# UI range presets: days ending today
+EXPORT_RANGE_DAYS = {"today": 1, "week": 7, "month": 30}
+
+
+def export_usage(db_manager: DatabaseManager, path: str, start_date: str, end_date: str,
+                 granularity: str = "day", fmt: str = "csv", compress: bool = False,
+                 apps: Optional[Iterable[str]] = None,
+                 progress_callback: Optional[Callable[[int, int, int], None]] = None,
+                 should_stop: Optional[Callable[[], bool]] = None) -> dict:
+    """
+    Write usage rows for a date range to a file, streaming them from the
+    database cursor so memory use does not depend on the range size.
+    The file appears under its final name only once it is complete.
+    
+    Args:
+        db_manager: DatabaseManager to read from
+        path: Output file path
+        start_date: Start date in YYYY-MM-DD format
+        end_date: End date in YYYY-MM-DD format
+        granularity: "day" (date, app, seconds) or "session" (app, start, end, seconds)
+        fmt: "csv" or "jsonl"
+        compress: Gzip the output
+        apps: Optional app names to restrict the export to
+        progress_callback: Called as (rows_written, days_done, total_days)
+        should_stop: Polled while writing; returning True cancels the export
+    
+    Returns:
+        Dictionary with path, rows, completed (False if cancelled or failed)
+        and error (message or None)
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format: {fmt}")
+    if granularity not in EXPORT_GRANULARITIES:
+        raise ValueError(f"Unknown export granularity: {granularity}")
+    
+    result = {"path": os.path.abspath(path), "rows": 0, "completed": False, "error": None}
+    first = datetime.strptime(start_date, "%Y-%m-%d").date()
+    total_days = (datetime.strptime(end_date, "%Y-%m-%d").date() - first).days + 1
+    
+    if granularity == "day":
+        columns = ("date", "app", "seconds")
+        source = rows = db_manager.iter_daily_rows(start_date, end_date, apps)
+    else:
+        columns = ("app", "start", "end", "seconds")
+        # Closing the wrapping generator would not close the query, so keep the source
+        source = db_manager.iter_sessions(start_date, end_date, apps)
+        rows = ((app_name, start, end, _seconds_between(start, end)) for app_name, start, end in source)
+    
+    temp_path = path + ".tmp"
+    try:
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        
+        raw = gzip.open(temp_path, "wb") if compress else open(temp_path, "wb")
+        with io.TextIOWrapper(raw, encoding="utf-8", newline="") as file:
+            if fmt == "csv":
+                writer = csv.writer(file)
+                writer.writerow(columns)
+                write_row = writer.writerow
+            else:
+                def write_row(row):
+                    file.write(json.dumps(dict(zip(columns, row)), ensure_ascii=False) + "\n")
+            
+            for row in rows:
+                write_row(row)
+                result["rows"] += 1
+                if result["rows"] % EXPORT_PROGRESS_ROWS == 0:
+                    if should_stop and should_stop():
+                        break
+                    if progress_callback:
+                        row_date = row[0] if granularity == "day" else row[1][:10]
+                        days_done = (datetime.strptime(row_date, "%Y-%m-%d").date() - first).days
+                        progress_callback(result["rows"], max(0, min(days_done, total_days)), total_days)
+            else:
+                result["completed"] = True
+        
+        if result["completed"]:
+            os.replace(temp_path, path)
+            if progress_callback:
+                progress_callback(result["rows"], total_days, total_days)
+    
+    except (sqlite3.Error, OSError, ValueError) as e:
+        result["error"] = str(e)
+        print(f"[ExportService] Error exporting to {path}: {e}")
+    finally:
+        source.close()
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+    
+    return result
+
+
+def export_usage_matrix(db_manager: DatabaseManager, path: str, start_date: str, end_date: str,
+                        fmt: str = "npz", apps: Optional[Iterable[str]] = None) -> dict:
+    """
+    Write the usage of a date range as a dense date x app matrix of seconds.
+    The rows come from one day-ordered scan and are placed into the matrix
+    a cursor batch at a time with array indexing.
+    
+    An .npz file holds three arrays: "days" (datetime64[D], every day of the
+    range), "apps" (app names, sorted) and "seconds" (int32, days x apps).
+    It is stored uncompressed so load_usage_matrix is a plain read.
+    A Parquet file has one row per day: a "date" column and one column per app.
+    
+    Args:
+        db_manager: DatabaseManager to read from
+        path: Output file path
+        start_date: Start date in YYYY-MM-DD format
+        end_date: End date in YYYY-MM-DD format
+        fmt: "npz" (needs numpy) or "parquet" (also needs pyarrow)
+        apps: Optional app names to restrict the matrix to
+    
+    Returns:
+        Dictionary with path, days, apps (matrix shape), completed and error (message or None)
+    """
+    if fmt not in MATRIX_FORMATS:
+        raise ValueError(f"Unknown matrix format: {fmt}")
+    
+    result = {"path": os.path.abspath(path), "days": 0, "apps": 0, "completed": False, "error": None}
+    if not NUMPY_AVAILABLE or (fmt == "parquet" and not PARQUET_AVAILABLE):
+        result["error"] = f"{'numpy' if not NUMPY_AVAILABLE else 'pyarrow'} is not installed"
+        print(f"[ExportService] Cannot export {fmt} matrix: {result['error']}")
+        return result
+    
+    temp_path = path + ".tmp"
+    try:
+        # datetime64[D] counts days since 1970-01-01, like the stored day numbers
+        days = np.arange(np.datetime64(start_date, "D"), np.datetime64(end_date, "D") + 1)
+        first_day = int(days[0].astype(np.int64)) if len(days) else 0
+        
+        # One column per app seen in the range, in order of appearance; the
+        # matrix doubles its width when it runs out of columns
+        column_of: Dict[int, int] = {}
+        matrix = np.zeros((len(days), 16), dtype=np.int32)
+        for batch in db_manager.iter_daily_batches(start_date, end_date, apps):
+            rows = np.array(batch, dtype=np.int64)
+            app_ids, inverse = np.unique(rows[:, 1], return_inverse=True)
+            batch_columns = np.array([column_of.setdefault(app_id, len(column_of)) for app_id in app_ids.tolist()])
+            if len(column_of) > matrix.shape[1]:
+                matrix = np.pad(matrix, ((0, 0), (0, max(len(column_of), 2 * matrix.shape[1]) - matrix.shape[1])))
+            matrix[rows[:, 0] - first_day, batch_columns[inverse]] = rows[:, 2]
+        
+        app_names = db_manager.get_app_names()
+        ordered = sorted((app_id for app_id, column in column_of.items() if matrix[:, column].any()),
+                         key=app_names.__getitem__)
+        names = [app_names[app_id] for app_id in ordered]
+        seconds = matrix[:, [column_of[app_id] for app_id in ordered]]
+        result["days"], result["apps"] = seconds.shape
+        
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        if fmt == "npz":
+            with open(temp_path, "wb") as file:
+                np.savez(file, days=days, apps=np.array(names, dtype=str), seconds=seconds)
+        else:
+            table = pa.table({"date": pa.array(days),
+                              **{name: seconds[:, index] for index, name in enumerate(names)}})
+            pq.write_table(table, temp_path)
+        
+        os.replace(temp_path, path)
+        result["completed"] = True
+    
+    except (sqlite3.Error, OSError, ValueError) as e:
+        result["error"] = str(e)
+        print(f"[ExportService] Error exporting matrix to {path}: {e}")
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+    
+    return result
+
+
+def load_usage_matrix(path: str) -> Tuple["np.ndarray", "np.ndarray", "np.ndarray"]:
+    """
+    Load a matrix written by export_usage_matrix in .npz format.
+    
+    Args:
+        path: .npz file path
+    
+    Returns:
+        Tuple of (days, apps, seconds) arrays; seconds[i, j] is the usage of
+        apps[j] on days[i]
+    """
+    if not NUMPY_AVAILABLE:
+        raise RuntimeError("numpy is not installed")
+    with np.load(path) as data:
+        return data["days"], data["apps"], data["seconds"]
+
+
+def export_file_name(granularity: str = "day", fmt: str = "csv", compress: bool = False) -> str:
+    """
+    Build a time-stamped export file name.
+    
+    Args:
+        granularity: "day", "session" or "matrix"
+        fmt: "csv", "jsonl", "npz" or "parquet"
+        compress: Add the .gz suffix
+    
+    Returns:
+        File name such as timetraces_export_20240131_120000_day.csv.gz
+    """
+    name = f"timetraces_export_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{granularity}.{fmt}"
+    return name + ".gz" if compress else name
+
+
+def preset_range(preset: str) -> Tuple[str, str]:
+    """
+    Get the dates of a UI range preset.
+    
+    Args:
+        preset: "today", "week" (last 7 days) or "month" (last 30 days); anything else is "month"
+    
+    Returns:
+        Tuple of (start_date, end_date) in YYYY-MM-DD format
+    """
+    today = date.today()
+    days = EXPORT_RANGE_DAYS.get(preset, EXPORT_RANGE_DAYS["month"])
+    return (today - timedelta(days=days - 1)).strftime("%Y-%m-%d"), today.strftime("%Y-%m-%d")
+
+
+def _seconds_between(start: str, end: str) -> int:
+    """Length of a session given its "YYYY-MM-DD HH:MM:SS" bounds."""
+    return int((datetime.strptime(end, "%Y-%m-%d %H:%M:%S")
+                - datetime.strptime(start, "%Y-%m-%d %H:%M:%S")).total_seconds())
+
+
+class ExportService:
+    """
+    Runs export_usage on a background thread so large exports never block the UI.
+    One export runs at a time; it reports progress and can be cancelled.
+    """
+    
+    def __init__(self, db_manager: DatabaseManager):
+        """
+        Initialize export service.
+        
+        Args:
+            db_manager: DatabaseManager instance
+        """
+        self.db_manager = db_manager
+        self.running = False
+        self.thread = None
+        
+        self._wake = threading.Event()
+        self._cancel = threading.Event()
+        self._lock = threading.Lock()
+        self._request: Optional[dict] = None
+        self._busy = False
+        
+        # Status of the current / last export
+        self.progress = (0, 0, 0)  # (rows_written, days_done, total_days)
+        self.current_path: Optional[str] = None
+        self.last_result: Optional[dict] = None
+        
+        print("[ExportService] Initialized")
+    
+    def start(self):
+        """Start the export thread."""
+        if self.running:
+            return
+        
+        self.running = True
+        self.thread = threading.Thread(target=self._export_loop, name="ExportService", daemon=True)
+        self.thread.start()
+        print("[ExportService] Started")
+    
+    def stop(self):
+        """Cancel any running export and stop the export thread."""
+        self.running = False
+        self._cancel.set()
+        self._wake.set()
+        if self.thread:
+            self.thread.join(timeout=5)
+        print("[ExportService] Stopped")
+    
+    def run_now(self, path: str, start_date: str, end_date: str, granularity: str = "day",
+                fmt: str = "csv", compress: bool = False, apps: Optional[Iterable[str]] = None) -> bool:
+        """
+        Request an export on the background thread and return immediately.
+        Arguments are as for export_usage.
+        
+        Returns:
+            True if the export was scheduled, False if one is already running
+        """
+        if fmt not in EXPORT_FORMATS or granularity not in EXPORT_GRANULARITIES:
+            raise ValueError(f"Unsupported export: {granularity} rows as {fmt}")
+        
+        with self._lock:
+            if not self.running or self._busy or self._request is not None:
+                return False
+            self._request = {"path": path, "start_date": start_date, "end_date": end_date,
+                             "granularity": granularity, "fmt": fmt, "compress": compress,
+                             "apps": None if apps is None else list(apps)}
+        
+        self._wake.set()
+        return True
+    
+    def cancel(self):
+        """Cancel the running export; its partial file is removed."""
+        self._cancel.set()
+    
+    def is_busy(self) -> bool:
+        """
+        Check whether an export is scheduled or running.
+        
+        Returns:
+            True while an export is pending or in progress
+        """
+        with self._lock:
+            return self._busy or self._request is not None
+    
+    def get_status(self) -> dict:
+        """
+        Get the state of the current or last export.
+        
+        Returns:
+            Dictionary with busy, rows, days_done, total_days, path and last_result
+        """
+        rows, days_done, total_days = self.progress
+        return {
+            "busy": self.is_busy(),
+            "rows": rows,
+            "days_done": days_done,
+            "total_days": total_days,
+            "path": self.current_path,
+            "last_result": self.last_result
+        }
+    
+    def _export_loop(self):
+        """Main export loop. Runs in the export thread."""
+        while self.running:
+            self._wake.wait()
+            self._wake.clear()
+            
+            with self._lock:
+                request, self._request = self._request, None
+                self._busy = request is not None
+            if request is None:
+                continue
+            
+            self._cancel.clear()
+            self.progress = (0, 0, 0)
+            self.current_path = os.path.abspath(request["path"])
+            try:
+                print(f"[ExportService] Exporting {request['start_date']}..{request['end_date']} "
+                      f"to {self.current_path}")
+                self.last_result = export_usage(
+                    self.db_manager, progress_callback=self._set_progress,
+                    should_stop=self._cancel.is_set, **request)
+            except Exception as e:
+                print(f"[ExportService] Error exporting data: {e}")
+                self.last_result = {"path": self.current_path, "rows": 0, "completed": False, "error": str(e)}
+            finally:
+                with self._lock:
+                    self._busy = False
+    
+    def _set_progress(self, rows: int, days_done: int, total_days: int):
+        """Publish export progress (called from the export thread)."""
+        self.progress = (rows, days_done, total_days)
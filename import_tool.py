@@ -0,0 +1,300 @@
+"""
+Import Tool for TimeTrace Application
+Bulk-loads usage history from CSV / JSON Lines files (other trackers, old exports and backups)
+"""
+
+import csv
+import gzip
+import json
+import os
+import tempfile
+from datetime import datetime
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+from config_manager import normalize_app_name
+from database_manager import DatabaseManager
+
+
+# Input formats (optionally gzip-compressed)
+IMPORT_FORMATS = ("csv", "jsonl")
+
+# Rows committed per write transaction
+IMPORT_BATCH_ROWS = 100000
+
+# Validation limits
+MAX_APP_NAME_LENGTH = 260
+MAX_DAY_SECONDS = 86400
+
+# Invalid rows reported individually; the rest are only counted
+REPORTED_SKIPS = 10
+
+# Accepted names for each field, case-insensitive. The first names are the
+# ones export_usage writes, so a day export can be imported as is.
+IMPORT_COLUMNS = {
+    "app": ("app", "app_name", "name", "exe"),
+    "date": ("date", "day"),
+    "seconds": ("seconds", "duration_seconds", "duration"),
+}
+
+
+def import_usage(db_manager: DatabaseManager, path: str, fmt: Optional[str] = None, dry_run: bool = False,
+                 batch_rows: int = IMPORT_BATCH_ROWS,
+                 progress_callback: Optional[Callable[[int, int], None]] = None) -> dict:
+    """
+    Stream (app, date, seconds) rows from a file into the daily usage tables.
+    Rows are added to what is already stored (upsert-add), so importing the
+    same file twice counts it twice. App names are process names and are
+    normalized the way the scanner records them (normalize_app_name); rows
+    with an empty name, a bad date or seconds outside 1..86400 are skipped. Rows are committed in batches of batch_rows, so a
+    failure part-way keeps the batches written before it (see "imported").
+    
+    Args:
+        db_manager: DatabaseManager to import into
+        path: Input file (.csv, .jsonl, optionally .gz)
+        fmt: "csv" or "jsonl"; by default taken from the file extension
+        dry_run: Read and validate only, write nothing
+        batch_rows: Rows per write transaction
+        progress_callback: Called as (rows_read, rows_imported) after each batch
+    
+    Returns:
+        Dictionary with path, rows (read), imported (valid rows written, or that
+        would be written in a dry run), skipped, apps, first_date, last_date,
+        completed and error (message or None)
+    """
+    result = {"path": os.path.abspath(path), "rows": 0, "imported": 0, "skipped": 0, "apps": 0,
+              "first_date": None, "last_date": None, "completed": False, "error": None}
+    apps, used_dates = set(), set()
+    dates: Dict[str, Optional[str]] = {}  # raw value -> canonical date (None if invalid)
+    batch: List[Tuple[str, str, int]] = []
+    
+    def write_batch() -> bool:
+        if not dry_run and not db_manager.update_durations(batch):
+            result["error"] = f"writing rows {result['imported'] + 1}-{result['imported'] + len(batch)} failed"
+            return False
+        result["imported"] += len(batch)
+        batch.clear()
+        if progress_callback:
+            progress_callback(result["rows"], result["imported"])
+        return True
+    
+    try:
+        for line_number, app_name, date, seconds in read_usage_rows(path, fmt):
+            result["rows"] += 1
+            try:
+                row = _normalize_row(app_name, date, seconds, dates)
+            except ValueError as e:
+                result["skipped"] += 1
+                if result["skipped"] <= REPORTED_SKIPS:
+                    print(f"[ImportTool] Skipping line {line_number}: {e}")
+                continue
+            
+            batch.append(row)
+            apps.add(row[0])
+            used_dates.add(row[1])
+            if len(batch) >= batch_rows and not write_batch():
+                break
+        else:
+            result["completed"] = not batch or write_batch()
+    
+    except (OSError, ValueError, csv.Error) as e:
+        result["error"] = str(e)
+    
+    if used_dates:
+        result["first_date"], result["last_date"] = min(used_dates), max(used_dates)
+    result["apps"] = len(apps)
+    if result["error"]:
+        print(f"[ImportTool] Error importing {path}: {result['error']}")
+    return result
+
+
+def read_usage_rows(path: str, fmt: Optional[str] = None) -> Iterator[Tuple[int, object, object, object]]:
+    """
+    Stream the raw rows of a CSV (with a header row) or JSON Lines file.
+    
+    Args:
+        path: Input file; a .gz suffix means gzip-compressed
+        fmt: "csv" or "jsonl"; by default taken from the file extension
+    
+    Yields:
+        (line_number, app, date, seconds) with the values as found in the file;
+        a missing field (or an unreadable JSON line) is None
+    """
+    fmt = fmt or _format_from_name(path)
+    if fmt not in IMPORT_FORMATS:
+        raise ValueError(f"Unknown import format: {fmt}")
+    
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rt", encoding="utf-8-sig", newline="") as file:
+        if fmt == "csv":
+            reader = csv.reader(file)
+            header = [name.strip().lower() for name in next(reader, [])]
+            indexes = [_find_column(header, field) for field in IMPORT_COLUMNS]
+            if None in indexes:
+                raise ValueError(f"CSV header needs {', '.join(names[0] for names in IMPORT_COLUMNS.values())} "
+                                 f"columns, found: {', '.join(header)}")
+            app_index, date_index, seconds_index = indexes
+            width = max(indexes) + 1
+            for row in reader:
+                if len(row) >= width:
+                    yield reader.line_num, row[app_index], row[date_index], row[seconds_index]
+                elif row:
+                    yield reader.line_num, None, None, None
+        else:
+            keys = None  # Keys of the last record; files are normally uniform
+            for line_number, line in enumerate(file, 1):
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    record = None
+                if not isinstance(record, dict):
+                    yield line_number, None, None, None
+                    continue
+                try:
+                    values = [record[key] for key in keys]
+                except (KeyError, TypeError):
+                    keys = [_find_key(record, field) for field in IMPORT_COLUMNS]
+                    values = [None if key is None else record[key] for key in keys]
+                yield (line_number, *values)
+
+
+def _normalize_row(app_name, date, seconds, dates: Dict[str, Optional[str]]) -> Tuple[str, str, int]:
+    """
+    Validate one raw row and bring it into the stored form.
+    
+    Args:
+        app_name: Raw app name
+        date: Raw date (YYYY-MM-DD)
+        seconds: Raw duration in seconds
+        dates: Cache of raw date values already parsed
+    
+    Returns:
+        (app_name, date, seconds) tuple
+    
+    Raises:
+        ValueError: If the row is incomplete or a value is invalid
+    """
+    if app_name is None or date is None or seconds is None:
+        raise ValueError("incomplete row")
+    
+    app_name = normalize_app_name(str(app_name))
+    if not app_name or len(app_name) > MAX_APP_NAME_LENGTH:
+        raise ValueError(f"invalid app name {app_name!r}")
+    
+    date = str(date).strip()
+    if date not in dates:
+        try:
+            dates[date] = datetime.strptime(date, "%Y-%m-%d").strftime("%Y-%m-%d")
+        except ValueError:
+            dates[date] = None
+    if dates[date] is None:
+        raise ValueError(f"invalid date {date!r}")
+    
+    try:
+        if isinstance(seconds, bool):
+            raise TypeError
+        value = seconds if isinstance(seconds, int) else int(float(seconds))
+    except (TypeError, ValueError, OverflowError):
+        raise ValueError(f"invalid seconds {seconds!r}")
+    if not 0 < value <= MAX_DAY_SECONDS:
+        raise ValueError(f"seconds out of range: {value}")
+    
+    return app_name, dates[date], value
+
+
+def _find_column(header: List[str], field: str) -> Optional[int]:
+    """Index of the first header column naming a field, or None."""
+    for name in IMPORT_COLUMNS[field]:
+        if name in header:
+            return header.index(name)
+    return None
+
+
+def _find_key(record: dict, field: str) -> Optional[str]:
+    """Key of a JSON record naming a field (case-insensitive), or None."""
+    for name in IMPORT_COLUMNS[field]:
+        if name in record:
+            return name
+    keys = {str(key).lower(): key for key in record}
+    return next((keys[name] for name in IMPORT_COLUMNS[field] if name in keys), None)
+
+
+def _format_from_name(path: str) -> str:
+    """Tell the input format from the file extension (.csv, .jsonl, .json, .ndjson, optionally .gz)."""
+    name = path[:-3] if path.endswith(".gz") else path
+    extension = os.path.splitext(name)[1].lower()
+    if extension == ".csv":
+        return "csv"
+    if extension in (".jsonl", ".json", ".ndjson"):
+        return "jsonl"
+    raise ValueError(f"Cannot tell the format of {path}; pass it explicitly")
+
+
+def run_benchmark(days: int = 3650, apps: int = 300, fmt: str = "csv") -> Dict[str, float]:
+    """
+    Import a synthetic history file into a scratch database and time it:
+    a dry run (parse and validate only) and the real import.
+    
+    Args:
+        days: Days of history
+        apps: Apps used on every day
+        fmt: "csv" or "jsonl"
+    
+    Returns:
+        Dictionary of timings in seconds and the row count
+    """
+    import random
+    import time
+    
+    timings: Dict[str, float] = {}
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = os.path.join(temp_dir, f"history.{fmt}")
+        first = datetime(2015, 1, 1).toordinal()
+        expected = 0
+        with open(path, "w", encoding="utf-8", newline="") as file:
+            writer = csv.writer(file)
+            if fmt == "csv":
+                writer.writerow(("date", "app", "seconds"))
+            for day in range(days):
+                date = datetime.fromordinal(first + day).strftime("%Y-%m-%d")
+                for app in range(apps):
+                    seconds = random.randint(1, 7200)
+                    expected += seconds
+                    if fmt == "csv":
+                        writer.writerow((date, f"App{app}.exe", seconds))
+                    else:
+                        file.write(json.dumps({"date": date, "app": f"App{app}.exe", "seconds": seconds}) + "\n")
+        timings["rows"] = days * apps
+        
+        db = DatabaseManager(os.path.join(temp_dir, "import.db"))
+        try:
+            started = time.perf_counter()
+            import_usage(db, path, dry_run=True)
+            timings["dry_run"] = time.perf_counter() - started
+            
+            started = time.perf_counter()
+            result = import_usage(db, path)
+            timings["import"] = time.perf_counter() - started
+            
+            last = datetime.fromordinal(first + days - 1).strftime("%Y-%m-%d")
+            total = sum(db.get_stats_for_date_range("2015-01-01", last).values())
+            assert result["completed"] and total == expected, (result, total, expected)
+        finally:
+            db.close()
+    return timings
+
+
+# Import benchmark
+if __name__ == "__main__":
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Benchmark importing usage history into TimeTrace")
+    parser.add_argument("--days", type=int, default=3650, help="Days of history (default: 3650)")
+    parser.add_argument("--apps", type=int, default=300, help="Apps per day (default: 300)")
+    parser.add_argument("--format", choices=IMPORT_FORMATS, default="csv", help="Input format (default: csv)")
+    args = parser.parse_args()
+    
+    timings = run_benchmark(args.days, args.apps, args.format)
+    rows = int(timings["rows"])
+    print(f"Dry run: {rows} rows in {timings['dry_run']:.1f}s ({rows / timings['dry_run']:.0f} rows/s)")
+    print(f"Import: {rows} rows in {timings['import']:.1f}s ({rows / timings['import']:.0f} rows/s)")
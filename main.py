@@ -12,6 +12,9 @@ from database_manager import DatabaseManager
 from config_manager import ConfigManager
 from monitor_service import AppMonitor
 from notification_service import NotificationService
+from retention_service import RetentionService
+from compaction_service import CompactionService
+from export_service import ExportService
 from main_ui import TimeTraceUI
 
 
@@ -30,6 +33,9 @@ class TimeTraceApp:
         self.config_manager = ConfigManager("settings.json")
         self.monitor = AppMonitor(self.db_manager, self.config_manager)
         self.notification_service = NotificationService(self.db_manager, self.config_manager)
+        self.retention_service = RetentionService(self.db_manager, self.config_manager)
+        self.compaction_service = CompactionService(self.db_manager)
+        self.export_service = ExportService(self.db_manager)
         
         # UI will be created in run()
         self.ui = None
@@ -141,10 +147,26 @@ class TimeTraceApp:
         if self.notification_service:
             self.notification_service.stop()
         
+        # Stop retention purges (cancels one in progress between chunks)
+        if self.retention_service:
+            self.retention_service.stop()
+        
+        # Stop minute/hour tier compaction
+        if self.compaction_service:
+            self.compaction_service.stop()
+        
+        # Stop exports (a running one is cancelled and its partial file removed)
+        if self.export_service:
+            self.export_service.stop()
+        
         # Stop monitoring
         if self.monitor:
             self.monitor.stop()
         
+        # Close database connections (after the monitor's final save)
+        if self.db_manager:
+            self.db_manager.close()
+        
         # Stop tray icon
         if self.tray_icon:
             self.tray_icon.stop()
@@ -174,6 +196,21 @@ class TimeTraceApp:
             # Start notification service
             self.notification_service.start()
             
+            # Start retention service (automatic purges if enabled)
+            self.retention_service.start()
+            
+            # Start storage tier compaction (minute -> hour -> day)
+            self.compaction_service.start()
+            
+            # Start the background exporter used by the UI
+            self.export_service.start()
+            
+            # Start scheduled online backups of the database
+            if self.config_manager.get_setting("auto_backup", False):
+                self.db_manager.start_backups(
+                    int(self.config_manager.get_setting("backup_interval_hours", 24) * 3600),
+                    self.config_manager.get_setting("backup_generations", 7))
+            
             # Create system tray icon
             self.create_tray_icon()
             
@@ -187,7 +224,9 @@ class TimeTraceApp:
                 self.config_manager,
                 self.monitor,
                 self.notification_service,
-                on_close_callback=self._on_window_close
+                on_close_callback=self._on_window_close,
+                retention_service=self.retention_service,
+                export_service=self.export_service
             )
             
             print("[TimeTrace] Application ready!")
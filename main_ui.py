@@ -8,6 +8,7 @@ from typing import Callable, Dict, List
 from database_manager import DatabaseManager
 from config_manager import ConfigManager
 from monitor_service import AppMonitor
+from export_service import export_file_name, export_usage, preset_range
 import matplotlib.pyplot as plt
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 from matplotlib.figure import Figure
@@ -15,8 +16,12 @@ from datetime import datetime, timedelta
 import psutil
 import os
 import sys
+import threading
 
 
+# Dışa aktarım satır türleri (etiket -> export_service granularity)
+EXPORT_GRANULARITY_LABELS = {"Günlük": "day", "Oturum": "session"}
+
 # Uygulama Kategorileri
 APP_CATEGORIES = {
     "🎮 Oyunlar": [
@@ -65,7 +70,8 @@ class TimeTraceUI:
     """
     
     def __init__(self, db_manager: DatabaseManager, config_manager: ConfigManager, 
-                 monitor: AppMonitor, notification_service=None, on_close_callback: Callable = None):
+                 monitor: AppMonitor, notification_service=None, on_close_callback: Callable = None,
+                 retention_service=None, export_service=None):
         """
         Initialize the TimeTrace UI.
         
@@ -75,12 +81,17 @@ class TimeTraceUI:
             monitor: AppMonitor instance
             notification_service: NotificationService instance (optional)
             on_close_callback: Function to call when window is closed
+            retention_service: RetentionService instance (optional)
+            export_service: ExportService instance (optional)
         """
         self.db_manager = db_manager
         self.config_manager = config_manager
         self.monitor = monitor
         self.notification_service = notification_service
+        self.retention_service = retention_service
+        self.export_service = export_service
         self.on_close_callback = on_close_callback
+        self._save_thread = None  # Background force_save of a dashboard refresh
         
         # Set appearance mode and color theme
         ctk.set_appearance_mode("dark")
@@ -390,21 +401,15 @@ class TimeTraceUI:
                 days = 30
                 title = "Son 30 Gün - Günlük Toplam Kullanım"
             
-            # Get daily totals
-            daily_totals = []
-            daily_labels = []
+            # Get daily totals (one query for the whole period)
             today = datetime.now().date()
+            series = self.db_manager.get_daily_totals(
+                (today - timedelta(days=days - 1)).strftime("%Y-%m-%d"),
+                today.strftime("%Y-%m-%d")
+            )
             
-            for i in range(days - 1, -1, -1):
-                date = today - timedelta(days=i)
-                date_str = date.strftime("%Y-%m-%d")
-                
-                stats = self.db_manager.get_stats_for_date_range(date_str, date_str)
-                total_seconds = sum(stats.values()) if stats else 0
-                total_hours = total_seconds / 3600
-                
-                daily_totals.append(total_hours)
-                daily_labels.append(date.strftime("%m-%d"))
+            daily_totals = [seconds / 3600 for seconds in series.values()]
+            daily_labels = [date_str[5:] for date_str in series]  # MM-DD
             
             if not any(daily_totals):
                 label = ctk.CTkLabel(
@@ -539,19 +544,17 @@ class TimeTraceUI:
             from datetime import datetime, timedelta
             today = datetime.now().date()
             
-            def _range_total(start, end):
-                stats = self.db_manager.get_stats_for_date_range(start.strftime("%Y-%m-%d"), end.strftime("%Y-%m-%d"))
-                return sum(stats.values())/3600 if stats else 0
+            # Both weeks from one daily series (oldest day first)
+            series = list(self.db_manager.get_daily_totals(
+                (today - timedelta(days=13)).strftime("%Y-%m-%d"),
+                today.strftime("%Y-%m-%d")
+            ).values())
             
             # Last 7 days
-            end1 = today
-            start1 = today - timedelta(days=6)
-            total1 = _range_total(start1, end1)
+            total1 = sum(series[7:]) / 3600
             
             # Previous 7 days
-            end2 = start1 - timedelta(days=1)
-            start2 = end2 - timedelta(days=6)
-            total2 = _range_total(start2, end2)
+            total2 = sum(series[:7]) / 3600
             
             fig = Figure(figsize=(6,4), dpi=100)
             ax = fig.add_subplot(111)
@@ -1116,10 +1119,26 @@ class TimeTraceUI:
         self._refresh_running_apps()
     
     def _refresh_dashboard(self):
-        """Refresh the dashboard with latest statistics based on selected period."""
-        # Force save any pending time
-        self.monitor.force_save()
+        """
+        Refresh the dashboard with latest statistics based on selected period.
+        Pending time is saved first on a worker thread, so the UI never waits on the database writer.
+        """
+        if self._save_thread is not None and self._save_thread.is_alive():
+            return  # A refresh is already waiting for its save
         
+        self._save_thread = threading.Thread(target=self.monitor.force_save, name="DashboardSave", daemon=True)
+        self._save_thread.start()
+        self._draw_dashboard_when_saved()
+    
+    def _draw_dashboard_when_saved(self):
+        """Redraw the dashboard once the background save has finished."""
+        if self._save_thread.is_alive():
+            self.root.after(100, self._draw_dashboard_when_saved)
+            return
+        self._draw_dashboard()
+    
+    def _draw_dashboard(self):
+        """Fill the dashboard with the statistics of the selected period."""
         # Clear existing widgets
         for widget in self.stats_frame.winfo_children():
             widget.destroy()
@@ -1445,7 +1464,7 @@ class TimeTraceUI:
         )
         retention_label.pack(side="left", padx=10)
         
-        self.retention_var = ctk.StringVar(value="90")
+        self.retention_var = ctk.StringVar(value=str(self.config_manager.get_setting("retention_days") or 90))
         
         self.retention_entry = ctk.CTkEntry(
             retention_frame,
@@ -1454,9 +1473,20 @@ class TimeTraceUI:
         )
         self.retention_entry.pack(side="left", padx=10)
         
+        self.auto_retention_var = ctk.BooleanVar(value=bool(self.config_manager.get_setting("auto_retention")))
+        
+        auto_retention_switch = ctk.CTkSwitch(
+            retention_frame,
+            text="Otomatik",
+            variable=self.auto_retention_var,
+            onvalue=True,
+            offvalue=False
+        )
+        auto_retention_switch.pack(side="left", padx=10)
+        
         retention_info = ctk.CTkLabel(
             retention_frame,
-            text="Belirtilen günden eski kayıtlar otomatik silinir",
+            text="Otomatik açıksa belirtilen günden eski kayıtlar arka planda silinir",
             font=ctk.CTkFont(size=9),
             text_color="gray"
         )
@@ -1609,6 +1639,46 @@ class TimeTraceUI:
             )
             btn.pack(side="left", padx=4)
         
+        # Export format and row granularity
+        format_frame = ctk.CTkFrame(settings_frame)
+        format_frame.pack(fill="x", padx=10, pady=10)
+        
+        format_label = ctk.CTkLabel(
+            format_frame,
+            text="🧾 Biçim:",
+            font=ctk.CTkFont(size=12, weight="bold")
+        )
+        format_label.pack(side="left", padx=10)
+        
+        self.export_format_var = ctk.StringVar(value=self.config_manager.get_setting("export_format") or "csv")
+        format_menu = ctk.CTkOptionMenu(
+            format_frame,
+            variable=self.export_format_var,
+            values=["csv", "csv.gz", "jsonl", "jsonl.gz"],
+            command=lambda v: self.config_manager.set_setting("export_format", v),
+            width=110
+        )
+        format_menu.pack(side="left", padx=5)
+        
+        granularity_label = ctk.CTkLabel(
+            format_frame,
+            text="Satırlar:",
+            font=ctk.CTkFont(size=12, weight="bold")
+        )
+        granularity_label.pack(side="left", padx=10)
+        
+        granularity_names = {value: label for label, value in EXPORT_GRANULARITY_LABELS.items()}
+        self.export_granularity_var = ctk.StringVar(
+            value=granularity_names.get(self.config_manager.get_setting("export_granularity"), "Günlük"))
+        granularity_menu = ctk.CTkOptionMenu(
+            format_frame,
+            variable=self.export_granularity_var,
+            values=list(EXPORT_GRANULARITY_LABELS),
+            command=lambda v: self.config_manager.set_setting("export_granularity", EXPORT_GRANULARITY_LABELS[v]),
+            width=110
+        )
+        granularity_menu.pack(side="left", padx=5)
+        
         # Clear old data button
         clear_btn = ctk.CTkButton(
             settings_frame,
@@ -1621,7 +1691,7 @@ class TimeTraceUI:
         # Export data button
         export_btn = ctk.CTkButton(
             settings_frame,
-            text="📤 Verileri Dışa Aktar (CSV)",
+            text="📤 Verileri Dışa Aktar",
             command=self._export_data,
             width=200
         )
@@ -1705,11 +1775,17 @@ class TimeTraceUI:
             check_interval = int(self.check_interval_var.get())
             save_interval = int(self.save_interval_var.get())
             
+            retention_days = int(self.retention_var.get())
+            
             if check_interval < 1 or save_interval < 1:
                 raise ValueError("Aralıklar 1 saniyeden az olamaz")
+            if retention_days < 1:
+                raise ValueError("Saklama süresi 1 günden az olamaz")
             
             self.config_manager.set_setting("check_interval_seconds", check_interval)
             self.config_manager.set_setting("save_interval_seconds", save_interval)
+            self.config_manager.set_setting("retention_days", retention_days)
+            self.config_manager.set_setting("auto_retention", self.auto_retention_var.get())
             self.config_manager.set_setting("minimize_to_tray", self.minimize_to_tray_var.get())
             self.config_manager.set_setting("run_at_startup", self.run_at_startup_var.get())
 
@@ -1791,89 +1867,162 @@ class TimeTraceUI:
                 print(f"[TimeTraceUI] Failed to remove startup shortcut: {e}")
     
     def _clear_old_data(self):
-        """Clear data older than retention period."""
+        """Clear data older than retention period in the background, showing progress."""
         try:
             retention_days = int(self.retention_var.get())
-            self.db_manager.clear_old_data(retention_days)
+            if retention_days < 1:
+                raise ValueError("Saklama süresi 1 günden az olamaz")
+            
+            if not self.retention_service:
+                # No background service (e.g. UI run standalone): purge inline
+                self.db_manager.clear_old_data(retention_days)
+                self._show_clear_message(f"✓ {retention_days} günden eski veriler silindi!")
+                return
+            
+            if not self.retention_service.run_now(retention_days):
+                self._show_clear_message("⏳ Temizlik zaten sürüyor...", "orange")
+                return
             
-            # Show success message
             message = ctk.CTkLabel(
                 self.tab_advanced_settings,
-                text=f"✓ {retention_days} günden eski veriler silindi!",
+                text="🗑️ Eski veriler siliniyor...",
                 font=ctk.CTkFont(size=12, weight="bold"),
-                text_color="#00FF00"
+                text_color="orange"
             )
             message.pack(pady=10)
-            self.root.after(3000, message.destroy)
+            self.root.after(500, lambda: self._poll_clear_progress(message, retention_days))
             
-            print(f"[TimeTraceUI] Old data cleared (retention: {retention_days} days)")
+            print(f"[TimeTraceUI] Old data purge started (retention: {retention_days} days)")
             
         except Exception as e:
             print(f"[TimeTraceUI] Error clearing old data: {e}")
     
-    def _export_data(self):
-        """Export usage data to CSV file."""
-        import csv
-        from datetime import datetime
-        import os
+    def _poll_clear_progress(self, message, retention_days: int):
+        """Update the purge progress label until the background purge finishes."""
+        status = self.retention_service.get_status()
+        if status["busy"]:
+            deleted_rows, total_rows = status["deleted_rows"], status["total_rows"]
+            message.configure(text=f"🗑️ Eski veriler siliniyor... {deleted_rows}/{total_rows}")
+            self.root.after(500, lambda: self._poll_clear_progress(message, retention_days))
+            return
         
+        result = status["last_result"] or {}
+        if result.get("completed"):
+            message.configure(text=f"✓ {retention_days} günden eski {result['deleted_rows']} kayıt silindi!",
+                              text_color="#00FF00")
+        else:
+            message.configure(text="✗ Temizlik tamamlanamadı", text_color="red")
+        self.root.after(3000, message.destroy)
+        print(f"[TimeTraceUI] Old data purge finished: {result}")
+    
+    def _show_clear_message(self, text: str, color: str = "#00FF00"):
+        """Show a temporary status message under the advanced settings."""
+        message = ctk.CTkLabel(
+            self.tab_advanced_settings,
+            text=text,
+            font=ctk.CTkFont(size=12, weight="bold"),
+            text_color=color
+        )
+        message.pack(pady=10)
+        self.root.after(3000, message.destroy)
+    
+    def _export_data(self):
+        """Export usage rows for the chosen range in the background, showing progress."""
         try:
             export_dir = self.export_dir_var.get().strip() if hasattr(self, 'export_dir_var') else ""
-            if export_dir and not os.path.isdir(export_dir):
-                os.makedirs(export_dir, exist_ok=True)
-            filename = f"timetraces_export_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
-            abs_path = os.path.abspath(os.path.join(export_dir or "", filename))
-            
-            # Determine export range
             range_sel = self.export_range_var.get() if hasattr(self, 'export_range_var') else "month"
-            if range_sel == "today":
-                stats = self.db_manager.get_today_stats()
-            elif range_sel == "week":
-                stats = self.db_manager.get_week_stats()
-            else:
-                stats = self.db_manager.get_month_stats()
-            
-            with open(filename, 'w', newline='', encoding='utf-8') as csvfile:
-                writer = csv.writer(csvfile)
-                writer.writerow(["Uygulama", "Saat"])
+            format_sel = self.export_format_var.get() if hasattr(self, 'export_format_var') else "csv"
+            granularity = EXPORT_GRANULARITY_LABELS.get(
+                self.export_granularity_var.get() if hasattr(self, 'export_granularity_var') else "", "day")
+            
+            fmt, compress = format_sel.split(".")[0], format_sel.endswith(".gz")
+            start_date, end_date = preset_range(range_sel)
+            abs_path = os.path.abspath(os.path.join(export_dir, export_file_name(granularity, fmt, compress)))
+            
+            if not self.export_service:
+                # No background service (e.g. UI run standalone): export inline
+                self._show_export_result(export_usage(self.db_manager, abs_path, start_date, end_date,
+                                                      granularity, fmt, compress))
+                return
                 
-                for app_name, seconds in sorted(stats.items(), key=lambda x: x[1], reverse=True):
-                    hours = seconds / 3600
-                    writer.writerow([app_name, f"{hours:.2f}"])
+            if not self.export_service.run_now(abs_path, start_date, end_date, granularity, fmt, compress):
+                self._show_clear_message("⏳ Dışa aktarım zaten sürüyor...", "orange")
+                return
             
-            # Show success message with full path
+            progress_frame = ctk.CTkFrame(self.tab_advanced_settings)
+            progress_frame.pack(pady=10)
             message = ctk.CTkLabel(
-                self.tab_advanced_settings,
-                text=f"✓ Veriler dışa aktarıldı:\n{abs_path}",
+                progress_frame,
+                text="📤 Veriler dışa aktarılıyor...",
                 font=ctk.CTkFont(size=12, weight="bold"),
-                text_color="#00FF00"
+                text_color="orange"
             )
-            message.pack(pady=10)
-            # Keep message visible longer for user to note path
-            self.root.after(7000, message.destroy)
-            
-            # Provide button to open the folder in Explorer
-            def _open_export_folder():
-                try:
-                    os.startfile(os.path.dirname(abs_path))
-                except Exception as e:
-                    print(f"[TimeTraceUI] Error opening folder: {e}")
-            
-            open_btn = ctk.CTkButton(
-                self.tab_advanced_settings,
-                text="📂 Klasörü Aç",
-                command=_open_export_folder,
-                width=140
+            message.pack(side="left", padx=10)
+            cancel_btn = ctk.CTkButton(
+                progress_frame,
+                text="✖ İptal",
+                command=self.export_service.cancel,
+                width=80
             )
-            open_btn.pack(pady=5)
-            # Auto-remove the button after some time
-            self.root.after(15000, open_btn.destroy)
+            cancel_btn.pack(side="left", padx=5)
+            self.root.after(500, lambda: self._poll_export_progress(progress_frame, message))
             
-            print(f"[TimeTraceUI] Data exported to {abs_path}")
+            print(f"[TimeTraceUI] Export started: {start_date}..{end_date} -> {abs_path}")
             
         except Exception as e:
             print(f"[TimeTraceUI] Error exporting data: {e}")
     
+    def _poll_export_progress(self, progress_frame, message):
+        """Update the export progress label until the background export finishes."""
+        status = self.export_service.get_status()
+        if status["busy"]:
+            message.configure(text=f"📤 Veriler dışa aktarılıyor... "
+                                   f"{status['days_done']}/{status['total_days']} gün, {status['rows']} satır")
+            self.root.after(500, lambda: self._poll_export_progress(progress_frame, message))
+            return
+        
+        progress_frame.destroy()
+        self._show_export_result(status["last_result"] or {})
+    
+    def _show_export_result(self, result: dict):
+        """Show the outcome of an export, with a button to open its folder."""
+        if not result.get("completed"):
+            self._show_clear_message("✗ Dışa aktarım tamamlanamadı", "red")
+            print(f"[TimeTraceUI] Export not completed: {result}")
+            return
+        
+        abs_path = result["path"]
+        
+        # Show success message with full path
+        message = ctk.CTkLabel(
+            self.tab_advanced_settings,
+            text=f"✓ {result['rows']} satır dışa aktarıldı:\n{abs_path}",
+            font=ctk.CTkFont(size=12, weight="bold"),
+            text_color="#00FF00"
+        )
+        message.pack(pady=10)
+        # Keep message visible longer for user to note path
+        self.root.after(7000, message.destroy)
+        
+        # Provide button to open the folder in Explorer
+        def _open_export_folder():
+            try:
+                os.startfile(os.path.dirname(abs_path))
+            except Exception as e:
+                print(f"[TimeTraceUI] Error opening folder: {e}")
+        
+        open_btn = ctk.CTkButton(
+            self.tab_advanced_settings,
+            text="📂 Klasörü Aç",
+            command=_open_export_folder,
+            width=140
+        )
+        open_btn.pack(pady=5)
+        # Auto-remove the button after some time
+        self.root.after(15000, open_btn.destroy)
+        
+        print(f"[TimeTraceUI] Data exported to {abs_path}")
+    
     def _setup_help_tab(self):
         """Setup the Help/Tutorial tab."""
         # Create scrollable frame for help content
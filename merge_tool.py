@@ -0,0 +1,425 @@
+"""
+Merge Tool for TimeTrace Application
+Merges many machines' tracker.db files into one aggregate database for a fleet view
+"""
+
+import gzip
+import os
+import shutil
+import sqlite3
+import tempfile
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+from database_archive import ArchiveInfo, ArchiveStore
+from database_manager import LOCAL_DEVICE, DatabaseManager, day_number, day_string
+from database_migrations import UNIX_EPOCH_JULIAN_DAY
+
+
+# Schema name of the source database while it is attached
+SOURCE_SCHEMA = "merge_source"
+
+# Days before a device's watermark that every re-run merges again, so rows
+# a source wrote late for recent days still reach the aggregate
+MERGE_OVERLAP_DAYS = 7
+
+
+class MergeTool:
+    """
+    Merges source databases into an aggregate DatabaseManager database.
+    Each source is one device. Its daily rows are copied with ATTACH and a
+    single INSERT ... SELECT ... ON CONFLICT DO UPDATE per source transaction
+    into device_usage, replacing the device's earlier copy of each day, so a
+    re-run never double counts. A per-device watermark (the last merged day)
+    limits each re-run to that day and the MERGE_OVERLAP_DAYS before it;
+    rows written later than that for older days need a full re-merge.
+    Sources whose file has not changed since the last merge are skipped
+    without being opened. The target's own usage is kept as LOCAL_DEVICE.
+    """
+    
+    def __init__(self, db_manager: DatabaseManager):
+        """
+        Initialize the merge tool.
+        
+        Args:
+            db_manager: DatabaseManager of the aggregate database
+        """
+        self.db_manager = db_manager
+    
+    def merge(self, sources: Iterable[Tuple[str, str]], full: bool = False) -> dict:
+        """
+        Merge source databases, then republish the aggregate daily totals once.
+        
+        Args:
+            sources: (device_name, path) pairs, e.g. from find_sources()
+            full: Ignore watermarks and re-merge every day of every source
+        
+        Returns:
+            Dictionary with sources, merged, skipped, failed and rows (device rows written)
+        """
+        result = {"sources": 0, "merged": 0, "skipped": 0, "failed": 0, "rows": 0}
+        seen = {LOCAL_DEVICE}
+        
+        # The refresh rebuilds the daily totals from device rows only
+        if not self.db_manager.capture_local_usage():
+            result["failed"] += 1
+            return result
+        first_changed_day: Optional[int] = None
+        
+        for device, path in sources:
+            result["sources"] += 1
+            if device in seen:
+                print(f"[MergeTool] Skipping {path}: device name '{device}' is already used in this merge or reserved")
+                result["failed"] += 1
+                continue
+            seen.add(device)
+            
+            try:
+                merged = self._merge_source(device, path, full)
+            except (sqlite3.Error, OSError) as e:
+                print(f"[MergeTool] Error merging {path}: {e}")
+                result["failed"] += 1
+                continue
+            
+            if merged is None:
+                result["skipped"] += 1
+                continue
+            rows, first_day = merged
+            result["merged"] += 1
+            result["rows"] += rows
+            if first_day is not None and (first_changed_day is None or first_day < first_changed_day):
+                first_changed_day = first_day
+        
+        if first_changed_day is not None and not self.db_manager.refresh_fleet_totals(day_string(first_changed_day)):
+            result["failed"] += 1
+        
+        print(f"[MergeTool] Merged {result['merged']} of {result['sources']} sources "
+              f"({result['rows']} device rows), {result['skipped']} unchanged, {result['failed']} failed")
+        return result
+    
+    def _merge_source(self, device: str, path: str, full: bool) -> Optional[Tuple[int, Optional[int]]]:
+        """
+        Merge one source database in one transaction.
+        
+        Args:
+            device: Device name the rows are tagged with
+            path: Source database file
+            full: Ignore the watermark
+        
+        Returns:
+            (rows written, first day written) or None if the source is unchanged
+        """
+        if not os.path.isfile(path):
+            raise FileNotFoundError(f"Source database not found: {path}")
+        
+        connections = self.db_manager.connections
+        signature = _source_signature(path)
+        stored = connections.read().execute('''
+            SELECT source_signature, merged_through_day FROM devices WHERE name = ?
+        ''', (device,)).fetchone()
+        if stored and stored[0] == signature and not full:
+            return None
+        watermark = 0 if full or not stored or stored[1] is None else max(0, stored[1] - MERGE_OVERLAP_DAYS)
+        
+        # Archive files can't be attached inside the transaction; read them first
+        archived_rows = _read_source_archives(path, watermark)
+        
+        with connections.attached(path, SOURCE_SCHEMA), connections.write() as cursor:
+            tables = {name for name, in cursor.execute(
+                f"SELECT name FROM {SOURCE_SCHEMA}.sqlite_master WHERE type = 'table'")}
+            if "usage_logs" not in tables:
+                raise sqlite3.DatabaseError(f"{path} is not a TimeTrace database")
+            
+            cursor.execute('''
+                CREATE TEMP TABLE IF NOT EXISTS merge_stage (
+                    day INTEGER NOT NULL,
+                    app_id INTEGER NOT NULL,
+                    duration_seconds INTEGER NOT NULL
+                )
+            ''')
+            
+            if "apps" in tables:
+                cursor.execute(f"INSERT OR IGNORE INTO apps (name) SELECT name FROM {SOURCE_SCHEMA}.apps")
+                cursor.execute(f'''
+                    INSERT INTO temp.merge_stage (day, app_id, duration_seconds)
+                    SELECT l.day, t.id, l.duration_seconds
+                    FROM {SOURCE_SCHEMA}.usage_logs l
+                    JOIN {SOURCE_SCHEMA}.apps s ON s.id = l.app_id
+                    JOIN main.apps t ON t.name = s.name
+                    WHERE l.day >= ?
+                ''', (watermark,))
+            else:
+                # Legacy (v0) source: text app names and dates
+                cursor.execute(f"INSERT OR IGNORE INTO apps (name) SELECT DISTINCT app_name FROM {SOURCE_SCHEMA}.usage_logs")
+                cursor.execute(f'''
+                    INSERT INTO temp.merge_stage (day, app_id, duration_seconds)
+                    SELECT CAST(julianday(l.date) - {UNIX_EPOCH_JULIAN_DAY} AS INTEGER), t.id, l.duration_seconds
+                    FROM {SOURCE_SCHEMA}.usage_logs l
+                    JOIN main.apps t ON t.name = l.app_name
+                    WHERE l.date >= ?
+                ''', (day_string(watermark),))
+            
+            if archived_rows:
+                cursor.executemany("INSERT OR IGNORE INTO apps (name) VALUES (?)",
+                                   [(name,) for name in {name for _, name, _ in archived_rows}])
+                cursor.executemany('''
+                    INSERT INTO temp.merge_stage (day, app_id, duration_seconds)
+                    SELECT ?, id, ? FROM apps WHERE name = ?
+                ''', [(day, seconds, name) for day, name, seconds in archived_rows])
+            
+            cursor.execute('''
+                INSERT INTO devices (name) VALUES (?) ON CONFLICT(name) DO NOTHING
+            ''', (device,))
+            device_id = cursor.execute("SELECT id FROM devices WHERE name = ?", (device,)).fetchone()[0]
+            
+            # Late writes into an archived month sit beside its archive: sum per key first
+            cursor.execute('''
+                INSERT INTO device_usage (day, app_id, device_id, duration_seconds)
+                SELECT day, app_id, ?, SUM(duration_seconds) FROM temp.merge_stage
+                WHERE true
+                GROUP BY day, app_id
+                ON CONFLICT(day, app_id, device_id) DO UPDATE
+                SET duration_seconds = excluded.duration_seconds
+            ''', (device_id,))
+            rows = cursor.rowcount
+            
+            first_day, last_day = cursor.execute("SELECT MIN(day), MAX(day) FROM temp.merge_stage").fetchone()
+            cursor.execute("DELETE FROM temp.merge_stage")
+            cursor.execute('''
+                UPDATE devices
+                SET source_path = ?, source_signature = ?, merged_at = ?,
+                    merged_through_day = COALESCE(?, merged_through_day)
+                WHERE id = ?
+            ''', (os.path.abspath(path), signature, datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                  last_day, device_id))
+        
+        return rows, first_day
+
+
+def find_sources(paths: Iterable[str]) -> List[Tuple[str, str]]:
+    """
+    Expand command line arguments into (device_name, path) pairs.
+    An argument is a database file, "NAME=PATH" to name the device explicitly,
+    or a directory whose *.db files are each one device.
+    
+    Args:
+        paths: Files, NAME=PATH pairs or directories
+    
+    Returns:
+        List of (device_name, path) pairs
+    """
+    sources = []
+    for argument in paths:
+        device, separator, path = argument.partition("=")
+        if not separator:
+            device, path = None, argument
+        
+        if os.path.isdir(path):
+            for file_name in sorted(os.listdir(path)):
+                if file_name.endswith(".db"):
+                    sources.append((_device_name(os.path.join(path, file_name)), os.path.join(path, file_name)))
+        else:
+            sources.append((device or _device_name(path), path))
+    return sources
+
+
+def _device_name(path: str) -> str:
+    """Default device name: the folder of a tracker.db, otherwise the file name without .db."""
+    path = os.path.abspath(path)
+    if os.path.basename(path) == "tracker.db":
+        return os.path.basename(os.path.dirname(path))
+    return os.path.splitext(os.path.basename(path))[0]
+
+
+def _source_signature(path: str) -> str:
+    """Size and modification time of a database and its WAL; changes whenever the data can."""
+    parts = []
+    for candidate in (path, path + "-wal"):
+        if os.path.exists(candidate):
+            stat = os.stat(candidate)
+            parts.append(f"{stat.st_mtime_ns}:{stat.st_size}")
+    return "/".join(parts)
+
+
+def _read_source_archives(path: str, watermark: int) -> List[Tuple[int, str, int]]:
+    """
+    Read a source's archived months that end on or after the watermark,
+    without changing the source's files (compressed archives are unpacked
+    to a temporary copy).
+    
+    Args:
+        path: Source database file
+        watermark: First day number to merge
+    
+    Returns:
+        List of (day, app_name, duration_seconds) rows
+    """
+    conn = sqlite3.connect(path)
+    try:
+        has_archives = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'archives'").fetchone()
+        archives = [ArchiveInfo(*row) for row in conn.execute('''
+            SELECT first_day, last_day, month, file_name FROM archives WHERE last_day >= ?
+        ''', (watermark,))] if has_archives else []
+    finally:
+        conn.close()
+    
+    store = ArchiveStore(path)
+    rows = []
+    for archive in archives:
+        archive_path = store.path(archive)
+        with tempfile.TemporaryDirectory() as temp_dir:
+            if not os.path.exists(archive_path):
+                if not os.path.exists(archive_path + ".gz"):
+                    print(f"[MergeTool] Archive file missing, skipped: {archive_path}")
+                    continue
+                with gzip.open(archive_path + ".gz", "rb") as source, \
+                        open(os.path.join(temp_dir, archive.file_name), "wb") as target:
+                    shutil.copyfileobj(source, target)
+                archive_path = os.path.join(temp_dir, archive.file_name)
+            
+            conn = sqlite3.connect(archive_path)
+            try:
+                rows.extend(conn.execute('''
+                    SELECT l.day, a.name, l.duration_seconds
+                    FROM usage_logs l
+                    JOIN apps a ON a.id = l.app_id
+                    WHERE l.day >= ?
+                ''', (watermark,)).fetchall())
+            finally:
+                conn.close()
+    return rows
+
+
+def run_benchmark(source_count: int = 200, days: int = 365, apps_per_source: int = 40) -> Dict[str, float]:
+    """
+    Merge synthetic sources into a scratch aggregate database and time it:
+    a first full merge, a re-run with nothing changed, and a re-run after
+    one new day on every tenth source.
+    
+    Args:
+        source_count: Number of source databases
+        days: Days of history per source
+        apps_per_source: Apps used on every day
+    
+    Returns:
+        Dictionary of timings in seconds and the row count of the first merge
+    """
+    import random
+    import time
+    
+    first_day = day_number("2024-01-01")
+    timings: Dict[str, float] = {}
+    with tempfile.TemporaryDirectory() as temp_dir:
+        source_dir = os.path.join(temp_dir, "sources")
+        os.makedirs(source_dir)
+        
+        started = time.perf_counter()
+        expected = 0
+        for index in range(source_count):
+            db = DatabaseManager(os.path.join(source_dir, f"pc-{index:04d}.db"))
+            db.close()
+            names = random.sample(range(apps_per_source * 3), apps_per_source)
+            rows = [(first_day + day, app_id, random.randint(1, 7200))
+                    for day in range(days) for app_id in range(1, apps_per_source + 1)]
+            expected += sum(seconds for _, _, seconds in rows)
+            conn = sqlite3.connect(os.path.join(source_dir, f"pc-{index:04d}.db"))
+            conn.executemany("INSERT INTO apps (id, name) VALUES (?, ?)",
+                             [(app_id, f"app{names[app_id - 1]}.exe") for app_id in range(1, apps_per_source + 1)])
+            conn.executemany("INSERT INTO usage_logs (day, app_id, duration_seconds) VALUES (?, ?, ?)", rows)
+            conn.commit()
+            conn.close()
+        timings["generate"] = time.perf_counter() - started
+        
+        db = DatabaseManager(os.path.join(temp_dir, "fleet.db"))
+        try:
+            tool = MergeTool(db)
+            sources = find_sources([source_dir])
+            
+            started = time.perf_counter()
+            timings["rows"] = tool.merge(sources)["rows"]
+            timings["first_merge"] = time.perf_counter() - started
+            
+            started = time.perf_counter()
+            tool.merge(sources)
+            timings["unchanged_rerun"] = time.perf_counter() - started
+            
+            for _, path in sources[::10]:
+                conn = sqlite3.connect(path)
+                conn.executemany("INSERT INTO usage_logs (day, app_id, duration_seconds) VALUES (?, ?, 60)",
+                                 [(first_day + days, app_id) for app_id in range(1, apps_per_source + 1)])
+                conn.commit()
+                conn.close()
+                expected += 60 * apps_per_source
+            
+            started = time.perf_counter()
+            tool.merge(sources)
+            timings["incremental_rerun"] = time.perf_counter() - started
+            
+            total = sum(db.get_stats_for_date_range(day_string(first_day), day_string(first_day + days)).values())
+            assert total == expected, (total, expected)
+        finally:
+            db.close()
+    return timings
+
+def check_local_totals():
+    """
+    Merge into a database that has usage of its own and check the daily
+    totals: the target's usage survives the merge and a later re-merge,
+    including what it recorded in between, a late source row inside the
+    overlap window is picked up, and nothing is counted twice.
+    
+    Raises:
+        AssertionError: If a total is wrong
+    """
+    with tempfile.TemporaryDirectory() as temp_dir:
+        source_path = os.path.join(temp_dir, "laptop.db")
+        source = DatabaseManager(source_path)
+        source.update_durations([("code.exe", "2024-03-01", 600), ("chrome.exe", "2024-03-02", 300)])
+        source.close()
+        
+        db = DatabaseManager(os.path.join(temp_dir, "tracker.db"))
+        try:
+            tool = MergeTool(db)
+            db.update_durations([("code.exe", "2024-03-01", 100), ("notepad.exe", "2024-03-02", 50)])
+            tool.merge([("laptop", source_path)])
+            totals = db.get_stats_for_date_range("2024-03-01", "2024-03-02")
+            assert totals == {"code.exe": 700, "chrome.exe": 300, "notepad.exe": 50}, totals
+            
+            db.update_durations([("notepad.exe", "2024-03-02", 25)])
+            source = DatabaseManager(source_path)
+            source.update_durations([("code.exe", "2024-03-01", 40), ("chrome.exe", "2024-03-02", 60)])
+            source.close()
+            tool.merge([("laptop", source_path)])
+            totals = db.get_stats_for_date_range("2024-03-01", "2024-03-02")
+            assert totals == {"code.exe": 740, "chrome.exe": 360, "notepad.exe": 75}, totals
+            
+            devices = db.get_device_stats("2024-03-01", "2024-03-02")
+            assert devices == {LOCAL_DEVICE: {"code.exe": 100, "notepad.exe": 75},
+                               "laptop": {"code.exe": 640, "chrome.exe": 360}}, devices
+        finally:
+            db.close()
+
+
+# Merge benchmark and local totals check
+if __name__ == "__main__":
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Benchmark merging many TimeTrace databases")
+    parser.add_argument("--sources", type=int, default=200, help="Source databases (default: 200)")
+    parser.add_argument("--days", type=int, default=365, help="Days per source (default: 365)")
+    parser.add_argument("--apps", type=int, default=40, help="Apps per day (default: 40)")
+    parser.add_argument("--check", action="store_true",
+                        help="Check that merging keeps the target's own usage instead of benchmarking")
+    args = parser.parse_args()
+    
+    if args.check:
+        check_local_totals()
+        print("Local totals OK")
+        raise SystemExit(0)
+    
+    timings = run_benchmark(args.sources, args.days, args.apps)
+    print(f"Generated {args.sources} sources in {timings['generate']:.1f}s")
+    print(f"First merge: {int(timings['rows'])} rows in {timings['first_merge']:.1f}s "
+          f"({timings['rows'] / timings['first_merge']:.0f} rows/s)")
+    print(f"Unchanged re-run: {timings['unchanged_rerun']:.2f}s")
+    print(f"Re-run after one new day on every tenth source: {timings['incremental_rerun']:.2f}s")
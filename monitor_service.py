@@ -3,13 +3,23 @@ Monitor Service for TimeAudit Application
 Background monitoring of application usage using psutil
 """
 
-import psutil
+import os
 import threading
 import time
-from datetime import datetime
-from typing import Dict, Set
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Set, Tuple
 from database_manager import DatabaseManager
 from config_manager import ConfigManager
+from poll_scheduler import MAX_CHECK_INTERVAL_SECONDS, MIN_CHECK_INTERVAL_SECONDS, AdaptivePollScheduler, ElapsedClock
+from process_sampler import create_sampler
+from process_scanner import ProcessScanner
+from usage_journal import UsageJournal
+
+
+SAVE_QUEUE_TIMEOUT_SECONDS = 5.0        # Back-pressure wait before keeping counters for later
+FORCE_SAVE_FLUSH_TIMEOUT_SECONDS = 2.0  # Bound on how long a manual refresh waits for the writer
+JOURNAL_SYNC_INTERVAL_SECONDS = 60.0    # msync the journal this often (process crashes need none)
+JOURNAL_COMMIT_WAIT_SECONDS = 5.0       # Wait for the previous batch to commit before reusing its region
 
 
 class AppMonitor:
@@ -18,13 +28,15 @@ class AppMonitor:
     Runs in a separate thread to avoid blocking the GUI.
     """
     
-    def __init__(self, db_manager: DatabaseManager, config_manager: ConfigManager):
+    def __init__(self, db_manager: DatabaseManager, config_manager: ConfigManager,
+                 journal_path: Optional[str] = None):
         """
-        Initialize the application monitor.
+        Initialize the application monitor and replay counters a crash left in the journal.
         
         Args:
             db_manager: DatabaseManager instance for storing usage data
             config_manager: ConfigManager instance for getting watchlist
+            journal_path: Usage journal file (default: next to the database, ".journal")
         """
         self.db_manager = db_manager
         self.config_manager = config_manager
@@ -33,15 +45,45 @@ class AppMonitor:
         self.is_running = False
         self.monitor_thread = None
         self.lock = threading.Lock()
+        self.save_lock = threading.Lock()  # One save at a time (monitor loop, force_save, stop)
+        self._wake = threading.Event()  # Cuts the wait between checks short on stop
         
         # Tracking data
         self.usage_counters: Dict[str, int] = {}  # app_name -> seconds accumulated
+        self.minute_counters: Dict[Tuple[str, str], int] = {}  # (app_name, "YYYY-MM-DD HH:MM") -> seconds
+        self.open_sessions: Dict[str, List[datetime]] = {}  # app_name -> [start, end of the time counted so far]
+        self.closed_sessions: List[Tuple[str, str, str]] = []  # (app_name, start, end) not yet saved
         self.last_save_time = time.time()
         
+        # Cached PID table; each tick only looks up processes started since the last one.
+        # The sampler backend is /proc on Linux and psutil elsewhere unless set otherwise
+        self.scanner = ProcessScanner(create_sampler(config_manager.get_setting("process_sampler", "auto")))
+        
         # Configuration
         self.check_interval = config_manager.get_setting("check_interval_seconds", 5)
         self.save_interval = config_manager.get_setting("save_interval_seconds", 60)
         
+        # Time between checks: fixed at check_interval, or adaptive between the min and max
+        # intervals (slow while nothing changes, fast right after a watched app starts or stops)
+        self.adaptive_polling = bool(config_manager.get_setting("adaptive_polling", False))
+        self.poll_scheduler = AdaptivePollScheduler(
+            config_manager.get_setting("min_check_interval_seconds", MIN_CHECK_INTERVAL_SECONDS),
+            config_manager.get_setting("max_check_interval_seconds", MAX_CHECK_INTERVAL_SECONDS))
+        self.last_check: Optional[datetime] = None
+        self.last_running: Set[str] = set()
+        
+        # Usage is the time measured between checks on the monotonic clock, not the
+        # nominal interval; suspend gaps are left out (see ElapsedClock)
+        self.clock = ElapsedClock()
+        self.last_interval = self.check_interval
+        
+        # Crash-safe copy of the unsaved minute counters
+        self.journal = UsageJournal(journal_path or os.path.splitext(db_manager.db_path)[0] + ".journal")
+        self.journal_full = False
+        self.uncommitted_batch: Optional[Tuple[int, List[Tuple[str, str, int]]]] = None  # (sequence, rows) last handed over
+        self.last_journal_sync = time.monotonic()
+        self._replay_journal()
+        
         print("[AppMonitor] Monitor initialized")
     
     def start(self):
@@ -52,6 +94,7 @@ class AppMonitor:
                 return
             
             self.is_running = True
+            self._wake.clear()
             self.monitor_thread = threading.Thread(target=self._monitor_loop, daemon=True)
             self.monitor_thread.start()
             print("[AppMonitor] Monitor started")
@@ -64,19 +107,30 @@ class AppMonitor:
                 return
             
             self.is_running = False
+            self._wake.set()
         
         # Wait for thread to finish
         if self.monitor_thread and self.monitor_thread.is_alive():
             self.monitor_thread.join(timeout=10)
         
-        # Save any remaining data
+        # Credit the time since the last check, close open sessions, save any
+        # remaining data and wait for it to reach the database
+        with self.lock:
+            self._record_check(set(), datetime.now(), final=True)
+            for app_name in list(self.open_sessions):
+                self._close_session(app_name)
+            self.last_check = None
+            self.clock.reset()
         self._save_accumulated_time()
+        self.db_manager.flush(timeout=10)
+        self.journal.close()
         print("[AppMonitor] Monitor stopped")
     
     def _monitor_loop(self):
         """
         Main monitoring loop. Runs in a separate thread.
-        Checks running processes every check_interval seconds.
+        Checks running processes every check_interval seconds (or adaptively, see AdaptivePollScheduler).
+        Each running app is credited the time until the next check, as measured at that check.
         """
         print("[AppMonitor] Monitor loop started")
         
@@ -85,99 +139,264 @@ class AppMonitor:
                 # Get current watchlist
                 watchlist = self.config_manager.get_watchlist()
                 
-                if watchlist:
-                    # Check which watched apps are running
-                    running_apps = self._get_running_watched_apps(watchlist)
-                    
-                    # Increment counters for running apps
-                    with self.lock:
-                        for app_name in running_apps:
-                            if app_name not in self.usage_counters:
-                                self.usage_counters[app_name] = 0
-                            self.usage_counters[app_name] += self.check_interval
-                    
-                    # Periodically save accumulated time to database
-                    current_time = time.time()
-                    if current_time - self.last_save_time >= self.save_interval:
-                        self._save_accumulated_time()
-                        self.last_save_time = current_time
+                # Check which watched apps are running (none if the watchlist is empty,
+                # so open sessions still get closed)
+                running_apps = self._get_running_watched_apps(watchlist) if watchlist else set()
+                
+                # Credit the time since the previous check, then choose the time to the next one
+                now = datetime.now()
+                running_changed = running_apps != self.last_running
+                with self.lock:
+                    self._record_check(running_apps, now)
+                interval = self.check_interval
+                if self.adaptive_polling:
+                    interval = self.poll_scheduler.next_interval(running_changed, bool(running_apps))
+                self.last_interval = interval
                 
-                # Sleep for the check interval
-                time.sleep(self.check_interval)
+                # Periodically save accumulated time to database (early if the journal filled up)
+                current_time = time.time()
+                if current_time - self.last_save_time >= self.save_interval or self.journal_full:
+                    self._save_accumulated_time()
+                    self.last_save_time = current_time
+                elif time.monotonic() - self.last_journal_sync >= JOURNAL_SYNC_INTERVAL_SECONDS:
+                    self.journal.sync()
+                    self.last_journal_sync = time.monotonic()
                 
+                # Sleep until the next check
+                self._wake.wait(interval)
+            
             except Exception as e:
                 print(f"[AppMonitor] Error in monitor loop: {e}")
-                time.sleep(self.check_interval)
+                self._wake.wait(self.check_interval)
         
         print("[AppMonitor] Monitor loop ended")
     
     def _get_running_watched_apps(self, watchlist: list) -> Set[str]:
         """
         Check which applications from the watchlist are currently running.
+        Only processes started since the previous check are looked up.
         
         Args:
             watchlist: List of executable names to watch for
-            
+        
         Returns:
             Set of running application names from the watchlist
         """
-        running_apps = set()
-        watchlist_lower = [app.lower() for app in watchlist]
-        
         try:
-            # Iterate through all running processes
-            for proc in psutil.process_iter(['name']):
-                try:
-                    # Get process name
-                    proc_name = proc.info['name']
-                    if proc_name:
-                        proc_name_lower = proc_name.lower()
-                        
-                        # Check if process is in watchlist
-                        if proc_name_lower in watchlist_lower:
-                            running_apps.add(proc_name_lower)
-                
-                except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
-                    # Process terminated or access denied - skip it
-                    continue
-                except Exception as e:
-                    # Unexpected error - log and continue
-                    print(f"[AppMonitor] Error checking process: {e}")
-                    continue
-        
+            return self.scanner.scan(watchlist)
         except Exception as e:
-            print(f"[AppMonitor] Error iterating processes: {e}")
+            print(f"[AppMonitor] Error scanning processes: {e}")
+            self.scanner.clear()
+            return set()
+    
+    def _record_check(self, running_apps: Set[str], now: datetime, final: bool = False):
+        """
+        Account one check: the apps seen at the previous check are credited
+        the time measured since then, apps that appeared are credited from
+        their (backdated) start, and sessions are opened and closed.
+        Called with the lock held.
         
-        return running_apps
+        Args:
+            running_apps: Watched apps running at this check
+            now: Time of this check
+            final: The monitor is stopping (the time since the last check is shorter than planned)
+        """
+        started = self._backdated_starts(running_apps, now) if self.adaptive_polling else {}
+        seconds, gap = self.clock.measure(None if final else self.last_interval)
+        if self.last_check is not None and seconds:
+            minute = self.last_check.strftime("%Y-%m-%d %H:%M")
+            for app_name in self.last_running:
+                self._credit(app_name, minute, seconds)
+        for app_name, start in started.items():
+            self._credit(app_name, start.strftime("%Y-%m-%d %H:%M"), round((now - start).total_seconds()))
+        
+        # The held apps' time ends where their credit does: now, or before a suspend
+        counted_end = self.last_check + timedelta(seconds=seconds) if self.last_check else now
+        self._update_sessions(running_apps, now, counted_end, started, gap)
+        self.last_check, self.last_running = now, running_apps
+    
+    def _credit(self, app_name: str, minute: str, seconds: int):
+        """
+        Add usage to an app's counters and the journal. Called with the lock held.
+        
+        Args:
+            app_name: App that was running
+            minute: Minute the time belongs to ("YYYY-MM-DD HH:MM")
+            seconds: Seconds of usage
+        """
+        if seconds <= 0:
+            return
+        self.usage_counters[app_name] = self.usage_counters.get(app_name, 0) + seconds
+        key = (app_name, minute)
+        self.minute_counters[key] = self.minute_counters.get(key, 0) + seconds
+        if not self.journal.record(app_name, minute, self.minute_counters[key]):
+            self.journal_full = True
+    
+    def _backdated_starts(self, running_apps: Set[str], now: datetime) -> Dict[str, datetime]:
+        """
+        Find when the apps that appeared at this check really started: the
+        process creation time, but no earlier than the previous check (an app
+        newly added to the watchlist may have run for hours).
+        
+        Args:
+            running_apps: Watched apps running at this check
+            now: Time of this check
+        
+        Returns:
+            Dictionary of app_name -> start, for newly seen apps whose start is known
+        """
+        started = {}
+        if self.last_check is None:
+            return started
+        for app_name in running_apps - self.last_running:
+            created = self.scanner.started_at(app_name)
+            if created:
+                start = max(datetime.fromtimestamp(created), self.last_check)
+                if start < now:
+                    started[app_name] = start
+        return started
+    
+    def _update_sessions(self, running_apps: Set[str], now: datetime, counted_end: datetime,
+                         started: Optional[Dict[str, datetime]] = None, gap: bool = False):
+        """
+        Open sessions for apps that started and close those of apps that stopped.
+        Called with the lock held; costs one dictionary lookup per running or open app.
+        
+        Args:
+            running_apps: Watched apps running at this tick
+            now: Time of this tick
+            counted_end: Where the time credited to the open sessions ends
+            started: Backdated starts of apps that appeared at this tick
+            gap: The system was suspended since the previous tick; sessions restart at this one
+        """
+        for session in self.open_sessions.values():
+            session[1] = counted_end
+        if gap:
+            for app_name in list(self.open_sessions):
+                self._close_session(app_name)
+        
+        for app_name in running_apps:
+            if app_name not in self.open_sessions:
+                self.open_sessions[app_name] = [(started or {}).get(app_name, now), now]
+        
+        if len(self.open_sessions) > len(running_apps):
+            for app_name in [app for app in self.open_sessions if app not in running_apps]:
+                self._close_session(app_name)
+    
+    def _close_session(self, app_name: str):
+        """
+        Move an open session to the batch written at the next save.
+        It ends at the check after the app was last seen, where the time counted for it ends.
+        Called with the lock held.
+        
+        Args:
+            app_name: App whose session ended
+        """
+        start, end = self.open_sessions.pop(app_name)
+        self.closed_sessions.append((app_name, start.strftime("%Y-%m-%d %H:%M:%S"),
+                                     end.strftime("%Y-%m-%d %H:%M:%S")))
     
     def _save_accumulated_time(self):
         """
         Save accumulated time to the database and reset counters.
-        Thread-safe operation.
+        Thread-safe operation; the tracking lock is only held to swap the
+        counters out, never while waiting for the writer.
         """
-        with self.lock:
-            if not self.usage_counters:
-                return
+        with self.save_lock:
+            with self.lock:
+                sessions, self.closed_sessions = self.closed_sessions, []
+            if sessions and not self.db_manager.enqueue_sessions(sessions, timeout=SAVE_QUEUE_TIMEOUT_SECONDS):
+                print(f"[AppMonitor] Error saving {len(sessions)} sessions")
+                with self.lock:
+                    self.closed_sessions = sessions + self.closed_sessions
             
-            today = datetime.now().strftime("%Y-%m-%d")
+            # The journal region that rotation reuses holds the previous batch;
+            # it must be committed first (normally long since, a save interval ago).
+            # Otherwise keep collecting in the current region and retry next save
+            if not self._previous_batch_committed():
+                print("[AppMonitor] Previous batch not committed yet, keeping counters until the next save")
+                return
             
-            # Save each app's accumulated time
-            for app_name, seconds in self.usage_counters.items():
-                if seconds > 0:
-                    try:
-                        self.db_manager.update_duration(app_name, today, seconds)
-                        print(f"[AppMonitor] Saved {seconds}s for {app_name}")
-                    except Exception as e:
-                        print(f"[AppMonitor] Error saving time for {app_name}: {e}")
+            with self.lock:
+                if not self.usage_counters:
+                    return
+                
+                # Hand the per-minute samples to the background writer; they
+                # update the daily totals too, each on the day it was measured
+                batch = [(app_name, minute, seconds)
+                         for (app_name, minute), seconds in self.minute_counters.items() if seconds > 0]
+                sequence, apps = self.journal.active_sequence, len(self.usage_counters)
+                self.uncommitted_batch = (sequence, batch)
+                self.usage_counters.clear()
+                self.minute_counters.clear()
+                self.journal.rotate()
+                self.journal_full = False
             
-            # Reset counters after saving
-            self.usage_counters.clear()
+            if self.db_manager.enqueue_samples(batch, timeout=SAVE_QUEUE_TIMEOUT_SECONDS, journal_sequence=sequence):
+                print(f"[AppMonitor] Queued {sum(s for _, _, s in batch)}s for {apps} apps")
+            else:
+                # Still in the journal and in uncommitted_batch: the next save resubmits it
+                print(f"[AppMonitor] Error saving time for {apps} apps, retrying at the next save")
+    
+    def _previous_batch_committed(self) -> bool:
+        """
+        Check that the batch handed over at the last save was committed. If
+        not, submit it again (the writer ignores it if it already has it, and
+        it is needed after a failed hand-over) and wait a little for it.
+        Called with save_lock held and the tracking lock released.
+        
+        Returns:
+            True if the batch is committed (or there is none)
+        """
+        if self.uncommitted_batch is None:
+            return True
+        
+        sequence, batch = self.uncommitted_batch
+        if self.db_manager.get_journal_sequence() < sequence:
+            self.db_manager.enqueue_samples(batch, timeout=SAVE_QUEUE_TIMEOUT_SECONDS, journal_sequence=sequence)
+            self.db_manager.flush(timeout=JOURNAL_COMMIT_WAIT_SECONDS)
+            if self.db_manager.get_journal_sequence() < sequence:
+                return False
+        
+        self.uncommitted_batch = None
+        return True
+    
+    def _replay_journal(self):
+        """
+        Load journal batches that never reached the database back into the
+        counters and save them. They go out under a new batch number, which
+        also marks the old ones as committed.
+        """
+        committed = self.db_manager.get_journal_sequence()
+        batches = self.journal.pending_batches(committed)
+        self.journal.reset(max(committed, self.journal.active_sequence, self.journal.previous_sequence))
+        
+        rows = [row for _, batch in batches for row in batch]
+        if not rows:
+            return
+        
+        with self.lock:
+            for app_name, minute, seconds in rows:
+                self.usage_counters[app_name] = self.usage_counters.get(app_name, 0) + seconds
+                key = (app_name, minute)
+                self.minute_counters[key] = self.minute_counters.get(key, 0) + seconds
+                self.journal.record(app_name, minute, self.minute_counters[key])
+        
+        print(f"[AppMonitor] Replaying {sum(s for _, _, s in rows)}s of unsaved usage from the journal")
+        self._save_accumulated_time()
     
     def force_save(self):
-        """Force an immediate save of accumulated time (for manual refresh)."""
+        """
+        Force an immediate save of accumulated time (for manual refresh).
+        Waits for the background writer to commit it, so following reads see it;
+        call it off the UI thread.
+        """
         self._save_accumulated_time()
         self.last_save_time = time.time()
-        print("[AppMonitor] Forced save completed")
+        if self.db_manager.flush(timeout=FORCE_SAVE_FLUSH_TIMEOUT_SECONDS):
+            print("[AppMonitor] Forced save completed")
+        else:
+            print("[AppMonitor] Forced save not committed (write queue busy or commit failed)")
     
     def get_current_tracking(self) -> Dict[str, int]:
         """
@@ -189,6 +408,40 @@ class AppMonitor:
         with self.lock:
             return self.usage_counters.copy()
     
+    def get_open_sessions(self) -> List[Tuple[str, str, str]]:
+        """
+        Get the sessions still running (not yet in the database).
+        
+        Returns:
+            List of (app_name, start, last_check) tuples, times in "YYYY-MM-DD HH:MM:SS" format
+        """
+        with self.lock:
+            return [(app_name, start.strftime("%Y-%m-%d %H:%M:%S"), end.strftime("%Y-%m-%d %H:%M:%S"))
+                    for app_name, (start, end) in self.open_sessions.items()]
+    
+    def get_polling_stats(self) -> dict:
+        """
+        Get how often processes are being checked.
+        
+        Returns:
+            Dictionary with adaptive (mode), interval (current), polls, average_interval and wakeups_per_hour
+        """
+        if not self.adaptive_polling:
+            return {"adaptive": False, "interval": self.check_interval, "polls": None,
+                    "average_interval": self.check_interval, "wakeups_per_hour": round(3600 / self.check_interval, 1)}
+        return {"adaptive": True, **self.poll_scheduler.get_stats()}
+    
+    def get_timing_stats(self) -> dict:
+        """
+        Get how far the measured time between checks drifted from the planned
+        intervals, and the suspend gaps left out of the usage.
+        
+        Returns:
+            Dictionary as returned by ElapsedClock.get_stats
+        """
+        with self.lock:
+            return self.clock.get_stats()
+    
     def is_active(self) -> bool:
         """
         Check if monitor is currently running.
@@ -231,9 +484,10 @@ if __name__ == "__main__":
     print("Today's stats:", stats)
     
     # Clean up
-    import os
     if os.path.exists("test_tracker.db"):
         os.remove("test_tracker.db")
     if os.path.exists("test_settings.json"):
         os.remove("test_settings.json")
+    if os.path.exists("test_tracker.journal"):
+        os.remove("test_tracker.journal")
     print("Test files cleaned up")
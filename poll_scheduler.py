@@ -0,0 +1,301 @@
+"""
+Poll Scheduler for TimeTrace Application
+Adaptive check intervals and elapsed-time measurement for the monitor loop
+"""
+
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+
+# Interval bounds of the adaptive mode (seconds)
+MIN_CHECK_INTERVAL_SECONDS = 1
+MAX_CHECK_INTERVAL_SECONDS = 30
+
+# The interval grows by this factor for every poll that finds nothing changed
+INTERVAL_GROWTH = 2
+
+# Gaps between checks that are not counted as usage: the wall clock running this
+# much ahead of the monotonic clock means the system was suspended (the monotonic
+# clock stops in suspend on Linux and macOS); a check this much later than
+# planned is treated the same, as on Windows the monotonic clock keeps running
+SUSPEND_GAP_SECONDS = 5.0
+MAX_OVERRUN_SECONDS = 60.0
+
+
+class AdaptivePollScheduler:
+    """
+    Chooses the time until the next process check. Right after a watched
+    app starts or stops it polls at min_interval, so a quick follow-up
+    (a launcher handing over to the game, a crash and restart) is seen
+    promptly; every poll that finds the same watched apps doubles the
+    interval up to max_interval, and with no watched app running it waits
+    max_interval straight away. Other processes starting and exiting are
+    ignored: on a desktop they churn every few seconds, and the interval
+    would never grow.
+    
+    Accounting bound: at each poll AppMonitor credits the apps seen at the
+    previous poll with the time measured since then (ElapsedClock), so a
+    late poll adds no drift, and (in adaptive mode) credits an app that
+    appeared from its process's creation time, but not before the previous
+    poll. Starts are therefore exact; a stop is credited up to the poll
+    that notices it, so it is over-counted by at most the interval in
+    effect when the app was last seen plus that poll's lateness: at most
+    max_interval per session (min_interval if it ends within a few polls
+    of a change) when polls are on time.
+    """
+    
+    def __init__(self, min_interval: int = MIN_CHECK_INTERVAL_SECONDS,
+                 max_interval: int = MAX_CHECK_INTERVAL_SECONDS):
+        """
+        Initialize the scheduler at its shortest interval.
+        
+        Args:
+            min_interval: Interval right after a change (seconds, at least 1)
+            max_interval: Longest interval (seconds, at least min_interval)
+        """
+        self.min_interval = max(1, int(min_interval))
+        self.max_interval = max(self.min_interval, int(max_interval))
+        self.interval = self.min_interval
+        
+        # Statistics
+        self.polls = 0
+        self.polled_seconds = 0
+    
+    def next_interval(self, running_changed: bool, any_running: bool) -> int:
+        """
+        Record a poll and get the time until the next one.
+        
+        Args:
+            running_changed: The set of running watched apps differs from the previous poll
+            any_running: Some watched app is running
+        
+        Returns:
+            Seconds to wait before the next poll
+        """
+        if running_changed:
+            self.interval = self.min_interval
+        elif not any_running:
+            self.interval = self.max_interval
+        else:
+            self.interval = min(self.max_interval, self.interval * INTERVAL_GROWTH)
+        
+        self.polls += 1
+        self.polled_seconds += self.interval
+        return self.interval
+    
+    def get_stats(self) -> dict:
+        """
+        Get polling statistics since start.
+        
+        Returns:
+            Dictionary with interval (current), polls, average_interval and wakeups_per_hour
+        """
+        average = self.polled_seconds / self.polls if self.polls else float(self.interval)
+        return {
+            "interval": self.interval,
+            "polls": self.polls,
+            "average_interval": round(average, 2),
+            "wakeups_per_hour": round(3600 / average, 1),
+        }
+
+
+class ElapsedClock:
+    """
+    Measures the time that really passed between two checks with the
+    monotonic clock, so a slow scan or save does not make usage drift from
+    the nominal interval. A gap caused by a suspend (or an implausibly late
+    check) is cut to the planned interval. Whole seconds are returned and
+    the fractions carried over, so no time is lost to rounding.
+    """
+    
+    def __init__(self, monotonic: Callable[[], float] = time.monotonic, wall: Callable[[], float] = time.time):
+        """
+        Initialize the clock. The first measure() starts it.
+        
+        Args:
+            monotonic: Monotonic clock (seconds)
+            wall: Wall clock (seconds since the epoch)
+        """
+        self.monotonic = monotonic
+        self.wall = wall
+        self._last: Optional[Tuple[float, float]] = None
+        self._carry = 0.0
+        
+        # Statistics
+        self.checks = 0
+        self.expected_seconds = 0.0
+        self.elapsed_seconds = 0.0
+        self.max_overrun = 0.0
+        self.suspends = 0
+        self.suspended_seconds = 0.0
+        self.capped_gaps = 0
+        self.capped_seconds = 0.0
+    
+    def measure(self, expected: Optional[float]) -> Tuple[int, bool]:
+        """
+        Take the time since the previous measure().
+        
+        Args:
+            expected: Planned interval since then, None for a partial one (on stop)
+        
+        Returns:
+            Tuple of (whole seconds to credit, True if a suspend or stall gap was cut out)
+        """
+        mono, wall = self.monotonic(), self.wall()
+        if self._last is None:
+            self._last = (mono, wall)
+            return 0, False
+        
+        elapsed = mono - self._last[0]
+        wall_elapsed = wall - self._last[1]
+        self._last = (mono, wall)
+        
+        gap = False
+        if wall_elapsed - elapsed > SUSPEND_GAP_SECONDS:
+            self.suspends += 1
+            self.suspended_seconds += wall_elapsed - elapsed
+            elapsed = min(elapsed, expected) if expected is not None else elapsed
+            gap = True
+        elif expected is not None and elapsed > expected + MAX_OVERRUN_SECONDS:
+            self.capped_gaps += 1
+            self.capped_seconds += elapsed - expected
+            elapsed = expected
+            gap = True
+        elif expected is not None:
+            self.checks += 1
+            self.expected_seconds += expected
+            self.elapsed_seconds += elapsed
+            self.max_overrun = max(self.max_overrun, elapsed - expected)
+        
+        self._carry += max(0.0, elapsed)
+        whole = int(self._carry)
+        self._carry -= whole
+        return whole, gap
+    
+    def reset(self):
+        """Forget the previous measurement (the monitor stopped); the next measure() starts the clock again."""
+        self._last = None
+    
+    def get_stats(self) -> dict:
+        """
+        Get the timing statistics since start.
+        
+        Returns:
+            Dictionary with checks, expected_seconds, elapsed_seconds, drift_seconds
+            (elapsed minus expected: what nominal intervals would have lost),
+            average_overrun_ms, max_overrun_seconds, suspends, suspended_seconds,
+            capped_gaps and capped_seconds
+        """
+        drift = self.elapsed_seconds - self.expected_seconds
+        return {
+            "checks": self.checks,
+            "expected_seconds": round(self.expected_seconds, 3),
+            "elapsed_seconds": round(self.elapsed_seconds, 3),
+            "drift_seconds": round(drift, 3),
+            "average_overrun_ms": round(drift * 1000 / self.checks, 3) if self.checks else 0.0,
+            "max_overrun_seconds": round(self.max_overrun, 3),
+            "suspends": self.suspends,
+            "suspended_seconds": round(self.suspended_seconds, 1),
+            "capped_gaps": self.capped_gaps,
+            "capped_seconds": round(self.capped_seconds, 1),
+        }
+
+
+def simulate(sessions: List[Tuple[float, float]], duration: float, fixed_interval: Optional[int] = None,
+             min_interval: int = MIN_CHECK_INTERVAL_SECONDS,
+             max_interval: int = MAX_CHECK_INTERVAL_SECONDS, overrun: float = 0.0,
+             churn_interval: Optional[float] = None) -> Dict[str, float]:
+    """
+    Replay one app's usage against the monitor's accounting and count polls.
+    Each poll credits the app seen at the previous poll the time measured
+    since then, cut to the planned interval past MAX_OVERRUN_SECONDS as
+    ElapsedClock does, and the stop at the end credits the last partial interval.
+    Unwatched processes churning between polls reach the scheduler the way
+    they do in AppMonitor, i.e. not at all, so polling matches a quiet system.
+    
+    Args:
+        sessions: Non-overlapping (start, end) seconds when the app runs
+        duration: Seconds simulated
+        fixed_interval: Poll every this many seconds (the old behavior) instead of adaptively
+        min_interval: Adaptive minimum interval
+        max_interval: Adaptive maximum interval
+        overrun: Seconds every poll runs later than planned (scan and save time)
+        churn_interval: An unwatched process starts or exits every this many seconds
+    
+    Returns:
+        Dictionary with polls, wakeups_per_hour, true_seconds, counted_seconds,
+        worst_session_error, bound (the stated worst case per session) and
+        churn_polls (polls that saw unwatched processes start or exit)
+    """
+    scheduler = AdaptivePollScheduler(min_interval, max_interval)
+    now, previous, previous_index, planned = 0.0, None, None, 0
+    counted: Dict[int, float] = {index: 0.0 for index in range(len(sessions))}
+    polls = churn_polls = 0
+    
+    while now < duration:
+        polls += 1
+        if churn_interval and previous is not None and int(now / churn_interval) > int(previous / churn_interval):
+            churn_polls += 1
+        index = next((i for i, (start, end) in enumerate(sessions) if start <= now < end), None)
+        running, was_running = index is not None, previous_index is not None
+        if was_running:
+            elapsed = now - previous
+            counted[previous_index] += planned if elapsed > planned + MAX_OVERRUN_SECONDS else elapsed
+        if fixed_interval:
+            planned = fixed_interval
+        else:
+            planned = scheduler.next_interval(running != was_running, running)
+            if running and not was_running and previous is not None:
+                counted[index] += now - max(sessions[index][0], previous)  # Backdated start
+        previous, previous_index = now, index
+        now += planned + overrun
+    
+    if previous_index is not None:
+        counted[previous_index] += duration - previous
+    
+    errors = [counted[i] - (end - start) for i, (start, end) in enumerate(sessions)]
+    return {
+        "polls": polls,
+        "wakeups_per_hour": polls * 3600 / duration,
+        "true_seconds": sum(end - start for start, end in sessions),
+        "counted_seconds": sum(counted.values()),
+        "worst_session_error": max((abs(error) for error in errors), default=0.0),
+        "bound": float(fixed_interval or max_interval) + overrun,
+        "churn_polls": churn_polls,
+    }
+
+
+# Polling simulation: a day with a handful of app sessions
+if __name__ == "__main__":
+    import argparse
+    import random
+    
+    parser = argparse.ArgumentParser(description="Compare fixed and adaptive polling on a simulated day")
+    parser.add_argument("--sessions", type=int, default=12, help="App sessions in the day (default: 12)")
+    parser.add_argument("--min-interval", type=int, default=MIN_CHECK_INTERVAL_SECONDS)
+    parser.add_argument("--max-interval", type=int, default=MAX_CHECK_INTERVAL_SECONDS)
+    parser.add_argument("--fixed-interval", type=int, default=5, help="The fixed mode's interval (default: 5)")
+    parser.add_argument("--overrun", type=float, default=0.2,
+                        help="Seconds every poll runs late (default: 0.2)")
+    parser.add_argument("--churn-interval", type=float, default=3.0,
+                        help="Seconds between unwatched process starts/exits (default: 3)")
+    args = parser.parse_args()
+    
+    rng = random.Random(1)
+    day = 24 * 3600.0
+    starts = sorted(rng.uniform(0, day - 7200) for _ in range(args.sessions))
+    sessions, last_end = [], 0.0
+    for start in starts:
+        start = max(start, last_end + 60)
+        end = start + rng.uniform(30, 5400)
+        if end < day:
+            sessions.append((start, end))
+            last_end = end
+    
+    for label, result in (("fixed", simulate(sessions, day, args.fixed_interval, overrun=args.overrun,
+                                             churn_interval=args.churn_interval)),
+                          ("adaptive", simulate(sessions, day, None, args.min_interval, args.max_interval,
+                                                args.overrun, args.churn_interval))):
+        print(f"{label:>8}: {result['wakeups_per_hour']:.0f} wakeups/h, counted {result['counted_seconds']:.0f}s "
+              f"of {result['true_seconds']:.0f}s, worst session error {result['worst_session_error']:.1f}s "
+              f"(bound {result['bound']:.0f}s), {result['churn_polls']} polls saw process churn")
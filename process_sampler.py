@@ -0,0 +1,349 @@
+"""
+Process Samplers for TimeTrace Application
+Backends that list processes and read their names for ProcessScanner
+"""
+
+import os
+import sys
+from abc import ABC, abstractmethod
+from typing import Dict, Iterable, List, Optional, Tuple
+
+try:
+    import psutil
+    PSUTIL_AVAILABLE = True
+except ImportError:
+    PSUTIL_AVAILABLE = False
+
+
+# (create_time, name) of a PID, or None if no such process exists
+ProcessInfo = Optional[Tuple[float, Optional[str]]]
+
+# Names this long may be truncated by the kernel (TASK_COMM_LEN - 1)
+COMM_NAME_LENGTH = 15
+
+# Upper bound of a /proc/<pid>/stat line
+STAT_READ_BYTES = 4096
+
+
+class ProcessSampler(ABC):
+    """
+    Source of process information for ProcessScanner. A backend lists the
+    current PIDs and reports the creation time and executable name of one
+    PID; both must be cheap, they run on every monitor tick.
+    """
+    
+    name = ""
+    
+    @classmethod
+    def available(cls) -> bool:
+        """
+        Check whether this backend works on this system.
+        
+        Returns:
+            True if the backend can be used
+        """
+        return False
+    
+    @abstractmethod
+    def list_pids(self) -> Iterable[int]:
+        """
+        List the running processes.
+        
+        Returns:
+            Current PIDs
+        """
+    
+    @abstractmethod
+    def inspect(self, pid: int) -> ProcessInfo:
+        """
+        Get the creation time and executable name of a process.
+        
+        Args:
+            pid: Process ID
+        
+        Returns:
+            (create_time, name), name None if it cannot be read; None if the process is gone
+        """
+    
+    def exe(self, pid: int) -> Optional[str]:
+        """
+        Get the full path of a process's executable. Only called for watchlist
+        path rules; backends that cannot tell return None.
+        
+        Args:
+            pid: Process ID
+        
+        Returns:
+            Executable path, or None if unknown
+        """
+        return None
+    
+    def cmdline(self, pid: int) -> Optional[List[str]]:
+        """
+        Get the command-line arguments of a process. Only called for watchlist
+        command-line rules; backends that cannot tell return None.
+        
+        Args:
+            pid: Process ID
+        
+        Returns:
+            Arguments, or None if unknown
+        """
+        return None
+
+
+class PsutilSampler(ProcessSampler):
+    """Portable backend on psutil (Windows, macOS, Linux)."""
+    
+    name = "psutil"
+    
+    @classmethod
+    def available(cls) -> bool:
+        return PSUTIL_AVAILABLE
+    
+    def list_pids(self) -> Iterable[int]:
+        return psutil.pids()
+    
+    def inspect(self, pid: int) -> ProcessInfo:
+        try:
+            proc = psutil.Process(pid)
+        except psutil.NoSuchProcess:
+            return None
+        except psutil.AccessDenied:
+            return 0.0, None
+        
+        try:
+            with proc.oneshot():
+                try:
+                    create_time = proc.create_time()
+                except psutil.AccessDenied:
+                    create_time = 0.0
+                try:
+                    name = proc.name()
+                except (psutil.AccessDenied, psutil.ZombieProcess):
+                    name = None
+        except psutil.ZombieProcess:
+            return 0.0, None
+        except psutil.NoSuchProcess:
+            return None
+        return create_time, name
+    
+    def exe(self, pid: int) -> Optional[str]:
+        try:
+            return psutil.Process(pid).exe() or None
+        except psutil.Error:
+            return None
+    
+    def cmdline(self, pid: int) -> Optional[List[str]]:
+        try:
+            return psutil.Process(pid).cmdline()
+        except psutil.Error:
+            return None
+
+
+class ProcFsSampler(ProcessSampler):
+    """
+    Linux backend reading /proc directly: one directory scan per tick and one
+    small read of /proc/<pid>/stat per new process, which holds both the name
+    (comm) and the start time. /proc/<pid>/cmdline is read only for names the
+    kernel may have truncated, to report the same full name psutil does.
+    """
+    
+    name = "procfs"
+    
+    def __init__(self, proc_path: str = "/proc"):
+        """
+        Initialize the backend.
+        
+        Args:
+            proc_path: Mount point of procfs
+        """
+        self.proc_path = proc_path
+        self.clock_ticks = os.sysconf("SC_CLK_TCK")
+        self.boot_time = _read_boot_time(proc_path)
+    
+    @classmethod
+    def available(cls) -> bool:
+        return sys.platform.startswith("linux") and os.path.exists("/proc/self/stat")
+    
+    def list_pids(self) -> Iterable[int]:
+        with os.scandir(self.proc_path) as entries:
+            return [int(entry.name) for entry in entries if entry.name.isdigit()]
+    
+    def inspect(self, pid: int) -> ProcessInfo:
+        try:
+            data = _read_file(f"{self.proc_path}/{pid}/stat", STAT_READ_BYTES)
+        except (FileNotFoundError, ProcessLookupError):
+            return None
+        except OSError:
+            return 0.0, None
+        if not data:
+            return None
+        
+        # The name is in parentheses and may itself contain spaces and parentheses
+        end = data.rfind(b")")
+        name = os.fsdecode(data[data.find(b"(") + 1:end])
+        start_ticks = data[end + 2:].split()[19]
+        create_time = float(start_ticks) / self.clock_ticks + self.boot_time
+        
+        if len(name) >= COMM_NAME_LENGTH:
+            name = self._full_name(pid, name)
+        return create_time, name
+    
+    def exe(self, pid: int) -> Optional[str]:
+        try:
+            return os.readlink(f"{self.proc_path}/{pid}/exe")
+        except OSError:
+            return None
+    
+    def cmdline(self, pid: int) -> Optional[List[str]]:
+        try:
+            with open(f"{self.proc_path}/{pid}/cmdline", "rb") as file:
+                data = file.read()
+        except OSError:
+            return None
+        
+        # Arguments are NUL-separated; programs that rewrite their title may use spaces
+        separator = b"\0" if data.endswith(b"\0") else b" "
+        if data.endswith(separator):
+            data = data[:-1]
+        args = data.split(separator)
+        if separator == b"\0" and len(args) == 1 and b" " in data:
+            args = data.split(b" ")
+        return [os.fsdecode(arg) for arg in args] if data else []
+    
+    def _full_name(self, pid: int, name: str) -> str:
+        """Extend a possibly truncated comm name from the first cmdline argument, as psutil does."""
+        args = self.cmdline(pid)
+        extended = os.path.basename(args[0]) if args else ""
+        return extended if extended.startswith(name) else name
+
+
+# Backends by setting value, in the order "auto" tries them
+SAMPLERS = {
+    ProcFsSampler.name: ProcFsSampler,
+    PsutilSampler.name: PsutilSampler,
+}
+
+
+def create_sampler(name: str = "auto") -> ProcessSampler:
+    """
+    Create the process sampler to use.
+    
+    Args:
+        name: "auto" (the /proc backend on Linux, psutil elsewhere) or a key of SAMPLERS
+    
+    Returns:
+        Sampler instance; an unknown or unavailable name falls back to "auto"
+    
+    Raises:
+        RuntimeError: If no backend works on this system
+    """
+    if name != "auto":
+        sampler_class = SAMPLERS.get(name)
+        if sampler_class and sampler_class.available():
+            return sampler_class()
+        reason = " (psutil is not installed)" if sampler_class is PsutilSampler else ""
+        print(f"[ProcessSampler] Sampler {name!r} is not available{reason}, choosing automatically")
+    
+    for sampler_class in SAMPLERS.values():
+        if sampler_class.available():
+            return sampler_class()
+    raise RuntimeError("No process sampler available (install psutil)")
+
+
+def available_samplers() -> List[str]:
+    """
+    List the backends that work on this system.
+    
+    Returns:
+        Sampler names, preferred first
+    """
+    return [name for name, sampler_class in SAMPLERS.items() if sampler_class.available()]
+
+
+def check_sampler_conformance(names: Optional[List[str]] = None) -> List[str]:
+    """
+    Sample the live process table with several backends and compare them:
+    the same PIDs, and for each PID the same name and creation time (within
+    one clock tick). Processes that start, exit or exec while sampling are
+    sampled again before a difference counts.
+    
+    Args:
+        names: Backends to compare (default: every available one)
+    
+    Returns:
+        List of differences; empty if the backends agree
+    """
+    samplers = [SAMPLERS[name]() for name in (names or available_samplers())]
+    if len(samplers) < 2:
+        return []
+    
+    reference, others = samplers[0], samplers[1:]
+    problems = []
+    
+    # PIDs listed twice by one backend should be listed by the others in between
+    first = set(reference.list_pids())
+    listed = {sampler.name: set(sampler.list_pids()) for sampler in others}
+    stable = first & set(reference.list_pids())
+    for sampler in others:
+        missing = stable - listed[sampler.name]
+        extra = listed[sampler.name] - first
+        extra = {pid for pid in extra if reference.inspect(pid) is None and sampler.inspect(pid) is not None}
+        missing = {pid for pid in missing if reference.inspect(pid) is not None and sampler.inspect(pid) is None}
+        if missing:
+            problems.append(f"{sampler.name} does not list PIDs {sorted(missing)[:10]}")
+        if extra:
+            problems.append(f"{sampler.name} lists PIDs {sorted(extra)[:10]} that {reference.name} does not")
+    
+    tolerance = 1.0 / os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 0.01
+    for pid in sorted(stable):
+        for _ in range(2):
+            infos: Dict[str, ProcessInfo] = {sampler.name: sampler.inspect(pid) for sampler in samplers}
+            difference = _compare_infos(reference.name, infos, tolerance)
+            if not difference:
+                break
+        if difference:
+            problems.append(f"PID {pid}: {difference}")
+    return problems
+
+
+def _compare_infos(reference: str, infos: Dict[str, ProcessInfo], tolerance: float) -> Optional[str]:
+    """Describe how the backends' views of one PID differ, or None if they agree (or it exited)."""
+    if any(info is None for info in infos.values()):
+        return None
+    expected_time, expected_name = infos[reference]
+    for name, (create_time, process_name) in infos.items():
+        if process_name != expected_name:
+            return f"{reference} name {expected_name!r}, {name} name {process_name!r}"
+        if expected_time and create_time and abs(create_time - expected_time) > tolerance:
+            return f"{reference} create_time {expected_time}, {name} create_time {create_time}"
+    return None
+
+
+def _read_file(path: str, size: int) -> bytes:
+    """Read up to size bytes of a small (procfs) file without a buffered file object."""
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        return os.read(fd, size)
+    finally:
+        os.close(fd)
+
+
+def _read_boot_time(proc_path: str) -> float:
+    """System boot time in seconds since the epoch, from the btime line of /proc/stat."""
+    with open(f"{proc_path}/stat", "rb") as file:
+        for line in file:
+            if line.startswith(b"btime"):
+                return float(line.split()[1])
+    raise RuntimeError(f"No btime line in {proc_path}/stat")
+
+
+# Conformance check of the available backends
+if __name__ == "__main__":
+    print(f"Available samplers: {', '.join(available_samplers()) or 'none'}")
+    differences = check_sampler_conformance()
+    for difference in differences:
+        print(f"  {difference}")
+    print("Samplers agree" if not differences else f"{len(differences)} differences")
+    sys.exit(1 if differences else 0)
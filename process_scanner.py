@@ -0,0 +1,292 @@
+"""
+Process Scanner for TimeTrace Application
+Incremental (PID-diff) detection of running watchlisted applications
+"""
+
+import random
+import time
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from config_manager import normalize_app_name
+from process_sampler import SAMPLERS, ProcessInfo, ProcessSampler, available_samplers, create_sampler
+from watchlist_matcher import WatchlistMatcher
+
+
+# Cached PIDs re-checked per tick, so an entry whose PID was reused
+# (exited and handed to a new process between two ticks) is corrected
+# within a bounded number of ticks. Watched PIDs are re-checked every tick.
+REVALIDATE_PER_TICK = 8
+
+
+class ProcessScanner:
+    """
+    Answers "which watched apps are running" from a cached PID table instead
+    of reading the name of every process on every tick. Each scan fetches only
+    the current PID set, looks up new PIDs, drops vanished ones and re-checks
+    the watched PIDs plus a few others (see REVALIDATE_PER_TICK) by creation time.
+    """
+    
+    def __init__(self, sampler: Optional[ProcessSampler] = None,
+                 revalidate_per_tick: int = REVALIDATE_PER_TICK):
+        """
+        Initialize an empty scanner. The first scan looks up every process.
+        
+        Args:
+            sampler: Backend that lists and inspects processes (default: create_sampler())
+            revalidate_per_tick: Unwatched cached PIDs re-checked per scan
+        """
+        self.sampler = sampler or create_sampler()
+        self.revalidate_per_tick = revalidate_per_tick
+        
+        self.processes: Dict[int, Tuple[float, Optional[str], bool]] = {}  # pid -> (create_time, name, watched?)
+        self.watched_pids: Dict[int, str] = {}  # pid -> name, for watched processes only
+        self.matcher = WatchlistMatcher(())
+        self._revalidate_queue: List[int] = []
+        
+        # Counters of the last scan
+        self.last_new = 0
+        self.last_gone = 0
+    
+    def scan(self, watchlist: Iterable[str]) -> Set[str]:
+        """
+        Update the PID table and report the watched apps that are running.
+        
+        Args:
+            watchlist: Watchlist entries (names, patterns and rules, see watchlist_matcher)
+        
+        Returns:
+            Set of running watched processes' names (normalized)
+        """
+        watchlist = tuple(watchlist)
+        if watchlist != self.matcher.entries:
+            self._set_watchlist(watchlist)
+        
+        current = set(self.sampler.list_pids())
+        gone = self.processes.keys() - current
+        for pid in gone:
+            self._forget(pid)
+        
+        new = current - self.processes.keys()
+        for pid in new:
+            self._inspect(pid)
+        
+        # PIDs may have been reused since they were cached: check every watched one
+        # (few) and a rotating slice of the rest
+        for pid in list(self.watched_pids):
+            self._revalidate(pid)
+        if self.revalidate_per_tick:
+            if not self._revalidate_queue:
+                self._revalidate_queue = list(self.processes)
+            for _ in range(min(self.revalidate_per_tick, len(self._revalidate_queue))):
+                pid = self._revalidate_queue.pop()
+                if pid in self.processes and pid not in self.watched_pids:
+                    self._revalidate(pid)
+        
+        self.last_new, self.last_gone = len(new), len(gone)
+        return set(self.watched_pids.values())
+    
+    def started_at(self, name: str) -> Optional[float]:
+        """
+        Get when a watched app's oldest running process started.
+        
+        Args:
+            name: Watched app name as returned by scan()
+        
+        Returns:
+            Creation time in seconds since the epoch, or None if unknown
+        """
+        return min((self.processes[pid][0] for pid, watched_name in self.watched_pids.items()
+                    if watched_name == name and self.processes[pid][0]), default=None)
+    
+    def clear(self):
+        """Forget every cached process; the next scan looks all of them up again."""
+        self.processes.clear()
+        self.watched_pids.clear()
+        self._revalidate_queue = []
+    
+    def _set_watchlist(self, watchlist: Tuple[str, ...]):
+        """Compile a changed watchlist and re-flag the cached processes (no lookups unless path or command-line rules need them)."""
+        self.matcher = WatchlistMatcher(watchlist)
+        self.watched_pids.clear()
+        for pid, (create_time, name, _) in self.processes.items():
+            watched = self._matches(pid, name)
+            self.processes[pid] = (create_time, name, watched)
+            if watched:
+                self.watched_pids[pid] = name
+    
+    def _inspect(self, pid: int):
+        """Look up a PID and cache it; a PID that is already gone is not cached."""
+        info = self.sampler.inspect(pid)
+        if info is None:
+            return
+        create_time, name = info
+        name = normalize_app_name(name) if name else None
+        watched = self._matches(pid, name)
+        self.processes[pid] = (create_time, name, watched)
+        if watched:
+            self.watched_pids[pid] = name
+    
+    def _matches(self, pid: int, name: Optional[str]) -> bool:
+        """Check a process against the watchlist; its path and command line are fetched only if rules need them."""
+        if not name:
+            return False
+        if not self.matcher.needs_details:
+            return self.matcher.match_name(name)
+        return self.matcher.match(name, lambda: self.sampler.exe(pid), lambda: self.sampler.cmdline(pid))
+    
+    def _revalidate(self, pid: int):
+        """Re-inspect a cached PID if its creation time changed (the PID was reused)."""
+        info = self.sampler.inspect(pid)
+        if info is not None and info[0] == self.processes[pid][0]:
+            return
+        self._forget(pid)
+        if info is not None:
+            self._inspect(pid)
+    
+    def _forget(self, pid: int):
+        """Drop a PID from the table."""
+        del self.processes[pid]
+        self.watched_pids.pop(pid, None)
+
+
+def full_scan(watchlist: Iterable[str], processes: Iterable[Tuple[int, Optional[str]]]) -> Set[str]:
+    """
+    Reference implementation of the scan ProcessScanner replaces: read and
+    normalize every process name on every tick.
+    
+    Args:
+        watchlist: Executable names to watch for
+        processes: (pid, name) of every running process
+    
+    Returns:
+        Set of running application names from the watchlist (normalized)
+    """
+    watchlist_lower = [normalize_app_name(app) for app in watchlist]
+    return {normalize_app_name(name) for _, name in processes
+            if name and normalize_app_name(name) in watchlist_lower}
+
+
+class _SimulatedProcesses(ProcessSampler):
+    """
+    Synthetic process table for the benchmark. Every per-process lookup
+    spins for lookup_cost_us, standing in for the system call (or /proc read)
+    a real name or create_time lookup costs.
+    """
+    
+    def __init__(self, count: int, watched: List[str], lookup_cost_us: float, seed: int = 1):
+        self.random = random.Random(seed)
+        self.lookup_cost = lookup_cost_us / 1e6
+        self.watched = watched
+        self.next_pid = 4
+        self.clock = 0.0
+        self.table: Dict[int, Tuple[float, str]] = {}
+        for _ in range(count):
+            self._spawn()
+    
+    def _spawn(self):
+        name = (self.random.choice(self.watched) if self.random.random() < 0.01
+                else f"Process{self.random.randrange(300)}.exe")
+        self.table[self.next_pid] = (self.clock, name)
+        self.next_pid += 4
+    
+    def churn(self, fraction: float):
+        """Replace a fraction of the processes with new ones (one tick's worth of churn)."""
+        self.clock += 1.0
+        for pid in self.random.sample(list(self.table), int(len(self.table) * fraction)):
+            del self.table[pid]
+            self._spawn()
+    
+    def _spin(self):
+        """Burn one simulated lookup."""
+        end = time.perf_counter() + self.lookup_cost
+        while time.perf_counter() < end:
+            pass
+    
+    def list_pids(self) -> List[int]:
+        """Current PIDs (one cheap call, like psutil.pids)."""
+        return list(self.table)
+    
+    def inspect(self, pid: int) -> ProcessInfo:
+        """(create_time, name) of one process, at the cost of one lookup."""
+        self._spin()
+        return self.table.get(pid)
+    
+    def iter_names(self):
+        """(pid, name) of every process, one lookup each, like psutil.process_iter(['name'])."""
+        for pid, (_, name) in self.table.items():
+            self._spin()
+            yield pid, name
+
+
+def run_benchmark(process_counts: Tuple[int, ...] = (100, 1000, 5000), ticks: int = 200,
+                  churn: float = 0.002, lookup_cost_us: float = 10.0) -> List[Dict[str, float]]:
+    """
+    Time the full scan against ProcessScanner on synthetic process tables.
+    
+    Args:
+        process_counts: Table sizes to measure
+        ticks: Scans per measurement
+        churn: Fraction of processes replaced between ticks
+        lookup_cost_us: Simulated cost of one per-process lookup
+    
+    Returns:
+        One dictionary per table size with ticks/second and CPU milliseconds per tick of each scan
+    """
+    watchlist = ["Chrome.exe", "code.exe", "valorant.exe", "discord.exe"]
+    results = []
+    for count in process_counts:
+        row: Dict[str, float] = {"processes": count}
+        for label in ("full", "pid_diff"):
+            processes = _SimulatedProcesses(count, watchlist, lookup_cost_us)
+            scanner = ProcessScanner(processes)
+            if label == "pid_diff":
+                scanner.scan(watchlist)  # The first scan looks up everything
+            
+            wall, cpu = time.perf_counter(), time.process_time()
+            for _ in range(ticks):
+                processes.churn(churn)
+                if label == "full":
+                    running = full_scan(watchlist, processes.iter_names())
+                else:
+                    running = scanner.scan(watchlist)
+            wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+            
+            expected = full_scan(watchlist, ((pid, name) for pid, (_, name) in processes.table.items()))
+            assert running == expected, (label, running, expected)
+            row[f"{label}_ticks_per_second"] = ticks / wall
+            row[f"{label}_cpu_ms_per_tick"] = cpu * 1000 / ticks
+        results.append(row)
+    return results
+
+
+# Scan benchmark
+if __name__ == "__main__":
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Benchmark the PID-diff process scanner against a full scan")
+    parser.add_argument("--ticks", type=int, default=200, help="Scans per measurement (default: 200)")
+    parser.add_argument("--churn", type=float, default=0.002,
+                        help="Fraction of processes replaced per tick (default: 0.002)")
+    parser.add_argument("--lookup-us", type=float, default=10.0,
+                        help="Simulated cost of one process lookup in microseconds (default: 10)")
+    args = parser.parse_args()
+    
+    print(f"{'processes':>9}  {'full ticks/s':>12}  {'full cpu ms':>11}  {'diff ticks/s':>12}  {'diff cpu ms':>11}")
+    for row in run_benchmark(ticks=args.ticks, churn=args.churn, lookup_cost_us=args.lookup_us):
+        print(f"{row['processes']:>9}  {row['full_ticks_per_second']:>12.1f}  {row['full_cpu_ms_per_tick']:>11.3f}  "
+              f"{row['pid_diff_ticks_per_second']:>12.1f}  {row['pid_diff_cpu_ms_per_tick']:>11.3f}")
+    
+    # The same comparison on this machine's real process table, per available sampler
+    for name in available_samplers():
+        sampler = SAMPLERS[name]()
+        scanner = ProcessScanner(sampler)
+        scanner.scan([])
+        
+        def sampler_full_scan():
+            return full_scan([], ((pid, (sampler.inspect(pid) or (0.0, None))[1]) for pid in sampler.list_pids()))
+        
+        for label, scan in (("full", sampler_full_scan), ("pid_diff", lambda: scanner.scan([]))):
+            started = time.process_time()
+            for _ in range(args.ticks):
+                scan()
+            cpu_ms = (time.process_time() - started) * 1000 / args.ticks
+            print(f"This machine ({len(scanner.processes)} processes), {name} {label}: {cpu_ms:.3f} cpu ms per tick")
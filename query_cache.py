@@ -0,0 +1,153 @@
+"""
+Query Cache for TimeTrace Application
+LRU cache of read results, invalidated by the days each write touches
+"""
+
+import threading
+from collections import OrderedDict, deque
+from typing import Any, Hashable, Iterable, Optional, Tuple
+
+
+# Cache sizing
+MAX_ENTRIES = 256            # Cached results kept before the least recently used is evicted
+WRITE_HISTORY_SIZE = 1024    # Recent writes remembered to validate reads that overlapped them
+
+# Day bounds for results that depend on every day (e.g. the list of tracked apps)
+FIRST_DAY = -(1 << 31)
+LAST_DAY = 1 << 31
+
+
+class QueryCache:
+    """
+    Caches query results together with the range of days they were computed from.
+    Every committed write bumps a generation counter and evicts only the
+    entries whose day range overlaps the days it wrote, so writes for today
+    leave cached totals of closed historical ranges untouched.
+    """
+    
+    def __init__(self, max_entries: int = MAX_ENTRIES):
+        """
+        Initialize an empty cache.
+        
+        Args:
+            max_entries: Maximum number of cached results (0 disables caching)
+        """
+        self.max_entries = max_entries
+        self.generation = 0
+        self._entries: "OrderedDict[Hashable, Tuple[int, int, Any]]" = OrderedDict()
+        self._writes = deque()  # (generation, first_day, last_day) of recent writes
+        self._forgotten_generation = 0  # Newest generation dropped from _writes
+        self._lock = threading.Lock()
+        
+        # Statistics
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+    
+    def get(self, key: Hashable) -> Tuple[bool, Any]:
+        """
+        Look up a cached result and mark it as recently used.
+        
+        Args:
+            key: Query name and parameters
+        
+        Returns:
+            (found, value) tuple; value is None when not found
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return False, None
+            
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return True, entry[2]
+    
+    def put(self, key: Hashable, first_day: int, last_day: int, value: Any, generation: int) -> bool:
+        """
+        Store a result computed from the days first_day..last_day.
+        The result is dropped if a write to those days committed after
+        `generation` was read, because the query may have seen either state.
+        
+        Args:
+            key: Query name and parameters
+            first_day: First day number the result depends on
+            last_day: Last day number the result depends on
+            value: Result to cache
+            generation: Value of `generation` read before the query ran
+        
+        Returns:
+            True if the result was cached
+        """
+        if self.max_entries <= 0:
+            return False
+        
+        with self._lock:
+            if generation < self.generation:
+                if generation < self._forgotten_generation:
+                    return False  # Too many writes since; can't tell whether they overlap
+                for write_generation, write_first, write_last in reversed(self._writes):
+                    if write_generation <= generation:
+                        break
+                    if write_first <= last_day and first_day <= write_last:
+                        return False
+            
+            self._entries[key] = (first_day, last_day, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+            return True
+    
+    def invalidate(self, day_ranges: Iterable[Tuple[Optional[int], Optional[int]]]):
+        """
+        Record a committed write and evict every result it may have changed.
+        
+        Args:
+            day_ranges: (first_day, last_day) ranges the write touched;
+                        None for either bound means unbounded on that side
+        """
+        ranges = [(FIRST_DAY if first is None else first, LAST_DAY if last is None else last)
+                  for first, last in day_ranges]
+        if not ranges:
+            return
+        
+        with self._lock:
+            self.generation += 1
+            for first_day, last_day in ranges:
+                self._writes.append((self.generation, first_day, last_day))
+            while len(self._writes) > WRITE_HISTORY_SIZE:
+                self._forgotten_generation = self._writes.popleft()[0]
+            
+            stale = [key for key, (first, last, _) in self._entries.items()
+                     if any(first <= last_day and first_day <= last for first_day, last_day in ranges)]
+            for key in stale:
+                del self._entries[key]
+            self.invalidations += len(stale)
+    
+    def clear(self):
+        """Drop every cached result."""
+        self.invalidate([(None, None)])
+    
+    def stats(self) -> dict:
+        """
+        Get cache statistics.
+        
+        Returns:
+            Dictionary with size, hits, misses, hit_rate, evictions,
+            invalidations and the current write generation
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "generation": self.generation
+            }
@@ -0,0 +1,178 @@
+"""
+Retention Service for TimeTrace
+Purges old usage records in the background, on demand or on a schedule
+"""
+
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Optional
+from database_manager import DatabaseManager
+from config_manager import ConfigManager
+
+
+# Scheduling
+DEFAULT_RETENTION_DAYS = 90
+AUTO_PURGE_STARTUP_DELAY_SECONDS = 120     # Let the app settle before the first automatic purge
+AUTO_PURGE_INTERVAL_SECONDS = 6 * 60 * 60  # Re-check the retention_days setting this often
+
+
+class RetentionService:
+    """
+    Runs DatabaseManager.purge_before on a background thread.
+    Purges can be requested from the UI (run_now) or run automatically
+    against the retention_days setting when auto_retention is enabled.
+    Only one purge runs at a time and it can be cancelled between chunks.
+    """
+    
+    def __init__(self, db_manager: DatabaseManager, config_manager: ConfigManager):
+        """
+        Initialize retention service.
+        
+        Args:
+            db_manager: DatabaseManager instance
+            config_manager: ConfigManager instance
+        """
+        self.db_manager = db_manager
+        self.config_manager = config_manager
+        self.running = False
+        self.thread = None
+        
+        self._wake = threading.Event()
+        self._cancel = threading.Event()
+        self._lock = threading.Lock()
+        self._requested_days: Optional[int] = None
+        self._progress_callback: Optional[Callable[[int, int], None]] = None
+        self._busy = False
+        self._next_auto_run = 0.0
+        
+        # Status of the current / last purge
+        self.progress = (0, 0)  # (deleted_rows, total_rows)
+        self.last_result: Optional[dict] = None
+        self.last_run: Optional[datetime] = None
+        
+        print("[RetentionService] Initialized")
+    
+    def start(self):
+        """Start the retention thread."""
+        if self.running:
+            return
+        
+        self.running = True
+        self._next_auto_run = time.monotonic() + AUTO_PURGE_STARTUP_DELAY_SECONDS
+        self.thread = threading.Thread(target=self._retention_loop, name="RetentionService", daemon=True)
+        self.thread.start()
+        print("[RetentionService] Started")
+    
+    def stop(self):
+        """Cancel any running purge and stop the retention thread."""
+        self.running = False
+        self._cancel.set()
+        self._wake.set()
+        if self.thread:
+            self.thread.join(timeout=5)
+        print("[RetentionService] Stopped")
+    
+    def run_now(self, days_to_keep: Optional[int] = None,
+                progress_callback: Optional[Callable[[int, int], None]] = None) -> bool:
+        """
+        Request a purge on the background thread and return immediately.
+        
+        Args:
+            days_to_keep: Days of data to retain (default: retention_days setting)
+            progress_callback: Called from the retention thread as (deleted_rows, total_rows)
+        
+        Returns:
+            True if the purge was scheduled, False if one is already running
+        """
+        with self._lock:
+            if not self.running or self._busy or self._requested_days is not None:
+                return False
+            self._requested_days = days_to_keep or self._retention_days()
+            self._progress_callback = progress_callback
+        
+        self._wake.set()
+        return True
+    
+    def cancel(self):
+        """Cancel the running purge after its current chunk."""
+        self._cancel.set()
+    
+    def is_busy(self) -> bool:
+        """
+        Check whether a purge is scheduled or running.
+        
+        Returns:
+            True while a purge is pending or in progress
+        """
+        with self._lock:
+            return self._busy or self._requested_days is not None
+    
+    def get_status(self) -> dict:
+        """
+        Get the state of the current or last purge.
+        
+        Returns:
+            Dictionary with busy, deleted_rows, total_rows, last_run and last_result
+        """
+        deleted_rows, total_rows = self.progress
+        return {
+            "busy": self.is_busy(),
+            "deleted_rows": deleted_rows,
+            "total_rows": total_rows,
+            "last_run": self.last_run,
+            "last_result": self.last_result
+        }
+    
+    def _retention_days(self) -> int:
+        """Get the retention period from settings."""
+        try:
+            return max(1, int(self.config_manager.get_setting("retention_days") or DEFAULT_RETENTION_DAYS))
+        except (TypeError, ValueError):
+            return DEFAULT_RETENTION_DAYS
+    
+    def _retention_loop(self):
+        """Main retention loop. Runs in the retention thread."""
+        while self.running:
+            self._wake.wait(timeout=max(0.0, self._next_auto_run - time.monotonic()))
+            self._wake.clear()
+            if not self.running:
+                break
+            
+            days_to_keep, progress_callback = None, None
+            if time.monotonic() >= self._next_auto_run:
+                self._next_auto_run = time.monotonic() + AUTO_PURGE_INTERVAL_SECONDS
+                if self.config_manager.get_setting("auto_retention", False):
+                    days_to_keep = self._retention_days()
+            
+            with self._lock:
+                # A manual request wins over the scheduled run
+                if self._requested_days is not None:
+                    days_to_keep, progress_callback = self._requested_days, self._progress_callback
+                    self._requested_days, self._progress_callback = None, None
+                self._busy = days_to_keep is not None
+            
+            if days_to_keep is not None:
+                self._run_purge(days_to_keep, progress_callback)
+    
+    def _run_purge(self, days_to_keep: int, progress_callback: Optional[Callable[[int, int], None]]):
+        """Purge records older than days_to_keep, publishing progress."""
+        self._cancel.clear()
+        self.progress = (0, 0)
+        
+        def on_progress(deleted_rows: int, total_rows: int):
+            self.progress = (deleted_rows, total_rows)
+            if progress_callback:
+                progress_callback(deleted_rows, total_rows)
+        
+        try:
+            cutoff_date = (datetime.now() - timedelta(days=days_to_keep)).strftime("%Y-%m-%d")
+            print(f"[RetentionService] Purging records before {cutoff_date}")
+            self.last_result = self.db_manager.purge_before(
+                cutoff_date, progress_callback=on_progress, should_stop=self._cancel.is_set)
+            self.last_run = datetime.now()
+        except Exception as e:
+            print(f"[RetentionService] Error purging old data: {e}")
+        finally:
+            with self._lock:
+                self._busy = False
@@ -0,0 +1,48 @@
+"""Month archives attached on demand"""
+
+import sqlite3
+import threading
+
+import pytest
+
+from database_manager import DatabaseManager
+
+
+@pytest.fixture
+def db(tmp_path):
+    db = DatabaseManager(str(tmp_path / "tracker.db"), cache_entries=0)
+    db.update_durations([("a.exe", "2023-10-02", 60), ("a.exe", "2023-11-03", 30), ("b.exe", "2024-03-01", 5)])
+    db.archive_before("2024-01-01")
+    yield db
+    db.close()
+
+
+def test_archives_are_attached_read_only(db):
+    assert db.get_stats_for_date_range("2023-10-01", "2023-11-30") == {"a.exe": 90}
+    conn = db.connections.read()
+    schema = db.archives.attach(conn, db.get_archives()[0])
+    with pytest.raises(sqlite3.OperationalError):
+        conn.execute(f"DELETE FROM {schema}.usage_logs")
+
+
+def test_compress_skips_archives_attached_elsewhere(db):
+    attached, release = threading.Event(), threading.Event()
+    
+    def reader():
+        db.get_daily_totals("2023-10-01", "2023-10-31")
+        attached.set()
+        release.wait(10)
+        db.archives.detach_all(db.connections.read())
+    
+    thread = threading.Thread(target=reader)
+    thread.start()
+    try:
+        assert attached.wait(10)
+        # Only November is idle: October is still attached to the reader thread
+        assert db.compress_archives(idle_days=0) == 1
+    finally:
+        release.set()
+        thread.join()
+    
+    assert db.compress_archives(idle_days=0) == 1
+    assert db.get_stats_for_date_range("2023-10-01", "2023-11-30") == {"a.exe": 90}
@@ -0,0 +1,55 @@
+"""Running totals (usage_cumulative) against a recomputation"""
+
+import random
+from datetime import date, timedelta
+
+import pytest
+
+from database_manager import DatabaseManager
+
+
+APPS = ["a.exe", "b.exe", "c.exe"]
+FIRST = date(2024, 1, 1)
+
+
+def _day(offset):
+    return (FIRST + timedelta(days=offset)).isoformat()
+
+
+@pytest.fixture
+def db(tmp_path):
+    db = DatabaseManager(str(tmp_path / "tracker.db"), cache_entries=0)
+    yield db
+    db.close()
+
+
+def test_range_totals_match_a_recompute(db):
+    rng = random.Random(5)
+    usage = {}
+    for _ in range(20):
+        # Late writes land before days that already have running totals
+        batch = [(rng.choice(APPS), _day(rng.randrange(60)), rng.randrange(1, 600)) for _ in range(25)]
+        assert db.update_durations(batch)
+        for app_name, day, seconds in batch:
+            usage[(app_name, day)] = usage.get((app_name, day), 0) + seconds
+    
+    assert db.check_cumulative_consistency() == []
+    for _ in range(40):
+        first, last = sorted(rng.sample(range(70), 2))
+        expected = {}
+        for (app_name, day), seconds in usage.items():
+            if _day(first) <= day <= _day(last):
+                expected[app_name] = expected.get(app_name, 0) + seconds
+        assert db.get_stats_for_date_range(_day(first), _day(last)) == expected
+
+
+def test_drift_is_reported_and_rebuilt(db):
+    db.update_durations([("a.exe", _day(0), 10), ("a.exe", _day(3), 20)])
+    with db.connections.write() as cursor:
+        cursor.execute("UPDATE usage_cumulative SET cumulative_seconds = cumulative_seconds + 1")
+    
+    assert [(app_name, day) for app_name, day, _, _ in db.check_cumulative_consistency()] == [
+        ("a.exe", _day(0)), ("a.exe", _day(3))]
+    assert db.rebuild_cumulative()
+    assert db.check_cumulative_consistency() == []
+    assert db.get_stats_for_date_range(_day(1), _day(5)) == {"a.exe": 20}
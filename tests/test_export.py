@@ -0,0 +1,45 @@
+"""Streaming and matrix exports"""
+
+import pytest
+
+import export_service
+from database_manager import DatabaseManager
+from export_service import export_usage, export_usage_matrix, load_usage_matrix
+
+
+@pytest.fixture
+def db(tmp_path):
+    db = DatabaseManager(str(tmp_path / "tracker.db"), cache_entries=0)
+    yield db
+    db.close()
+
+
+def test_cancelled_session_export_closes_the_query(db, tmp_path, monkeypatch):
+    db.enqueue_sessions([("a.exe", f"2024-05-01 10:{minute:02d}:00", f"2024-05-01 10:{minute:02d}:30")
+                         for minute in range(10)])
+    assert db.flush(10)
+    
+    sources = []
+    iter_sessions = db.iter_sessions
+    monkeypatch.setattr(db, "iter_sessions", lambda *args: sources.append(iter_sessions(*args)) or sources[-1])
+    monkeypatch.setattr(export_service, "EXPORT_PROGRESS_ROWS", 2)
+    
+    result = export_usage(db, str(tmp_path / "sessions.csv"), "2024-05-01", "2024-05-01",
+                          granularity="session", should_stop=lambda: True)
+    assert result["rows"] == 2 and not result["completed"]
+    assert sources[0].gi_frame is None  # Generator finished: its cursor is closed
+    assert not (tmp_path / "sessions.csv").exists()
+
+
+def test_matrix_has_a_column_per_app_in_the_range(db, tmp_path):
+    pytest.importorskip("numpy")
+    db.update_durations([(f"old{i}.exe", "2024-01-01", 10) for i in range(50)])
+    db.update_durations([("z.exe", "2024-05-01", 30), ("b.exe", "2024-05-02", 20), ("z.exe", "2024-05-02", 5)])
+    
+    path = str(tmp_path / "usage.npz")
+    result = export_usage_matrix(db, path, "2024-05-01", "2024-05-03")
+    assert result["completed"] and (result["days"], result["apps"]) == (3, 2)
+    
+    days, apps, seconds = load_usage_matrix(path)
+    assert apps.tolist() == ["b.exe", "z.exe"]
+    assert seconds.tolist() == [[0, 30], [20, 5], [0, 0]]
@@ -0,0 +1,46 @@
+"""Saving the monitor's counters through the background writer"""
+
+from datetime import datetime
+
+from config_manager import ConfigManager
+from database_manager import DatabaseManager
+from monitor_service import AppMonitor
+
+
+def _monitor(tmp_path):
+    config = ConfigManager(str(tmp_path / "settings.json"))
+    db = DatabaseManager(str(tmp_path / "tracker.db"))
+    return AppMonitor(db, config), db
+
+
+def test_resubmitted_batch_counts_once(tmp_path):
+    db = DatabaseManager(str(tmp_path / "tracker.db"))
+    minute = datetime.now().strftime("%Y-%m-%d %H:%M")
+    assert db.enqueue_samples([("a.exe", minute, 30)], journal_sequence=5)
+    assert db.enqueue_samples([("a.exe", minute, 30)], journal_sequence=5)
+    assert db.flush(10)
+    assert db.get_today_stats() == {"a.exe": 30}
+    assert db.get_journal_sequence() == 5
+    db.close()
+
+
+def test_failed_handover_is_retried_at_next_save(tmp_path):
+    monitor, db = _monitor(tmp_path)
+    minute = datetime.now().strftime("%Y-%m-%d %H:%M")
+    with monitor.lock:
+        monitor._credit("a.exe", minute, 40)
+    
+    enqueue = db.enqueue_samples
+    db.enqueue_samples = lambda *args, **kwargs: False
+    monitor._save_accumulated_time()
+    assert not monitor.usage_counters and monitor.uncommitted_batch is not None
+    
+    db.enqueue_samples = enqueue
+    with monitor.lock:
+        monitor._credit("a.exe", minute, 20)
+    monitor._save_accumulated_time()
+    assert db.flush(10)
+    assert db.get_today_stats() == {"a.exe": 60}
+    assert not monitor.journal_full
+    db.close()
+    monitor.journal.close()
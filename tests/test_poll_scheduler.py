@@ -0,0 +1,43 @@
+"""
+Tests for the adaptive poll scheduler and its simulation
+"""
+
+import random
+
+from poll_scheduler import AdaptivePollScheduler, simulate
+
+
+def _sessions(count=12, day=24 * 3600.0, seed=1):
+    rng = random.Random(seed)
+    sessions, last_end = [], 0.0
+    for start in sorted(rng.uniform(0, day - 7200) for _ in range(count)):
+        start = max(start, last_end + 60)
+        end = start + rng.uniform(30, 5400)
+        sessions.append((start, end))
+        last_end = end
+    return sessions, day
+
+
+def test_interval_grows_while_watched_apps_are_unchanged():
+    scheduler = AdaptivePollScheduler(1, 30)
+    assert scheduler.next_interval(True, True) == 1
+    assert [scheduler.next_interval(False, True) for _ in range(6)] == [2, 4, 8, 16, 30, 30]
+    assert scheduler.next_interval(True, False) == 1
+    assert scheduler.next_interval(False, False) == 30
+
+
+def test_unwatched_churn_does_not_hold_the_interval_down():
+    sessions, day = _sessions()
+    quiet = simulate(sessions, day)
+    churning = simulate(sessions, day, churn_interval=2.0)
+    assert churning["churn_polls"] > churning["polls"] // 2
+    assert churning["polls"] == quiet["polls"]
+    assert churning["wakeups_per_hour"] < simulate(sessions, day, fixed_interval=5)["wakeups_per_hour"] / 4
+
+
+def test_session_error_stays_within_bound():
+    sessions, day = _sessions()
+    for overrun in (0.0, 0.5, 3.0):
+        for result in (simulate(sessions, day, overrun=overrun),
+                       simulate(sessions, day, fixed_interval=5, overrun=overrun)):
+            assert result["worst_session_error"] <= result["bound"]
@@ -0,0 +1,57 @@
+"""ProcFsSampler parsing, against a fake /proc tree"""
+
+import os
+
+import pytest
+
+from process_sampler import ProcFsSampler
+
+
+BOOT_TIME = 1700000000
+
+
+def _stat_line(pid, comm, start_ticks):
+    # Fields after the name: state, ppid, ... with starttime the 22nd field overall
+    fields = ["S", "1"] + ["0"] * 17 + [str(start_ticks), "0"]
+    return f"{pid} ({comm}) {' '.join(fields)}\n"
+
+
+@pytest.fixture
+def proc(tmp_path):
+    (tmp_path / "stat").write_text(f"cpu  1 2 3\nbtime {BOOT_TIME}\nprocesses 5\n")
+    
+    def add(pid, comm, start_ticks, cmdline=b""):
+        directory = tmp_path / str(pid)
+        directory.mkdir()
+        (directory / "stat").write_text(_stat_line(pid, comm, start_ticks))
+        (directory / "cmdline").write_bytes(cmdline)
+    
+    add.path = str(tmp_path)
+    return add
+
+
+@pytest.mark.skipif(not hasattr(os, "sysconf"), reason="needs os.sysconf")
+def test_stat_fields_are_parsed(proc):
+    proc(12, "bash", 500)
+    proc(13, "weird) (name", 700)
+    sampler = ProcFsSampler(proc.path)
+    ticks = os.sysconf("SC_CLK_TCK")
+    
+    assert sorted(sampler.list_pids()) == [12, 13]
+    assert sampler.inspect(12) == (BOOT_TIME + 500 / ticks, "bash")
+    assert sampler.inspect(13) == (BOOT_TIME + 700 / ticks, "weird) (name")
+    assert sampler.inspect(99) is None
+
+
+@pytest.mark.skipif(not hasattr(os, "sysconf"), reason="needs os.sysconf")
+def test_truncated_names_are_extended_from_cmdline(proc):
+    proc(20, "very-long-progr", 1, b"/opt/app/very-long-program-name\0--flag\0")
+    proc(21, "renamed-thread-", 1, b"/usr/bin/python3\0worker.py\0")
+    proc(22, "title-rewriter-", 1, b"title-rewriter-daemon: idle")
+    sampler = ProcFsSampler(proc.path)
+    
+    assert sampler.inspect(20)[1] == "very-long-program-name"
+    assert sampler.inspect(21)[1] == "renamed-thread-"  # cmdline names another program
+    assert sampler.inspect(22)[1] == "title-rewriter-daemon:"
+    assert sampler.cmdline(20) == ["/opt/app/very-long-program-name", "--flag"]
+    assert sampler.cmdline(22) == ["title-rewriter-daemon:", "idle"]
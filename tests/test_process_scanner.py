@@ -0,0 +1,55 @@
+"""Incremental process scanning and PID reuse"""
+
+from process_sampler import ProcessSampler
+from process_scanner import ProcessScanner
+
+
+class _FakeSampler(ProcessSampler):
+    """Process table the tests edit directly: pid -> (create_time, name)."""
+    
+    def __init__(self):
+        self.table = {}
+        self.inspected = []
+    
+    def list_pids(self):
+        return list(self.table)
+    
+    def inspect(self, pid):
+        self.inspected.append(pid)
+        return self.table.get(pid)
+
+
+def test_reused_watched_pid_is_dropped():
+    sampler = _FakeSampler()
+    sampler.table = {10: (100.0, "Game.exe"), 11: (100.0, "shell.exe")}
+    scanner = ProcessScanner(sampler, revalidate_per_tick=0)
+    assert scanner.scan(["game.exe"]) == {"game.exe"}
+    
+    # The game exited and its PID went to another process between two ticks
+    sampler.table[10] = (105.0, "helper.exe")
+    assert scanner.scan(["game.exe"]) == set()
+    assert scanner.processes[10] == (105.0, "helper.exe", False)
+
+
+def test_reused_unwatched_pid_is_picked_up_by_the_rotation():
+    sampler = _FakeSampler()
+    sampler.table = {pid: (100.0, f"p{pid}.exe") for pid in range(20)}
+    scanner = ProcessScanner(sampler, revalidate_per_tick=4)
+    assert scanner.scan(["game.exe"]) == set()
+    
+    sampler.table[7] = (105.0, "game.exe")
+    found = [scanner.scan(["game.exe"]) for _ in range(5)]
+    assert {"game.exe"} in found  # Within len(table) / revalidate_per_tick ticks
+    assert scanner.started_at("game.exe") == 105.0
+
+
+def test_unchanged_pids_are_not_looked_up_again():
+    sampler = _FakeSampler()
+    sampler.table = {pid: (100.0, f"p{pid}.exe") for pid in range(50)}
+    sampler.table[3] = (100.0, "game.exe")
+    scanner = ProcessScanner(sampler, revalidate_per_tick=2)
+    scanner.scan(["game.exe"])
+    
+    sampler.inspected.clear()
+    assert scanner.scan(["game.exe"]) == {"game.exe"}
+    assert len(sampler.inspected) == 3  # The watched PID and two rotating ones
@@ -0,0 +1,43 @@
+"""Chunked retention purge"""
+
+from datetime import date, timedelta
+
+import pytest
+
+import database_manager
+from database_manager import DatabaseManager
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    monkeypatch.setattr(database_manager, "RETENTION_CHUNK_PAUSE_SECONDS", 0)
+    db = DatabaseManager(str(tmp_path / "tracker.db"), cache_entries=0)
+    first = date(2024, 1, 1)
+    db.update_durations([(app_name, (first + timedelta(days=offset)).isoformat(), 60)
+                         for offset in range(40) for app_name in ("a.exe", "b.exe")])
+    yield db
+    db.close()
+
+
+def test_every_chunk_leaves_totals_consistent(db):
+    progress = []
+    
+    def on_progress(deleted, total):
+        progress.append((deleted, total))
+        assert db.check_cumulative_consistency() == []
+    
+    result = db.purge_before("2024-01-31", progress_callback=on_progress, chunk_rows=7)
+    assert result["completed"] and result["error"] is None
+    assert result["deleted_rows"] == result["total_rows"] == 60
+    assert [deleted for deleted, _ in progress] == [7, 14, 21, 28, 35, 42, 49, 56, 60]
+    assert db.get_stats_for_date_range("2024-01-01", "2024-12-31") == {"a.exe": 600, "b.exe": 600}
+
+
+def test_cancelled_purge_keeps_the_rest(db):
+    chunks = []
+    result = db.purge_before("2024-01-31", progress_callback=lambda deleted, total: chunks.append(deleted),
+                             should_stop=lambda: len(chunks) == 2, chunk_rows=10)
+    assert not result["completed"] and result["deleted_rows"] == 20
+    assert db.check_cumulative_consistency() == []
+    assert db.get_stats_for_date_range("2024-01-01", "2024-12-31") == {"a.exe": 1800, "b.exe": 1800}
+    assert db.get_stats_for_date_range("2024-01-11", "2024-01-11") == {"a.exe": 60, "b.exe": 60}
@@ -0,0 +1,49 @@
+"""
+Query plan regression tests: every runtime query must use an index
+"""
+
+import sqlite3
+
+from database_manager import DatabaseManager
+from database_migrations import MigrationRunner, _full_scans, check_query_plans
+
+
+def test_runtime_queries_use_indexes():
+    problems = check_query_plans()
+    assert problems == [], "\n".join(problems)
+
+
+def test_full_scan_is_reported():
+    sql = "SELECT SUM(duration_seconds) FROM usage_logs l WHERE l.duration_seconds > 0"
+    assert _full_scans(sql, ["SCAN l"]) == ["SCAN l"]
+    assert _full_scans(sql, ["SEARCH l USING PRIMARY KEY (day>?)"]) == []
+    assert _full_scans("SELECT id FROM apps", ["SCAN apps"]) == []
+    assert _full_scans(sql, ["SEARCH l USING AUTOMATIC COVERING INDEX (app_id=?)"]) != []
+
+
+def test_legacy_database_migrates(tmp_path):
+    path = str(tmp_path / "legacy.db")
+    conn = sqlite3.connect(path)
+    conn.execute('''
+        CREATE TABLE usage_logs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            app_name TEXT NOT NULL,
+            date TEXT NOT NULL,
+            duration_seconds INTEGER NOT NULL DEFAULT 0,
+            UNIQUE(app_name, date)
+        )
+    ''')
+    conn.executemany("INSERT INTO usage_logs (app_name, date, duration_seconds) VALUES (?, ?, ?)",
+                     [("chrome.exe", "2024-01-01", 60), ("code.exe", "2024-01-02", 90),
+                      ("chrome.exe", "2024-01-03", 30)])
+    conn.commit()
+    conn.close()
+    
+    db = DatabaseManager(path)
+    try:
+        assert db.get_stats_for_date_range("2024-01-01", "2024-01-31") == {"chrome.exe": 90, "code.exe": 90}
+        assert db.get_stats_for_date_range("2024-01-02", "2024-01-03") == {"code.exe": 90, "chrome.exe": 30}
+        assert db.check_cumulative_consistency() == []
+        assert MigrationRunner(db).pending() == []
+    finally:
+        db.close()
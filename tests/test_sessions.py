@@ -0,0 +1,54 @@
+"""Session open/close in the monitor and the session queries"""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from config_manager import ConfigManager
+from database_manager import DatabaseManager
+from monitor_service import AppMonitor
+
+
+T0 = datetime(2024, 5, 1, 23, 59, 50)
+
+
+@pytest.fixture
+def monitor(tmp_path):
+    db = DatabaseManager(str(tmp_path / "tracker.db"), cache_entries=0)
+    monitor = AppMonitor(db, ConfigManager(str(tmp_path / "settings.json")))
+    yield monitor
+    db.close()
+    monitor.journal.close()
+
+
+def _tick(monitor, seconds, running, started=None, gap=False, counted_seconds=None):
+    now = T0 + timedelta(seconds=seconds)
+    counted_end = now if counted_seconds is None else T0 + timedelta(seconds=counted_seconds)
+    with monitor.lock:
+        monitor._update_sessions(set(running), now, counted_end, started, gap)
+
+
+def test_sessions_open_and_close_with_the_app(monitor):
+    _tick(monitor, 0, {"a.exe"}, started={"a.exe": T0 - timedelta(seconds=30)})
+    _tick(monitor, 5, {"a.exe", "b.exe"})
+    _tick(monitor, 15, {"b.exe"})
+    assert monitor.get_open_sessions() == [("b.exe", "2024-05-01 23:59:55", "2024-05-02 00:00:05")]
+    
+    # a.exe was last seen at 23:59:55; its session ends at the next check, where its time ends
+    monitor._save_accumulated_time()
+    db = monitor.db_manager
+    assert db.flush(10)
+    # Split at midnight, one piece per day
+    assert db.get_sessions("2024-05-01", "2024-05-02") == [
+        ("a.exe", "2024-05-01 23:59:20", "2024-05-02 00:00:00"),
+        ("a.exe", "2024-05-02 00:00:00", "2024-05-02 00:00:05")]
+    assert db.get_apps_running_at("2024-05-01 23:59:30") == ["a.exe"]
+    assert db.get_apps_running_at("2024-05-02 00:00:10") == []
+
+
+def test_suspend_gap_restarts_open_sessions(monitor):
+    _tick(monitor, 0, {"a.exe"})
+    # Credit stops at 5 s after the last check before the suspend
+    _tick(monitor, 3600, {"a.exe"}, gap=True, counted_seconds=5)
+    assert monitor.closed_sessions == [("a.exe", "2024-05-01 23:59:50", "2024-05-01 23:59:55")]
+    assert monitor.get_open_sessions() == [("a.exe", "2024-05-02 00:59:50", "2024-05-02 00:59:50")]
@@ -0,0 +1,32 @@
+"""Watchlist entry matching"""
+
+from watchlist_matcher import WatchlistMatcher
+
+
+def test_backreference_entry_keeps_its_own_groups():
+    matcher = WatchlistMatcher(["re:(x)y", r"re:(ab)\1\.exe", "chrome.exe"])
+    assert matcher.match_name("abab.exe")
+    assert not matcher.match_name("abx.exe")
+    assert matcher.match_name("xy")
+    assert matcher.match_name("chrome.exe")
+
+
+def test_inline_flags_apply_to_their_entry_only():
+    matcher = WatchlistMatcher([r"re:(?s)tool.\.exe", "re:a.b", "game*.exe"])
+    assert matcher.match_name("tool\n.exe")
+    assert not matcher.match_name("a\nb")
+    assert matcher.match_name("a-b")
+    assert matcher.match_name("game2.exe")
+
+
+def test_named_groups_in_several_entries():
+    matcher = WatchlistMatcher(["re:(?P<v>a)(?P=v)", "re:(?P<v>b)(?P=v)c"])
+    assert matcher.match_name("aa") and matcher.match_name("bbc")
+    assert not matcher.match_name("ab")
+
+
+def test_invalid_entry_is_reported_and_others_still_match():
+    matcher = WatchlistMatcher(["re:(unclosed", "re:ok\\d"])
+    assert matcher.invalid == ["re:(unclosed"]
+    assert matcher.match_name("ok1")
+    assert matcher.pattern_count == 1
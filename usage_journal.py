@@ -0,0 +1,185 @@
+"""
+Usage Journal for TimeTrace Application
+Crash-safe memory-mapped copy of the monitor's unsaved per-minute counters
+"""
+
+import mmap
+import os
+import struct
+from typing import Dict, List, Tuple
+
+
+# File layout: a 64-byte file header, then two regions. Each region is a
+# 64-byte header (batch sequence, used slot count) followed by fixed-size
+# slots of (seconds int64, minute "YYYY-MM-DD HH:MM", app name).
+# One region collects the current save interval; the other holds the batch
+# handed to the database at the last save until it is known to be committed.
+JOURNAL_MAGIC = b"TTJRNL01"
+JOURNAL_SLOTS = 4096           # (app, minute) pairs per save interval
+HEADER_SIZE = 64
+REGION_HEADER_SIZE = 64
+SLOT_SIZE = 128
+MINUTE_SIZE = 16               # "YYYY-MM-DD HH:MM"
+NAME_SIZE = SLOT_SIZE - 8 - MINUTE_SIZE
+
+
+class UsageJournal:
+    """
+    Fixed-layout journal file, mapped into memory. The monitor writes each
+    tick's counters into it in place; the OS writes the pages back, so a
+    crash or kill of the process loses nothing. Each batch carries a
+    sequence number that the database stores in the same transaction as the
+    batch, so replay at startup skips batches that were already committed.
+    """
+    
+    def __init__(self, path: str, slots: int = JOURNAL_SLOTS):
+        """
+        Open (or create) the journal file and map it.
+        
+        Args:
+            path: Journal file path
+            slots: Slots per region; a file with a different layout is recreated
+        """
+        self.path = path
+        self.slots = slots
+        self._region_size = REGION_HEADER_SIZE + slots * SLOT_SIZE
+        size = HEADER_SIZE + 2 * self._region_size
+        
+        fresh = not os.path.exists(path) or os.path.getsize(path) != size
+        with open(path, "r+b" if not fresh else "w+b") as file:
+            if fresh:
+                file.truncate(size)
+            self._map = mmap.mmap(file.fileno(), size)
+        
+        if fresh or self._map[:8] != JOURNAL_MAGIC:
+            self._map[:] = bytes(size)
+            self._map[:8] = JOURNAL_MAGIC
+            self._set_region_header(0, 1, 0)
+            self._set_active(0)
+        
+        self._active = struct.unpack_from("<q", self._map, 8)[0]
+        self._slot_index: Dict[Tuple[str, str], int] = {}
+    
+    @property
+    def active_sequence(self) -> int:
+        """Sequence number of the batch currently being collected."""
+        return self._region_header(self._active)[0]
+    
+    @property
+    def previous_sequence(self) -> int:
+        """Sequence number of the batch handed over at the last save (0 if none)."""
+        return self._region_header(1 - self._active)[0]
+    
+    def record(self, app_name: str, minute: str, total_seconds: int) -> bool:
+        """
+        Store the current total of an (app, minute) counter. After the first
+        call for a key this is a single 8-byte write into the mapping.
+        
+        Args:
+            app_name: App name
+            minute: Minute in "YYYY-MM-DD HH:MM" format
+            total_seconds: Unsaved seconds counted for the app in that minute
+        
+        Returns:
+            False if the region is full or the name doesn't fit; the counter
+            is then only held in memory until the next save
+        """
+        slot = self._slot_index.get((app_name, minute))
+        if slot is None:
+            name = app_name.encode("utf-8")
+            _, count = self._region_header(self._active)
+            if count >= self.slots or len(name) > NAME_SIZE or len(minute) != MINUTE_SIZE:
+                return False
+            
+            # Name first, minute last: a slot only counts once its minute is set
+            slot = self._slot_offset(self._active, count)
+            self._map[slot + 8 + MINUTE_SIZE:slot + SLOT_SIZE] = name.ljust(NAME_SIZE, b"\0")
+            struct.pack_into("<q", self._map, slot, int(total_seconds))
+            self._map[slot + 8:slot + 8 + MINUTE_SIZE] = minute.encode("ascii")
+            self._set_region_header(self._active, self.active_sequence, count + 1)
+            self._slot_index[(app_name, minute)] = slot
+            return True
+        
+        struct.pack_into("<q", self._map, slot, int(total_seconds))
+        return True
+    
+    def rotate(self):
+        """
+        Start the next batch in the other region, after the active batch was
+        handed to the database. The other region's batch must be committed by now.
+        """
+        sequence = self.active_sequence
+        other = 1 - self._active
+        start = HEADER_SIZE + other * self._region_size
+        self._map[start:start + self._region_size] = bytes(self._region_size)
+        self._set_region_header(other, sequence + 1, 0)
+        self._set_active(other)
+        self._slot_index.clear()
+    
+    def pending_batches(self, committed_sequence: int) -> List[Tuple[int, List[Tuple[str, str, int]]]]:
+        """
+        Read the batches that never reached the database.
+        
+        Args:
+            committed_sequence: Last batch sequence the database committed
+        
+        Returns:
+            List of (sequence, [(app_name, minute, seconds), ...]), oldest first
+        """
+        batches = []
+        for region in (1 - self._active, self._active):
+            sequence, count = self._region_header(region)
+            if sequence <= committed_sequence or not count:
+                continue
+            
+            rows = []
+            for index in range(min(count, self.slots)):
+                slot = self._slot_offset(region, index)
+                minute = bytes(self._map[slot + 8:slot + 8 + MINUTE_SIZE])
+                if not minute[0]:
+                    continue
+                seconds = struct.unpack_from("<q", self._map, slot)[0]
+                name = bytes(self._map[slot + 8 + MINUTE_SIZE:slot + SLOT_SIZE]).rstrip(b"\0")
+                if seconds > 0:
+                    rows.append((name.decode("utf-8"), minute.decode("ascii"), seconds))
+            batches.append((sequence, rows))
+        return batches
+    
+    def reset(self, sequence: int):
+        """
+        Empty both regions and continue numbering batches after sequence.
+        
+        Args:
+            sequence: Last sequence in use (the next batch gets sequence + 1)
+        """
+        self._map[HEADER_SIZE:] = bytes(len(self._map) - HEADER_SIZE)
+        self._set_region_header(0, sequence + 1, 0)
+        self._set_active(0)
+        self._slot_index.clear()
+    
+    def sync(self):
+        """Ask the OS to write the mapped pages to disk now (bounds loss on power failure)."""
+        self._map.flush()
+    
+    def close(self):
+        """Write back and unmap the journal."""
+        if not self._map.closed:
+            self._map.flush()
+            self._map.close()
+    
+    def _slot_offset(self, region: int, index: int) -> int:
+        """Byte offset of a slot in the file."""
+        return HEADER_SIZE + region * self._region_size + REGION_HEADER_SIZE + index * SLOT_SIZE
+    
+    def _region_header(self, region: int) -> Tuple[int, int]:
+        """Read a region's (sequence, used slot count)."""
+        return struct.unpack_from("<qq", self._map, HEADER_SIZE + region * self._region_size)
+    
+    def _set_region_header(self, region: int, sequence: int, count: int):
+        """Write a region's (sequence, used slot count)."""
+        struct.pack_into("<qq", self._map, HEADER_SIZE + region * self._region_size, sequence, count)
+    
+    def _set_active(self, region: int):
+        """Switch the region that collects new counters."""
+        self._active = region
+        struct.pack_into("<q", self._map, 8, region)
@@ -0,0 +1,274 @@
+"""
+Watchlist Matcher for TimeTrace Application
+Compiled matching of process names, paths and command lines against watchlist entries
+"""
+
+import fnmatch
+import re
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+
+# Entry syntax. A plain entry is an executable name, a glob if it has *, ? or [.
+# "re:" makes it a regular expression; "path:" matches the executable's full
+# path instead of its name (also implied by a / or \ in the entry), and
+# "cmdline:" the whole command line. Both combine with "re:" ("path:re:...").
+REGEX_PREFIX = "re:"
+PATH_PREFIX = "path:"
+CMDLINE_PREFIX = "cmdline:"
+GLOB_CHARACTERS = "*?["
+
+# Cached name -> matched? results; the cache is emptied when it grows past this
+MATCH_CACHE_ENTRIES = 4096
+
+# Inline global flags such as "(?i)" or "(?sx)"; in a combined alternation they
+# would apply to every entry (or fail to compile), so such entries stand alone
+INLINE_FLAGS = re.compile(r"\(\?[aiLmsux]+\)")
+
+
+def normalize_watchlist_entry(entry: str) -> str:
+    """
+    Normalize a watchlist entry: lowercase and without surrounding whitespace,
+    except that regular expressions keep their case (\\D is not \\d).
+    
+    Args:
+        entry: Watchlist entry (e.g., " Chrome.EXE ", "re:^Python3\\.\\d+$")
+    
+    Returns:
+        Normalized entry (e.g., "chrome.exe", "re:^Python3\\.\\d+$")
+    """
+    entry = entry.strip()
+    kind, pattern, is_regex = _parse_entry(entry)
+    if not is_regex:
+        return entry.lower()
+    return (f"{kind}:" if kind != "name" else "") + REGEX_PREFIX + pattern
+
+
+class WatchlistMatcher:
+    """
+    A watchlist compiled for matching. Exact names go into a hash set; name
+    globs and regular expressions are combined into one compiled alternation,
+    and path and command-line rules into one each. Expressions that can't
+    share an alternation (capturing groups, which backreferences number, or
+    inline global flags) are compiled and tried on their own. Name results are cached,
+    so a tick costs one dictionary lookup per process name however long the
+    watchlist is. Compile a new matcher when the watchlist changes.
+    """
+    
+    def __init__(self, entries: Iterable[str]):
+        """
+        Compile a watchlist.
+        
+        Args:
+            entries: Watchlist entries (see the entry syntax above)
+        """
+        self.entries: Tuple[str, ...] = tuple(entries)
+        exact = set()
+        patterns: Dict[str, List[str]] = {"name": [], "path": [], "cmdline": []}
+        standalone: Dict[str, List["re.Pattern"]] = {"name": [], "path": [], "cmdline": []}
+        self.invalid: List[str] = []
+        
+        for entry in self.entries:
+            kind, pattern, is_regex = _parse_entry(entry.strip())
+            if not pattern:
+                continue
+            if is_regex:
+                try:
+                    compiled = re.compile(pattern, re.IGNORECASE)
+                except re.error as e:
+                    print(f"[WatchlistMatcher] Ignoring invalid pattern {entry!r}: {e}")
+                    self.invalid.append(entry)
+                    continue
+                if compiled.groups or INLINE_FLAGS.search(pattern):
+                    standalone[kind].append(compiled)
+                    continue
+            elif kind == "name" and not any(c in pattern for c in GLOB_CHARACTERS):
+                exact.add(pattern.lower())
+                continue
+            else:
+                pattern = fnmatch.translate(_normalize_path(pattern) if kind == "path" else pattern.lower())
+            patterns[kind].append(pattern)
+        
+        self.exact = frozenset(exact)
+        self.name_pattern = _compile_alternation(patterns["name"], standalone["name"])
+        self.path_pattern = _compile_alternation(patterns["path"], standalone["path"])
+        self.cmdline_pattern = _compile_alternation(patterns["cmdline"], standalone["cmdline"])
+        self.pattern_count = sum(len(patterns[kind]) + len(standalone[kind]) for kind in patterns)
+        self._cache: Dict[str, bool] = {}
+    
+    @property
+    def needs_details(self) -> bool:
+        """True if some entries need the executable path or command line, not just the name."""
+        return self.path_pattern is not None or self.cmdline_pattern is not None
+    
+    def match_name(self, name: str) -> bool:
+        """
+        Check a normalized process name against the exact names and name patterns.
+        
+        Args:
+            name: Lowercase executable name
+        
+        Returns:
+            True if the name is watched
+        """
+        matched = self._cache.get(name)
+        if matched is None:
+            matched = name in self.exact or (self.name_pattern is not None and
+                                             self.name_pattern.fullmatch(name) is not None)
+            if len(self._cache) >= MATCH_CACHE_ENTRIES:
+                self._cache.clear()
+            self._cache[name] = matched
+        return matched
+    
+    def match(self, name: str, exe: Optional[Callable[[], Optional[str]]] = None,
+              cmdline: Optional[Callable[[], Optional[List[str]]]] = None) -> bool:
+        """
+        Check a process against every rule. The path and command line are
+        only fetched if the name did not match and path or command-line rules exist.
+        
+        Args:
+            name: Lowercase executable name
+            exe: Returns the executable's full path (None if unknown)
+            cmdline: Returns the command-line arguments (None if unknown)
+        
+        Returns:
+            True if the process is watched
+        """
+        if self.match_name(name):
+            return True
+        if self.path_pattern is not None and exe:
+            path = exe()
+            if path and self.path_pattern.fullmatch(_normalize_path(path)):
+                return True
+        if self.cmdline_pattern is not None and cmdline:
+            args = cmdline()
+            if args and self.cmdline_pattern.fullmatch(" ".join(args).lower()):
+                return True
+        return False
+
+
+def _parse_entry(entry: str) -> Tuple[str, str, bool]:
+    """Split an entry into (kind: "name", "path" or "cmdline", pattern, is_regex)."""
+    kind = "name"
+    lowered = entry.lower()
+    if lowered.startswith(PATH_PREFIX):
+        kind, entry = "path", entry[len(PATH_PREFIX):]
+    elif lowered.startswith(CMDLINE_PREFIX):
+        kind, entry = "cmdline", entry[len(CMDLINE_PREFIX):]
+    
+    is_regex = entry.lower().startswith(REGEX_PREFIX)
+    if is_regex:
+        entry = entry[len(REGEX_PREFIX):]
+    elif kind == "name" and ("/" in entry or "\\" in entry):
+        kind = "path"
+    return kind, entry, is_regex
+
+
+def _normalize_path(path: str) -> str:
+    """Compare paths case-insensitively and with / separators (Windows paths use \\)."""
+    return path.replace("\\", "/").lower()
+
+
+def _compile_alternation(patterns: List[str], standalone: List["re.Pattern"]):
+    """
+    Combine patterns into one case-insensitive regular expression matching
+    any of them, trying the standalone (already compiled) ones after it.
+    
+    Args:
+        patterns: Expressions without capturing groups or inline global flags
+        standalone: Compiled expressions that must not be combined
+    
+    Returns:
+        Object with a fullmatch method, or None if there are no patterns
+    """
+    compiled = list(standalone)
+    if patterns:
+        try:
+            compiled.insert(0, re.compile("|".join(f"(?:{pattern})" for pattern in patterns), re.IGNORECASE))
+        except re.error:
+            compiled[:0] = [re.compile(pattern, re.IGNORECASE) for pattern in patterns]
+    if not compiled:
+        return None
+    return compiled[0] if len(compiled) == 1 else _AnyPattern(compiled)
+
+
+class _AnyPattern:
+    """Patterns that do not combine into one expression: tries each in turn."""
+    
+    def __init__(self, patterns: List["re.Pattern"]):
+        self.patterns = patterns
+    
+    def fullmatch(self, text: str):
+        return next((match for match in (pattern.fullmatch(text) for pattern in self.patterns) if match), None)
+
+
+def run_benchmark(sizes: Tuple[int, ...] = (10, 100, 1000, 10000), pattern_share: float = 0.1,
+                  processes: int = 1000, ticks: int = 50) -> List[Dict[str, float]]:
+    """
+    Time matching a tick's process names against watchlists of growing size:
+    the old list scan, and the compiled matcher with a cold and a warm cache.
+    
+    Args:
+        sizes: Watchlist lengths
+        pattern_share: Fraction of entries that are globs / regular expressions
+        processes: Process names per tick
+        ticks: Ticks per measurement
+    
+    Returns:
+        One dictionary per size with compile_ms and microseconds per tick of each method
+    """
+    import random
+    import time
+    
+    rng = random.Random(1)
+    names = [f"process{i}.exe" for i in range(processes - 10)] + [f"app{i}.exe" for i in range(10)]
+    results = []
+    for size in sizes:
+        entries = []
+        for i in range(size):
+            if rng.random() >= pattern_share:
+                entries.append(f"app{i}.exe")
+            elif i % 2:
+                entries.append(f"tool{i}*.exe")
+            else:
+                entries.append(f"re:^helper{i}-\\d+\\.exe$")
+        row: Dict[str, float] = {"entries": size}
+        
+        # Before: the watchlist as a list, one linear membership test per name
+        started = time.perf_counter()
+        for _ in range(ticks):
+            watchlist_lower = [app.lower() for app in entries]
+            old = {name for name in names if name in watchlist_lower}
+        row["list_us_per_tick"] = (time.perf_counter() - started) * 1e6 / ticks
+        
+        started = time.perf_counter()
+        matcher = WatchlistMatcher(entries)
+        row["compile_ms"] = (time.perf_counter() - started) * 1000
+        
+        started = time.perf_counter()
+        new = {name for name in names if matcher.match_name(name)}
+        row["cold_us_per_tick"] = (time.perf_counter() - started) * 1e6
+        
+        started = time.perf_counter()
+        for _ in range(ticks):
+            new = {name for name in names if matcher.match_name(name)}
+        row["warm_us_per_tick"] = (time.perf_counter() - started) * 1e6 / ticks
+        
+        assert new == old, (size, new ^ old)
+        results.append(row)
+    return results
+
+
+# Matcher benchmark
+if __name__ == "__main__":
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Benchmark watchlist matching against watchlist size")
+    parser.add_argument("--processes", type=int, default=1000, help="Process names per tick (default: 1000)")
+    parser.add_argument("--pattern-share", type=float, default=0.1,
+                        help="Fraction of entries that are patterns (default: 0.1)")
+    args = parser.parse_args()
+    
+    print(f"{'entries':>7}  {'list us/tick':>12}  {'compile ms':>10}  {'cold us/tick':>12}  {'warm us/tick':>12}")
+    for row in run_benchmark(pattern_share=args.pattern_share, processes=args.processes):
+        print(f"{row['entries']:>7}  {row['list_us_per_tick']:>12.0f}  {row['compile_ms']:>10.1f}  "
+              f"{row['cold_us_per_tick']:>12.0f}  {row['warm_us_per_tick']:>12.0f}")